@@ -0,0 +1,59 @@
+"""
+Load test for /api/chat against stubbed OpenAI / Pinecone / Mongo backends.
+
+Compares the old handler (sync run_once inside the async endpoint, blocking
+the event loop) with the async pipeline, at increasing concurrency, on one
+event loop — i.e. one uvicorn worker.
+
+    python bench/bench_chat_concurrency.py --latency 0.05
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before graph imports
+
+import argparse, asyncio, statistics, time
+import httpx
+from graph.app import run_once
+import main
+
+async def blocking_handler(i: int):
+    # what api_chat used to do: a synchronous pipeline inside an async def
+    return run_once(stubs.new_state(f"question {i}", f"t{i}"))
+
+async def drive(n: int, concurrency: int, call):
+    sem = asyncio.Semaphore(concurrency)
+    lat: list = []
+
+    async def one(i):
+        async with sem:
+            t0 = time.perf_counter()
+            await call(i)
+            lat.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return time.perf_counter() - t0, lat
+
+async def main_async(a):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def via_api(i):
+            r = await client.post("/api/chat", json={"question": f"question {i}", "thread_id": f"t{i}"})
+            r.raise_for_status()
+
+        print(f"{'mode':<10}{'conc':>6}{'reqs':>6}{'wall s':>9}{'req/s':>9}{'p50 s':>8}{'llm calls':>11}")
+        for conc in a.concurrency:
+            n = conc * a.rounds
+            for mode, call in (("blocking", blocking_handler), ("async", via_api)):
+                s = stubs.install(chat_latency=a.latency, embed_latency=a.latency / 2, index_latency=a.latency / 2)
+                wall, lat = await drive(n, conc, call)
+                print(f"{mode:<10}{conc:>6}{n:>6}{wall:>9.2f}{n / wall:>9.1f}"
+                      f"{statistics.median(lat):>8.2f}{s.chat.calls:>11}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--latency", type=float, default=0.05, help="seconds per stubbed LLM call")
+    ap.add_argument("--rounds", type=int, default=2, help="requests per concurrency slot")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    asyncio.run(main_async(ap.parse_args()))
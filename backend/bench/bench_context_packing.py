@@ -0,0 +1,109 @@
+"""
+Context packing (retrieval/packing.py) vs the fixed slices it replaced
+(segmenter contexts[:2], definitions contexts[:3], answer: every context
+with its metadata), on contexts rag_retriever returns for the labelled
+questions in bench/data/ai_act_questions.jsonl over the EU AI Act PDF.
+
+Per LLM stage: context tokens, and how often the stage's context still
+contains a relevant passage (hit). "prompt tok" is the whole
+segment + definitions + answer prompt per request, built by the real
+request builders with a placeholder clause. Token counts use tiktoken
+when its encoding is available (see utils/tokens.py).
+
+    python bench/bench_context_packing.py
+    python bench/bench_context_packing.py --dense     # without the BM25 side
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before graph imports
+
+import argparse, json, shutil, statistics, tempfile, time
+from ingest.pdf_stream import iter_pages, iter_chunks
+from ingest.ingest_pdf import chunk_records
+from retrieval.lexical import LexicalIndex
+from retrieval.local_index import LocalVectorIndex
+import retrieval.hybrid as hybrid
+from graph import nodes, prompts as P
+from graph.nodes import _llm_message, _segmenter_request, _definitions_request, _answer_request
+from graph.state import Clause
+from utils.tokens import count_tokens, tokenizer_name
+from bench.bench_hybrid import LsaEmbeddings, norm
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+def sliced(state, stage):
+    # what each stage read before packing
+    ctx = state["contexts"]
+    return {"segment": ctx[:2], "definitions": ctx[:3], "answer": ctx}[stage]
+
+def old_requests(state):
+    c, ctx = state["working_clause"].model_dump(), state["contexts"]
+    return [(P.SEGMENTER_PROMPT, {"text": "\n\n".join(h["text"] for h in ctx[:2])}),
+            (P.DEFINITIONS_PROMPT, {"clause": c, "definitions_context": "\n\n".join(h["text"] for h in ctx[:3])}),
+            (P.ANSWER_PROMPT, {"question": state["query"], "clause": c, "contexts": ctx})]
+
+def new_requests(state):
+    state = nodes.rerank_contexts(dict(state))
+    return [_segmenter_request(state), _definitions_request(state), _answer_request(state)]
+
+def main(a):
+    records = list(chunk_records(iter_chunks(iter_pages(str(ROOT / "EU_AI_doc.pdf"))), "aiact", "eurlex:ai_act",
+                                 "OJ-2024-07-12", {}, {}))
+    questions = [json.loads(l) for l in open(ROOT / "bench/data/ai_act_questions.jsonl", encoding="utf-8")]
+    emb = LsaEmbeddings([r["metadata"]["text"] for r in records])
+    tmp = tempfile.mkdtemp(prefix="bench_packing_")
+    try:
+        vectors = LocalVectorIndex(f"{tmp}/vectors")
+        vectors.upsert([{**r, "values": v} for r, v in zip(records, emb.embed_documents(
+            [r["metadata"]["text"] for r in records]))])
+        lex = LexicalIndex(f"{tmp}/lexical.sqlite")
+        lex.add(records)
+        stubs.install()
+        nodes.get_index = lambda *_, **__: vectors
+        hybrid.get_lexical_index = lambda *_, **__: lex
+        hybrid.HYBRID_RETRIEVAL = not a.dense
+
+        states = []
+        for q in questions:
+            state = stubs.new_state(q["question"])
+            state["_qvec"] = emb.embed_query(q["question"])
+            state["working_clause"] = Clause(text="placeholder clause", article_id="Art 1")
+            states.append((q, nodes.rag_retriever(state)))
+        print(f"{len(questions)} questions, {statistics.mean(len(s['contexts']) for _, s in states):.1f} contexts each "
+              f"({'dense' if a.dense else 'hybrid'}), tokenizer: {tokenizer_name() or 'estimate (len / 4)'}\n")
+
+        def hit(q, ctx):
+            text = norm(" ".join(c["text"] for c in ctx))
+            return any(norm(p) in text for p in q["relevant"])
+
+        print(f"{'':<9}" + "".join(f"{s + ' tok':>17}{'hit':>6}" for s in ("segment", "definitions", "answer"))
+              + f"{'prompt tok':>12}{'pack ms':>9}")
+        for mode in ("sliced", "packed"):
+            row, prompt, lat = f"{mode:<9}", [], []
+            for stage in ("segment", "definitions", "answer"):
+                tok, hits = [], 0
+                for q, st in states:
+                    if mode == "sliced":
+                        ctx = sliced(st, stage)
+                        body = json.dumps(ctx, ensure_ascii=False) if stage == "answer" else "\n\n".join(
+                            c["text"] for c in ctx)
+                    else:
+                        t0 = time.perf_counter()
+                        ctx = nodes.stage_contexts(nodes.rerank_contexts(dict(st)), stage)
+                        lat.append(time.perf_counter() - t0)
+                        body = "\n\n".join(c["text"] for c in ctx)
+                    tok.append(count_tokens(body))
+                    hits += hit(q, ctx)
+                row += f"{statistics.mean(tok):>17.0f}{hits / len(states):>6.2f}"
+            for q, st in states:
+                reqs = old_requests(st) if mode == "sliced" else new_requests(st)
+                prompt.append(sum(count_tokens(_llm_message(*r)) for r in reqs))
+            print(row + f"{statistics.mean(prompt):>12.0f}" + (f"{statistics.median(lat) * 1000:>9.2f}" if lat else f"{'':>9}"))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dense", action="store_true", help="dense retrieval only")
+    main(ap.parse_args())
@@ -0,0 +1,130 @@
+"""
+Rule-based clause classification (utils/deontic_rules.py) in front of the
+classifier LLM call, on the EU AI Act PDF.
+
+- skip rate: share of the Act's normative sentences (chunks split into
+  sentences that contain a modality marker) the rules classify on their
+  own, per confidence threshold
+- agreement: on the clauses in bench/data/ai_act_clauses.jsonl (a seeded
+  sample of those sentences, then rule cases: negated duties such as
+  "shall neither ... nor", "shall never", "shall no longer"), modality,
+  actor, action verb and object of the rules vs the reference. The reference is the labels in the file,
+  assigned by hand with CLASSIFIER_PROMPT's keyword mapping (null: not
+  normative); pass --openai to classify the clauses with the configured
+  chat model instead and measure agreement with the LLM itself.
+- clause_classifier over the labelled clauses with the rules off and on:
+  LLM calls and classifier prompt tokens (stub chat, 0.05 s per call).
+
+    python bench/bench_deontic_rules.py
+    python bench/bench_deontic_rules.py --openai
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before graph imports
+
+import argparse, json, re, time
+from ingest.pdf_stream import iter_pages, iter_chunks
+from utils import deontic_rules
+from utils.deontic_rules import MODALITY, classify
+from graph import nodes, prompts as P
+from graph.state import Clause
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+THRESHOLDS = (0.75, 0.8, 0.85, 0.9, 1.0)
+SENTENCE = re.compile(r"(?<=[.;:])\s+(?=(?:\(?[a-z0-9]{1,3}\)|\d+\.|[A-Z]))")
+
+def normative_sentences():
+    seen, out = set(), []
+    for c in iter_chunks(iter_pages(str(ROOT / "EU_AI_doc.pdf"))):
+        for s in SENTENCE.split(" ".join(c["text"].split())):
+            if 6 <= len(s.split()) <= 60 and MODALITY.search(s) and s not in seen:
+                seen.add(s)
+                out.append(s)
+    return out
+
+def same_actor(ref, got):
+    # "providers" vs "Providers of high-risk AI systems": one contains the other's head noun
+    if not ref or not got:
+        return not ref and not got
+    ref, got = ref.lower(), got.lower()
+    return ref.rstrip("s") in got or got.rstrip("s") in ref
+
+def _norm(w):
+    return re.sub(r"(?:ed|es|e|d|s)$", "", w.lower())
+
+def same_verb(ref, got):
+    # "be entered" vs "entered", "draw up" vs "draw": the rules' verb is one of the reference's words
+    if not ref or not got:
+        return not ref and not got
+    words = [w for w in ref.split() if w.lower() not in ("be", "to", "and")] or ["be"]
+    return _norm(got) in {_norm(w) for w in words}
+
+STOP = {"the", "a", "an", "of", "to", "in", "on", "for", "and", "or", "with", "by", "as", "this", "that", "those"}
+
+def same_object(ref, got):
+    # most of the reference's content words appear in the rules' object (which runs on to the clause's end)
+    if not ref or not got:
+        return not ref and not got
+    words = lambda s: {w for w in re.findall(r"[\w’'()/-]+", s.lower()) if w not in STOP}
+    want = words(ref)
+    return len(want & words(got)) >= 0.5 * len(want)
+
+def main(a):
+    sents = normative_sentences()
+    t0 = time.perf_counter()
+    results = [classify(s) for s in sents]
+    per = (time.perf_counter() - t0) / len(sents)
+    print(f"{len(sents)} normative sentences in the Act, rules {per * 1e6:.0f} us per clause\n")
+
+    clauses = [json.loads(l) for l in open(ROOT / "bench/data/ai_act_clauses.jsonl", encoding="utf-8")]
+    if a.openai:
+        for c in clauses:
+            r = nodes._llm_json(P.CLASSIFIER_PROMPT, {"text": c["text"]})
+            for k in ("modality", "actor", "action_verb", "object"):
+                c[k] = r.get(k)
+    ref = "LLM" if a.openai else "labels"
+    rules = [classify(c["text"]) for c in clauses]
+
+    checks = {"modality": lambda c, r: c["modality"] == r["modality"],
+              "actor": lambda c, r: same_actor(c["actor"], r["actor"]),
+              "verb": lambda c, r: same_verb(c["action_verb"], r["action_verb"]),
+              "object": lambda c, r: same_object(c["object"], r["object"])}
+    print(f"{'threshold':<11}{'skip (Act)':>11}{'skip (set)':>11}" + "".join(f"{k:>10}" for k in checks)
+          + f"   agreement with {ref} on skipped clauses")
+    for th in THRESHOLDS:
+        skipped = [(c, r) for c, r in zip(clauses, rules) if r["confidence"] >= th]
+        n = len(skipped) or 1
+        print(f"{th:<11}{sum(r['confidence'] >= th for r in results) / len(results):>11.1%}"
+              f"{len(skipped) / len(clauses):>11.1%}"
+              + "".join(f"{sum(ok(c, r) for c, r in skipped) / n:>10.1%}" for ok in checks.values()))
+    print(f"{'(all)':<33}" + "".join(f"{sum(ok(c, r) for c, r in zip(clauses, rules)) / len(clauses):>10.1%}"
+                                     for ok in checks.values()) + "   rules on every clause, for reference")
+
+    th = deontic_rules.DEONTIC_RULES_MIN_CONFIDENCE
+    no_verb = sum(r["confidence"] >= th and not r["action_verb"] for r in results)
+    print(f"skipped without an action verb (Act): {no_verb}")
+    for c, r in zip(clauses, rules):
+        if r["confidence"] >= th:
+            for k, ok in checks.items():
+                if not ok(c, r):
+                    field = k if k != "verb" else "action_verb"
+                    print(f"  {k} disagrees at {th}: {r[field]!r} vs {c[field]!r}: {c['text'][:80]}")
+
+    print(f"\n{'clause_classifier':<20}{'LLM calls':>10}{'prompt tok':>12}{'wall s':>8}")
+    for on in (False, True):
+        st = stubs.install()
+        deontic_rules.DEONTIC_RULES, deontic_rules.STATS = on, deontic_rules.RuleStats()
+        t0 = time.perf_counter()
+        for c in clauses:
+            state = stubs.new_state("classify")
+            state["working_clause"] = Clause(text=c["text"], article_id="Art 1")
+            nodes.clause_classifier(state)
+        print(f"{'rules ' + ('on' if on else 'off'):<20}{st.chat.calls:>10}{st.chat.tokens_in:>12}"
+              f"{time.perf_counter() - t0:>8.2f}")
+    print(f"\n/api/stats classifier (rules on): {deontic_rules.STATS.stats()}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--openai", action="store_true", help="compare with the configured chat model's classification")
+    main(ap.parse_args())
@@ -0,0 +1,58 @@
+"""
+Peak memory and time of /api/clauses/export: the old list + JSON body vs the
+streaming export, over N synthetic clauses served by an in-memory cursor
+(so only the API side is measured).
+
+    python bench/bench_export.py --clauses 100000
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before main is imported
+
+import argparse, datetime, json, time, tracemalloc
+from utils.export import EXPORT_FIELDS, iter_json, iter_csv, dumps
+
+def synthetic(n: int):
+    now = datetime.datetime.utcnow()
+    for i in range(n):
+        yield {
+            "clause_id": f"c{i}", "article_id": f"Art {i % 113}", "modality": "OBLIGATION",
+            "text": "Providers of high-risk AI systems shall ensure compliance with Section 2. " * 3,
+            "actor": "providers", "object": "compliance", "formulas": {"deontic": f"O(p{i})"},
+            "updated": now,
+        }
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = fn()
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, dt, peak / 2**20
+
+def old_export(n):
+    # list(find().limit(...)) then one JSON body
+    results = list(synthetic(n))
+    return len(json.dumps({"data": results}, default=str))
+
+def stream(gen):
+    return lambda: sum(len(chunk) for chunk in gen())
+
+def main(a):
+    rows = [
+        ("old list+json", lambda: old_export(a.clauses)),
+        ("stream json", stream(lambda: iter_json(synthetic(a.clauses)))),
+        ("stream csv", stream(lambda: iter_csv(synthetic(a.clauses), EXPORT_FIELDS))),
+        ("stream ndjson", stream(lambda: (dumps(d) + "\n" for d in synthetic(a.clauses)))),
+    ]
+    print(f"{'export':<16}{'MB out':>9}{'seconds':>9}{'peak MB':>9}")
+    for name, fn in rows:
+        size, dt, peak = measure(fn)
+        print(f"{name:<16}{size / 2**20:>9.1f}{dt:>9.2f}{peak:>9.1f}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clauses", type=int, default=100_000)
+    main(ap.parse_args())
@@ -0,0 +1,58 @@
+"""
+Fused single-call extraction vs the per-node chain: LLM calls, prompt /
+completion tokens and latency per answer, against the stub model.
+
+    python bench/bench_fused.py --questions 20 --latency 0.1
+    python bench/bench_fused.py --invalid     # fused output fails validation -> fallback cost
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before graph imports
+
+import argparse, asyncio, statistics, time
+from graph import prompts as P
+from graph.app import arun_once
+
+QUESTIONS = [
+    "What must providers of high-risk AI systems ensure?",
+    "Which AI practices are prohibited?",
+    "What data governance applies to training data?",
+    "What are deployers required to do?",
+]
+
+async def run(mode: str, n: int, latency: float, invalid: bool):
+    s = stubs.install(chat_latency=latency, embed_latency=latency / 4, index_latency=latency / 4)
+    if invalid:
+        s.chat.replies = [(p, {"clauses": [{"text": "x"}]} if p == P.FUSED_PROMPT else r) for p, r in s.chat.replies]
+    lat, fallbacks = [], 0
+    for i in range(n):
+        state = stubs.new_state(QUESTIONS[i % len(QUESTIONS)], f"t{i}")
+        state["_mode"] = mode
+        t0 = time.perf_counter()
+        state = await arun_once(state)
+        lat.append(time.perf_counter() - t0)
+        fallbacks += state.get("_fused_ok") is False
+    return {
+        "calls": s.chat.calls / n,
+        "tokens_in": s.chat.tokens_in / n,
+        "tokens_out": s.chat.tokens_out / n,
+        "p50_ms": statistics.median(lat) * 1000,
+        "fallbacks": fallbacks,
+    }
+
+async def main_async(a):
+    chain = await run("chain", a.questions, a.latency, False)
+    fused = await run("fused", a.questions, a.latency, a.invalid)
+    print(f"{'mode':<8}{'calls/ans':>10}{'tok in':>9}{'tok out':>9}{'p50 ms':>9}{'fallbacks':>11}")
+    for name, r in (("chain", chain), ("fused", fused)):
+        print(f"{name:<8}{r['calls']:>10.1f}{r['tokens_in']:>9.0f}{r['tokens_out']:>9.0f}{r['p50_ms']:>9.0f}{r['fallbacks']:>11}")
+    print(f"fused/chain: calls {fused['calls'] / chain['calls']:.2f}x  "
+          f"prompt tokens {fused['tokens_in'] / chain['tokens_in']:.2f}x  latency {fused['p50_ms'] / chain['p50_ms']:.2f}x")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--questions", type=int, default=20)
+    ap.add_argument("--latency", type=float, default=0.1, help="seconds per stubbed LLM call")
+    ap.add_argument("--invalid", action="store_true", help="make the fused output fail validation")
+    asyncio.run(main_async(ap.parse_args()))
@@ -0,0 +1,87 @@
+"""
+/api/graph dependency detection: the pairwise substring scan vs the
+Aho-Corasick matcher (utils/dependencies.py) on synthetic clauses. Checks
+both produce identical edges (ids, labels, order) where the scan finishes.
+
+The actor pool grows with n (~n/25 actors) so the edge count stays roughly
+linear; with a handful of actors the *output* itself is quadratic (every
+clause mentioning "providers" depends on every provider clause), which no
+matcher can avoid.
+
+    python bench/bench_graph_deps.py --sizes 100 10000 100000
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import argparse, random, time
+from utils.dependencies import dependency_edges
+
+ACTORS = ["providers", "deployers", "importers", "distributors", "notified bodies", "AI_Act.Provider",
+          "market surveillance authorities", "the AI Office"]
+WORDS = ("risk management system technical documentation logs conformity assessment registration "
+         "transparency obligations human oversight incident reporting quality management").split()
+
+def synthetic(n: int, seed: int = 11):
+    rng = random.Random(seed)
+    actors = [f"{rng.choice(ACTORS)} of category {k}" for k in range(max(8, n // 25))]
+    objects = [" ".join(rng.sample(WORDS, 3)) + f" item {k}" for k in range(max(50, n // 5))]
+    out = []
+    for i in range(n):
+        cond = None
+        if rng.random() < 0.6:
+            bits = [rng.choice(WORDS) for _ in range(rng.randint(4, 12))]
+            if rng.random() < 0.3:
+                bits.insert(rng.randint(0, len(bits)), rng.choice(actors).upper())
+            if rng.random() < 0.1:
+                bits.insert(rng.randint(0, len(bits)), rng.choice(objects))
+            cond = "where " + " ".join(bits)
+        out.append({
+            "_id": f"c{i}",
+            "actor": rng.choice([None, rng.choice(actors)]),
+            "actor_canonical": rng.choice([None, None, None, rng.choice(actors).title()]),
+            "object": rng.choice([None, rng.choice(objects)]),
+            "condition": cond,
+        })
+    return out
+
+def pairwise_edges(results):
+    # the loop /api/graph used before utils/dependencies.py
+    edges = []
+    for i, clause1 in enumerate(results):
+        clause1_id = str(clause1.get("_id"))
+        condition = clause1.get("condition", "")
+        if condition:
+            for j, clause2 in enumerate(results):
+                if i != j:
+                    clause2_id = str(clause2.get("_id"))
+                    actor2 = clause2.get("actor_canonical") or clause2.get("actor", "")
+                    object2 = clause2.get("object", "")
+                    if actor2 and actor2.lower() in condition.lower():
+                        edges.append({"id": f"dep_{clause1_id}_on_{clause2_id}", "source": clause2_id,
+                                      "target": clause1_id, "type": "dependency", "label": "condition"})
+                    elif object2 and object2.lower() in condition.lower():
+                        edges.append({"id": f"dep_{clause1_id}_on_{clause2_id}_obj", "source": clause2_id,
+                                      "target": clause1_id, "type": "dependency", "label": "requires"})
+    return edges
+
+def main(a):
+    print(f"{'clauses':>8}{'edges':>10}{'pairwise s':>12}{'indexed s':>11}{'speedup':>9}  same")
+    for n in a.sizes:
+        results = synthetic(n)
+        t0 = time.perf_counter()
+        fast = dependency_edges(results)
+        t_fast = time.perf_counter() - t0
+        if n <= a.max_pairwise:
+            t0 = time.perf_counter()
+            slow = pairwise_edges(results)
+            t_slow = time.perf_counter() - t0
+            same = "yes" if slow == fast else "NO"
+            print(f"{n:>8}{len(fast):>10}{t_slow:>12.3f}{t_fast:>11.3f}{t_slow / max(t_fast, 1e-9):>8.0f}x  {same}")
+        else:
+            print(f"{n:>8}{len(fast):>10}{'(skipped)':>12}{t_fast:>11.3f}{'':>9}  -")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    ap.add_argument("--max-pairwise", type=int, default=10_000, help="largest size to run the n² scan on")
+    main(ap.parse_args())
@@ -0,0 +1,121 @@
+"""
+/api/graph from the materialized GraphIndex (db/graph_index.py) vs the
+per-request rebuild (filtered sort + dependency_edges) on synthetic clauses.
+
+Checks first that slices match the rebuild exactly (nodes, edges, order)
+for random filters, both after load() and after a stream of incremental
+upserts that change actors, objects and conditions. Then reports load
+time, upsert latency and per-request latency by corpus size.
+
+    python bench/bench_graph_index.py --sizes 10000 100000
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import argparse, datetime, random, statistics, time
+from bench.bench_graph_deps import synthetic as synthetic_deps
+from db.graph_index import GraphIndex, graph_payload
+from utils.dependencies import dependency_edges
+
+MODALITIES = ["OBLIGATION", "PROHIBITION", "PERMISSION", "EXCEPTION"]
+T0 = datetime.datetime(2025, 1, 1)
+
+def synthetic(n: int, seed: int = 11):
+    rng = random.Random(seed)
+    out = synthetic_deps(n, seed)
+    for i, c in enumerate(out):
+        c["modality"] = rng.choice(MODALITIES)
+        c["article_id"] = f"Art {rng.randint(1, max(10, n // 200))}"
+        c["text"] = f"clause {i} " + "x" * rng.randint(0, 150)
+        c["formulas"] = {"deontic": f"O(c{i})"}
+        if rng.random() < 0.95:
+            c["updated"] = T0 + datetime.timedelta(seconds=rng.randint(0, 10 * n))
+    return out
+
+def rebuild(docs, q, limit):
+    # what the endpoint did per request: filter, sort by (updated, _id) desc, limit, match
+    rows = [d for d in docs.values() if all(d.get(f) == v for f, v in q.items())]
+    rows.sort(key=lambda d: (d.get("updated") is not None, d.get("updated") or 0, d["_id"]), reverse=True)
+    rows = rows[:limit] if limit else rows
+    return graph_payload(rows, dependency_edges(rows))
+
+def sliced(g, q, limit):
+    return graph_payload(*g.slice(q, limit))
+
+def queries(docs, rng, k):
+    sample = rng.sample(list(docs.values()), k)
+    out = []
+    for d in sample:
+        q = {}
+        if rng.random() < 0.4: q["modality"] = d["modality"]
+        if rng.random() < 0.4: q["article_id"] = d["article_id"]
+        if rng.random() < 0.3 and d.get("actor_canonical"): q["actor_canonical"] = d["actor_canonical"]
+        out.append((q, rng.choice([20, 100, 500])))
+    return out
+
+def mutate(docs, rng, pool, n):
+    """Edits like PUT /api/clause/{id} and re-derivations: new actor / object / condition / modality."""
+    for _ in range(n):
+        d = dict(rng.choice(list(docs.values())))
+        field = rng.choice(["actor", "actor_canonical", "object", "condition", "modality", "text"])
+        src = rng.choice(pool)
+        d[field] = src.get(field) if field != "text" else "edited " + str(rng.random())
+        if field == "condition" and rng.random() < 0.5:
+            d[field] = "where " + (rng.choice(pool).get("actor") or "nobody") + " applies"
+        d["updated"] = T0 + datetime.timedelta(days=3650, seconds=rng.randint(0, 10 ** 6))
+        docs[d["_id"]] = d
+        yield d
+
+def check(n: int, seed: int = 5):
+    rng = random.Random(seed)
+    docs = {d["_id"]: d for d in synthetic(n)}
+    pool = synthetic(200, seed=99)
+    g = GraphIndex()
+    g.load(list(docs.values()))
+    qs = queries(docs, rng, 40) + [({}, 100), ({}, 0)]
+    bad = sum(rebuild(docs, q, l) != sliced(g, q, l) for q, l in qs)
+    for d in mutate(docs, rng, pool, 300):
+        g.upsert(d)
+    # new clauses too
+    for k in range(50):
+        d = dict(rng.choice(pool), _id=f"new{k}", updated=T0 + datetime.timedelta(days=4000 + k))
+        docs[d["_id"]] = d
+        g.upsert(d)
+    qs = queries(docs, rng, 40) + [({}, 100), ({}, 0)]
+    bad += sum(rebuild(docs, q, l) != sliced(g, q, l) for q, l in qs)
+    return bad
+
+def timeit(fn, reps):
+    lat = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        lat.append(time.perf_counter() - t0)
+    return statistics.median(lat) * 1000
+
+def main(a):
+    bad = check(a.check_size)
+    print(f"correctness on {a.check_size} clauses (load + 350 upserts, 84 slices): "
+          f"{'identical' if not bad else f'{bad} MISMATCHES'}")
+    print(f"{'clauses':>8}{'load s':>8}{'upsert ms':>11}{'(mean)':>8}{'rebuild ms':>12}{'slice ms':>10}  (limit {a.limit}, p50)")
+    rng = random.Random(1)
+    for n in a.sizes:
+        docs = {d["_id"]: d for d in synthetic(n)}
+        g = GraphIndex()
+        t0 = time.perf_counter()
+        g.load(list(docs.values()))
+        t_load = time.perf_counter() - t0
+        qs = queries(docs, rng, 20)
+        t_rebuild = statistics.median(timeit(lambda: rebuild(docs, q, a.limit), 3) for q, _ in qs)
+        t_slice = statistics.median(timeit(lambda: sliced(g, q, a.limit), 5) for q, _ in qs)
+        ups = list(mutate(docs, rng, synthetic(200, seed=99), 200))
+        lat = [timeit(lambda u=u: g.upsert(u), 1) for u in ups]
+        t_up, t_up_mean = statistics.median(lat), statistics.mean(lat)
+        print(f"{n:>8}{t_load:>8.2f}{t_up:>11.2f}{t_up_mean:>8.2f}{t_rebuild:>12.1f}{t_slice:>10.2f}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--limit", type=int, default=100)
+    ap.add_argument("--check-size", type=int, default=3000)
+    main(ap.parse_args())
@@ -0,0 +1,131 @@
+"""
+Dense vs BM25 vs hybrid (RRF + article fast path) retrieval on the EU AI
+Act PDF, against the labelled questions in bench/data/ai_act_questions.jsonl
+(a chunk is relevant when it contains one of the question's phrases).
+
+Runs the real rag_retriever over a local vector index and a LexicalIndex
+built from the same chunk_records() ingest produces. Without an OpenAI
+key the dense side is an LSA embedder (TF-IDF + SVD): like a neural
+embedder it matches topics but blurs exact terms such as "Article 10(2)";
+pass --openai for the configured embedding model.
+
+    python bench/bench_hybrid.py
+    python bench/bench_hybrid.py --openai --k 6 20
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before graph imports
+
+import argparse, json, re, shutil, statistics, tempfile, time
+from collections import Counter
+import numpy as np
+from ingest.pdf_stream import iter_pages, iter_chunks
+from ingest.ingest_pdf import chunk_records
+from retrieval.lexical import LexicalIndex
+from retrieval.local_index import LocalVectorIndex
+import retrieval.hybrid as hybrid
+import retrieval.planner as planner
+from graph import nodes
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+class LsaEmbeddings:
+    """TF-IDF over the corpus, projected onto its top singular vectors."""
+
+    def __init__(self, texts, dim: int = 128):
+        docs = [Counter(re.findall(r"\w+", t.lower())) for t in texts]
+        self.vocab = {w: i for i, w in enumerate(sorted({w for d in docs for w in d}))}
+        df = np.zeros(len(self.vocab))
+        for d in docs:
+            df[[self.vocab[w] for w in d]] += 1
+        self.idf = np.log(len(docs) / df)
+        _, _, vt = np.linalg.svd(np.stack([self._tfidf(d) for d in docs]), full_matrices=False)
+        self.proj = vt[:dim].T
+
+    def _tfidf(self, counts):
+        v = np.zeros(len(self.vocab))
+        for w, c in counts.items():
+            if w in self.vocab:
+                v[self.vocab[w]] = (1 + np.log(c)) * self.idf[self.vocab[w]]
+        return v / (np.linalg.norm(v) or 1)
+
+    def embed_documents(self, texts):
+        return [(self._tfidf(Counter(re.findall(r"\w+", t.lower()))) @ self.proj).tolist() for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def norm(s: str) -> str:
+    return re.sub(r"\s+", " ", s).lower()
+
+def main(a):
+    records = list(chunk_records(iter_chunks(iter_pages(str(ROOT / "EU_AI_doc.pdf"))), "aiact", "eurlex:ai_act",
+                                 "OJ-2024-07-12", {}, {}))
+    texts = {r["id"]: norm(r["metadata"]["text"]) for r in records}
+    questions = [json.loads(l) for l in open(ROOT / "bench/data/ai_act_questions.jsonl", encoding="utf-8")]
+    for q in questions:
+        q["rel"] = {i for i, t in texts.items() if any(norm(p) in t for p in q["relevant"])}
+
+    if a.openai:
+        from utils.openai_client import get_embeddings
+        emb = get_embeddings()
+    else:
+        emb = LsaEmbeddings([r["metadata"]["text"] for r in records])
+    tmp = tempfile.mkdtemp(prefix="bench_hybrid_")
+    try:
+        vectors = LocalVectorIndex(f"{tmp}/vectors")
+        vecs = emb.embed_documents([r["metadata"]["text"] for r in records])
+        vectors.upsert([{**r, "values": v} for r, v in zip(records, vecs)])
+        lex = LexicalIndex(f"{tmp}/lexical.sqlite")
+        t0 = time.perf_counter()
+        lex.add(records)
+        len(lex)  # builds the snapshot
+        t_build = time.perf_counter() - t0
+        s = lex.stats()
+        print(f"{len(records)} chunks, {len(questions)} questions; BM25 index built in {t_build * 1000:.0f} ms, "
+              f"{s['terms']} terms, {s['postings']} postings, {s['bytes'] / 1024:.0f} KiB on disk\n")
+
+        qvecs = {q["question"]: emb.embed_query(q["question"]) for q in questions}
+        nodes.get_index = lambda *_, **__: vectors
+        hybrid.get_lexical_index = lambda *_, **__: lex
+        planner.QUERY_PLANNER = False  # unfiltered dense ranking, fixed k (bench/bench_planner.py covers the planner)
+
+        def retrieve(question, k, mode):
+            if mode == "bm25":
+                return [i for i, _ in lex.search(question, k)]
+            hybrid.HYBRID_RETRIEVAL = mode != "dense"
+            nodes.TOP_K = k
+            state = stubs.new_state(question)
+            state["_qvec"] = qvecs[question]
+            if mode == "hybrid (no article)":
+                articles_size, lex.articles_size = lex.articles_size, lambda *_a, **_k: 0
+            try:
+                return [c["chunk_id"] for c in nodes.rag_retriever(state)["contexts"]]
+            finally:
+                if mode == "hybrid (no article)":
+                    lex.articles_size = articles_size
+
+        modes = ["dense", "bm25", "hybrid (no article)", "hybrid"]
+        print(f"{'mode':<22}" + "".join(f"{f'recall@{k}':>11}{f'hit@{k}':>8}" for k in a.k) + f"{'p50 ms':>9}")
+        for mode in modes:
+            row, lat = f"{mode:<22}", []
+            for k in a.k:
+                rec, hit = [], 0
+                for q in questions:
+                    t0 = time.perf_counter()
+                    got = set(retrieve(q["question"], k, mode))
+                    lat.append(time.perf_counter() - t0)
+                    rec.append(len(got & q["rel"]) / len(q["rel"]))
+                    hit += bool(got & q["rel"])
+                row += f"{statistics.mean(rec):>11.3f}{hit / len(questions):>8.2f}"
+            print(row + f"{statistics.median(lat) * 1000:>9.2f}")
+        print("\n(p50 excludes query embedding; dense and hybrid include the local vector query)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--k", type=int, nargs="+", default=[6, 20])
+    ap.add_argument("--openai", action="store_true", help="embed with the configured OpenAI model")
+    main(ap.parse_args())
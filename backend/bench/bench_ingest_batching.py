@@ -0,0 +1,68 @@
+"""
+Per-chunk embed_query loop vs batched embed_and_upsert, against a fake
+embeddings client and index with simulated network latency.
+
+    python bench/bench_ingest_batching.py --chunks 600 --latency 0.08
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import argparse, time
+from ingest.embed_pipeline import embed_and_upsert
+
+DIM = 8
+
+class FakeEmbeddings:
+    def __init__(self, latency: float, per_text: float):
+        self.latency, self.per_text, self.calls = latency, per_text, 0
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency + self.per_text * len(texts))
+        return [[float(len(t) % 7)] * DIM for t in texts]
+
+class FakeIndex:
+    def __init__(self, latency: float):
+        self.latency, self.n = latency, 0
+
+    def upsert(self, vectors):
+        time.sleep(self.latency)
+        self.n += len(vectors)
+
+def _records(n):
+    return ({"id": f"doc:{i}", "metadata": {"text": f"Article {i % 113} chunk {i} " * 40}} for i in range(n))
+
+def per_chunk(n, emb, index):
+    vectors = [{**r, "values": emb.embed_query(r["metadata"]["text"])} for r in _records(n)]
+    for s in range(0, len(vectors), 100):
+        index.upsert(vectors=vectors[s:s+100])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=600)
+    ap.add_argument("--latency", type=float, default=0.08, help="seconds per embeddings call")
+    ap.add_argument("--per-text", type=float, default=0.0005, help="extra seconds per text in a call")
+    ap.add_argument("--upsert-latency", type=float, default=0.05)
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--concurrency", type=int, default=4)
+    a = ap.parse_args()
+
+    emb, idx = FakeEmbeddings(a.latency, a.per_text), FakeIndex(a.upsert_latency)
+    t0 = time.perf_counter()
+    per_chunk(a.chunks, emb, idx)
+    base = time.perf_counter() - t0
+    print(f"per-chunk  : {base:7.2f}s  embed calls={emb.calls:5d}  upserted={idx.n}")
+
+    emb, idx = FakeEmbeddings(a.latency, a.per_text), FakeIndex(a.upsert_latency)
+    t0 = time.perf_counter()
+    embed_and_upsert(_records(a.chunks), emb, idx, batch_size=a.batch_size, concurrency=a.concurrency)
+    batched = time.perf_counter() - t0
+    print(f"batched    : {batched:7.2f}s  embed calls={emb.calls:5d}  upserted={idx.n}"
+          f"  (batch={a.batch_size}, concurrency={a.concurrency})")
+    print(f"speedup    : {base / batched:7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Local vector index (retrieval/local_index.py): exact and IVF search vs an
+in-RAM brute-force baseline on clustered synthetic vectors. Reports
+upsert throughput (UPSERT_BATCH-sized batches, as ingest writes them),
+query p50 for rag_retriever's query (top_k=6 with metadata), and recall@6
+against brute force for each nprobe.
+
+    python bench/bench_local_index.py --sizes 10000 100000 --dim 256
+    python bench/bench_local_index.py --sizes 20000 --dim 3072     # text-embedding-3-large width
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import argparse, shutil, statistics, tempfile, time
+import numpy as np
+from ingest.embed_pipeline import UPSERT_BATCH
+from retrieval.local_index import LocalVectorIndex
+
+TOP_K = 6
+
+def synthetic(n: int, dim: int, clusters: int, seed: int = 0):
+    # chunks of one regulation are topically clustered, not uniform on the sphere
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    x = centers[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    q = x[rng.integers(0, n, 200)] + 0.4 * rng.normal(size=(200, dim)).astype(np.float32)
+    return x, q
+
+def normalize(a):
+    return a / np.linalg.norm(a, axis=-1, keepdims=True)
+
+def p50(fn, queries):
+    lat = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        lat.append(time.perf_counter() - t0)
+    return statistics.median(lat) * 1000
+
+def main(a):
+    print(f"{'vectors':>8}{'dim':>6}  {'search':<14}{'p50 ms':>8}{'recall@6':>10}")
+    for n in a.sizes:
+        x, queries = synthetic(n, a.dim, max(16, n // 500))
+        xn = normalize(x)
+        truth = [set(np.argsort(-(xn @ normalize(q)))[:TOP_K].tolist()) for q in queries]
+        path = tempfile.mkdtemp(prefix="bench_vectors_")
+        try:
+            ix = LocalVectorIndex(path)
+            t0 = time.perf_counter()
+            for s in range(0, n, UPSERT_BATCH):
+                ix.upsert([{"id": str(i), "values": x[i].tolist(),
+                            "metadata": {"text": f"chunk {i}", "article_id": f"Art {i % 113}"}}
+                           for i in range(s, min(n, s + UPSERT_BATCH))])
+            t_up = time.perf_counter() - t0
+            print(f"{n:>8}{a.dim:>6}  upsert {n / t_up:,.0f} vectors/s ({t_up:.1f} s)")
+
+            def recall(search):
+                got = [{int(m["id"]) for m in search(q)["matches"]} for q in queries]
+                return sum(len(g & t) for g, t in zip(got, truth)) / (TOP_K * len(truth))
+
+            def run(q):
+                return ix.query(vector=q.tolist(), top_k=TOP_K, include_metadata=True)
+
+            brute = p50(lambda q: np.argsort(-(xn @ normalize(q)))[:TOP_K], queries)
+            print(f"{'':>14}  {'brute (RAM)':<14}{brute:>8.2f}{1.0:>10.3f}")
+            print(f"{'':>14}  {'exact':<14}{p50(run, queries):>8.2f}{recall(run):>10.3f}")
+            t0 = time.perf_counter()
+            nlist = ix.build_ivf()
+            print(f"{'':>14}  ivf build: {nlist} lists in {time.perf_counter() - t0:.1f} s")
+            for nprobe in a.nprobe:
+                ix.nprobe = nprobe
+                print(f"{'':>14}  {f'ivf nprobe={nprobe}':<14}{p50(run, queries):>8.2f}{recall(run):>10.3f}")
+            ix.close()
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    main(ap.parse_args())
@@ -0,0 +1,103 @@
+"""
+API query latency and plans on a few hundred thousand synthetic clauses,
+before and after db.mongo.ensure_indexes(). Needs a real mongod (explain and
+$text are not emulated by in-memory fakes); it uses its own database and
+drops it afterwards. Without a reachable server it exits 2 and measures
+nothing (db/explain_check.py still runs its static index check offline).
+
+    python bench/bench_mongo_indexes.py --uri mongodb://localhost:27017 --clauses 300000
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before db/graph imports
+
+import argparse, datetime, random, statistics, time
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from db.mongo import ensure_indexes
+from db.explain_check import api_queries, check_plans, PING_TIMEOUT_MS
+from utils.hashing import sha1
+
+MODALITIES = ["OBLIGATION", "PROHIBITION", "PERMISSION", "EXEMPTION", "RECOMMENDATION"]
+ACTORS = ["providers", "deployers", "importers", "distributors", "notified bodies", "the Commission"]
+WORDS = ("risk management system data governance transparency human oversight accuracy robustness "
+         "cybersecurity conformity assessment registration post-market monitoring incident").split()
+
+def synthetic(i: int, rng: random.Random, now: datetime.datetime) -> dict:
+    art = f"Art {rng.randint(1, 113)}"
+    actor = rng.choice(ACTORS)
+    text = f"{art}: {actor} shall " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 40))) + f" #{i}"
+    chunk = f"doc{rng.randint(0, 50)}:{rng.randint(0, 600)}"
+    return {
+        "text": text, "text_hash": sha1(text), "article_id": art, "modality": rng.choice(MODALITIES),
+        "actor": actor, "actor_canonical": f"AI_Act.{actor.title().replace(' ', '')}",
+        "object": " ".join(rng.choice(WORDS) for _ in range(4)),
+        "condition": rng.choice([None, "where the system is placed on the market", "unless exempted"]),
+        "formulas": {"deontic": f"O({actor} -> act{i})"},
+        "provenance": {"chunk_ids": [chunk], "text_hashes": [sha1(chunk)], "source_version": "v1", "route": "OK"},
+        "updated": now - datetime.timedelta(seconds=i),
+    }
+
+def time_queries(colls, repeats: int) -> dict:
+    out = {}
+    for q in api_queries():
+        if "$text" in q["filter"] and not any("text" in ix.get("weights", {}) for ix in colls["clauses"].list_indexes()):
+            out[q["name"]] = None  # $text needs the text index
+            continue
+        lat = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            cur = colls[q["coll"]].find(q["filter"])
+            if q["sort"]:
+                cur = cur.sort(q["sort"])
+            list(cur.limit(q["limit"]))
+            lat.append(time.perf_counter() - t0)
+        out[q["name"]] = statistics.median(lat) * 1000
+    return out
+
+def main(a):
+    client = MongoClient(a.uri, serverSelectionTimeoutMS=PING_TIMEOUT_MS)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        print(f"no server at {a.uri} ({type(e).__name__}): nothing measured, index plans NOT checked")
+        return 2
+    db = client[a.db]
+    client.drop_database(a.db)
+    colls = {"clauses": db["clauses"], "chats": db["chats"]}
+    rng, now = random.Random(7), datetime.datetime.utcnow()
+    t0 = time.perf_counter()
+    for start in range(0, a.clauses, 10_000):
+        colls["clauses"].insert_many([synthetic(i, rng, now) for i in range(start, min(start + 10_000, a.clauses))])
+    colls["chats"].insert_many([{"thread_id": f"t{i % 5000}", "created": now, "role": "user", "content": "q"}
+                                for i in range(a.clauses // 4)])
+    print(f"inserted {a.clauses} clauses in {time.perf_counter() - t0:.1f}s")
+
+    before = time_queries(colls, a.repeats)
+    t0 = time.perf_counter()
+    ensure_indexes(colls["clauses"], colls["chats"])
+    print(f"ensure_indexes: {time.perf_counter() - t0:.1f}s (second call: ", end="")
+    t0 = time.perf_counter()
+    ensure_indexes(colls["clauses"], colls["chats"])
+    print(f"{(time.perf_counter() - t0) * 1000:.0f} ms)")
+    after = time_queries(colls, a.repeats)
+    plans = {r["name"]: r for r in check_plans(colls)}
+
+    print(f"{'query':<32}{'before ms':>11}{'after ms':>10}  plan")
+    for name, ms in after.items():
+        b = f"{before[name]:.1f}" if before[name] is not None else "n/a"
+        p = plans[name]
+        print(f"{name:<32}{b:>11}{ms:>10.1f}  {'ok' if p['ok'] else 'COLLSCAN'} {' > '.join(p['stages'])}")
+    if not a.keep:
+        client.drop_database(a.db)
+    return 0 if all(p["ok"] for p in plans.values()) else 1
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--uri", default="mongodb://localhost:27017")
+    ap.add_argument("--db", default="deontic_index_bench")
+    ap.add_argument("--clauses", type=int, default=300_000)
+    ap.add_argument("--repeats", type=int, default=5)
+    ap.add_argument("--keep", action="store_true", help="keep the benchmark database")
+    sys.exit(main(ap.parse_args()))
@@ -0,0 +1,49 @@
+"""
+Multi-clause fan-out vs the single-clause path: clauses derived, LLM calls
+and latency per answer, against the stub model. The segmenter stub returns
+--clauses clauses per question.
+
+    python bench/bench_multi_clause.py --clauses 4 --latency 0.1
+    python bench/bench_multi_clause.py --clauses 8 --concurrency 2
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before graph imports
+
+import argparse, asyncio, statistics, time
+from graph import prompts as P
+import graph.app as app
+
+async def run(multi: bool, n: int, k: int, latency: float):
+    s = stubs.install(chat_latency=latency, embed_latency=latency / 4, index_latency=latency / 4)
+    items = [{"text": t, "article_id": a} for a, t in stubs.PASSAGES]
+    seg = {"clauses": [items[i % len(items)] for i in range(k)]}
+    s.chat.replies = [(p, seg if p == P.SEGMENTER_PROMPT else r) for p, r in s.chat.replies]
+    lat, derived = [], 0
+    for i in range(n):
+        state = stubs.new_state(f"question {i}", f"t{i}")
+        state["_multi"] = multi
+        t0 = time.perf_counter()
+        state = await app.arun_once(state)
+        lat.append(time.perf_counter() - t0)
+        derived += len(state.get("_clause_results") or [1])
+    return {"clauses": derived / n, "calls": s.chat.calls / n, "p50_ms": statistics.median(lat) * 1000}
+
+async def main_async(a):
+    app.MULTI_CLAUSE_CONCURRENCY = a.concurrency
+    single = await run(False, a.questions, a.clauses, a.latency)
+    multi = await run(True, a.questions, a.clauses, a.latency)
+    print(f"{'mode':<8}{'clauses':>9}{'calls/ans':>11}{'p50 ms':>9}")
+    for name, r in (("single", single), ("multi", multi)):
+        print(f"{name:<8}{r['clauses']:>9.1f}{r['calls']:>11.1f}{r['p50_ms']:>9.0f}")
+    print(f"multi/single latency {multi['p50_ms'] / single['p50_ms']:.2f}x "
+          f"(sequential would be ~{multi['clauses']:.0f}x the derivation time)")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--questions", type=int, default=10)
+    ap.add_argument("--clauses", type=int, default=4, help="clauses returned by the segmenter stub")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--latency", type=float, default=0.1, help="seconds per stubbed LLM call")
+    asyncio.run(main_async(ap.parse_args()))
@@ -0,0 +1,45 @@
+"""
+Checks that the streaming page-wise chunker yields exactly the chunks of
+pdf_to_text() + split_text(), and compares time and peak Python memory.
+
+    python bench/bench_pdf_stream.py ./EU_AI_doc.pdf
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import hashlib, time, tracemalloc
+from ingest.pdf_stream import iter_pages, iter_chunks
+from ingest.text_utils import legal_text_splitter
+
+def _digest(texts):
+    # fold chunks into a running hash so the consumer itself holds nothing
+    h, n = hashlib.sha1(), 0
+    for t in texts:
+        h.update(t.encode("utf-8") + b"\0")
+        n += 1
+    return n, h.hexdigest()
+
+def batch_chunks(pdf):
+    raw = "\n".join(text for _, text in iter_pages(pdf))
+    return _digest(legal_text_splitter().split_text(raw))
+
+def stream_chunks(pdf):
+    return _digest(c["text"] for c in iter_chunks(iter_pages(pdf)))
+
+def measure(fn, pdf):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    res = fn(pdf)
+    dt = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, dt, peak
+
+if __name__ == "__main__":
+    pdf = sys.argv[1] if len(sys.argv) > 1 else "./EU_AI_doc.pdf"
+    ref, t_ref, m_ref = measure(batch_chunks, pdf)
+    got, t_got, m_got = measure(stream_chunks, pdf)
+    print(f"non-streaming : {ref[0]:5d} chunks  {t_ref:6.2f}s  peak {m_ref / 1e6:7.2f} MB")
+    print(f"streaming     : {got[0]:5d} chunks  {t_got:6.2f}s  peak {m_got / 1e6:7.2f} MB")
+    print("identical     :", ref == got)
+    sys.exit(0 if ref == got else 1)
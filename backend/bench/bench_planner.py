@@ -0,0 +1,105 @@
+"""
+Query planner (retrieval/planner.py) on vs off, on the EU AI Act PDF
+ingested twice, as a draft and as the Official Journal version, with the
+labelled questions in bench/data/ai_act_questions.jsonl asked against
+the OJ version (payload source_version). A chunk is relevant when it is
+from the OJ version and contains one of the question's phrases.
+
+Reports, per retrieval mode: recall over the returned contexts, hit@2
+(a relevant chunk among the two the segmenter reads), the share of
+contexts from the other version, contexts per question and the context
+tokens of the segmenter (contexts[:2]) and answer composer (all
+contexts) prompts. Then the local index's filtered query with and
+without the facet postings.
+
+    python bench/bench_planner.py
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before graph imports
+
+import json, shutil, statistics, tempfile, time
+from ingest.pdf_stream import iter_pages, iter_chunks
+from ingest.ingest_pdf import chunk_records
+from retrieval.lexical import LexicalIndex
+from retrieval.local_index import LocalVectorIndex
+import retrieval.hybrid as hybrid
+import retrieval.planner as planner
+from graph import nodes
+from bench.bench_hybrid import LsaEmbeddings, norm
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+VERSIONS = ("2024-draft", "OJ-2024-07-12")
+TARGET = VERSIONS[1]
+
+def main():
+    chunks = list(iter_chunks(iter_pages(str(ROOT / "EU_AI_doc.pdf"))))
+    records = [r for v in VERSIONS for r in chunk_records(chunks, f"aiact-{v}", "eurlex:ai_act", v, {}, {})]
+    texts = {r["id"]: norm(r["metadata"]["text"]) for r in records if r["metadata"]["source_version"] == TARGET}
+    questions = [json.loads(l) for l in open(ROOT / "bench/data/ai_act_questions.jsonl", encoding="utf-8")]
+    for q in questions:
+        q["rel"] = {i for i, t in texts.items() if any(norm(p) in t for p in q["relevant"])}
+    version = {r["id"]: r["metadata"]["source_version"] for r in records}
+
+    emb = LsaEmbeddings([r["metadata"]["text"] for r in records])
+    tmp = tempfile.mkdtemp(prefix="bench_planner_")
+    try:
+        vectors = LocalVectorIndex(f"{tmp}/vectors")
+        vectors.upsert([{**r, "values": v} for r, v in zip(records, emb.embed_documents(
+            [r["metadata"]["text"] for r in records]))])
+        lex = LexicalIndex(f"{tmp}/lexical.sqlite")
+        lex.add(records)
+        stubs.install()  # no-op Mongo for the planner's source catalog
+        nodes.get_index = lambda *_, **__: vectors
+        hybrid.get_lexical_index = lambda *_, **__: lex
+        qvecs = {q["question"]: emb.embed_query(q["question"]) for q in questions}
+        print(f"{len(records)} chunks ({len(chunks)} per version), {len(questions)} questions, "
+              f"{sum(bool(planner.question_articles(q['question'])) for q in questions)} naming an article\n")
+
+        def retrieve(question, use_planner, use_hybrid):
+            planner.QUERY_PLANNER, hybrid.HYBRID_RETRIEVAL = use_planner, use_hybrid
+            state = stubs.new_state(question)
+            state["_source_version"] = TARGET
+            state["_qvec"] = qvecs[question]
+            t0 = time.perf_counter()
+            ctx = nodes.rag_retriever(state)["contexts"]
+            return ctx, time.perf_counter() - t0, state["_plan"]
+
+        print(f"{'mode':<18}{'recall':>8}{'hit@2':>7}{'other ver':>11}{'contexts':>10}"
+              f"{'segment tok':>13}{'answer tok':>12}{'p50 ms':>8}")
+        for use_hybrid in (False, True):
+            for use_planner in (False, True):
+                rec, hit, other, n, seg, ans, lat, relaxed = [], 0, 0, 0, [], [], [], 0
+                for q in questions:
+                    ctx, dt, plan = retrieve(q["question"], use_planner, use_hybrid)
+                    ids = [c["chunk_id"] for c in ctx]
+                    rec.append(len(set(ids) & q["rel"]) / len(q["rel"]))
+                    hit += bool(set(ids[:2]) & q["rel"])
+                    other += sum(version[i] != TARGET for i in ids)
+                    n += len(ids)
+                    seg.append(stubs.count_tokens("\n\n".join(c["text"] for c in ctx[:2])))
+                    ans.append(stubs.count_tokens(json.dumps(ctx, ensure_ascii=False)))
+                    lat.append(dt)
+                    relaxed += plan["relaxed"]
+                mode = f"{'hybrid' if use_hybrid else 'dense'} {'planned' if use_planner else 'plain'}"
+                print(f"{mode:<18}{statistics.mean(rec):>8.3f}{hit / len(questions):>7.2f}"
+                      f"{other / n:>11.1%}{n / len(questions):>10.1f}{statistics.mean(seg):>13.0f}"
+                      f"{statistics.mean(ans):>12.0f}{statistics.median(lat) * 1000:>8.2f}"
+                      + (f"   ({relaxed} relaxed)" if relaxed else ""))
+
+        flt = {"source_version": {"$eq": TARGET}, "article_nums": {"$in": ["9"]}}
+        q = qvecs[questions[0]["question"]]
+        for name, f in (("facet postings", flt), ("scan (no facets)", {"$and": [flt]})):
+            lat = []
+            for _ in range(50):
+                t0 = time.perf_counter()
+                vectors.query(vector=q, top_k=3, include_metadata=True, filter=f)
+                lat.append(time.perf_counter() - t0)
+            print(f"\nlocal filtered query, {name}: p50 {statistics.median(lat) * 1000:.2f} ms", end="")
+        print()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
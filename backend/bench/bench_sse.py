@@ -0,0 +1,50 @@
+"""
+Time to first byte of /api/chat/stream vs the full /api/chat response,
+against the stub backends. Also checks the streamed answer tokens and the
+final event against the plain JSON response.
+
+    python bench/bench_sse.py --latency 0.1
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before graph imports
+
+import argparse, asyncio, statistics, time
+import main
+
+async def run(n: int):
+    first, first_token, total, plain = [], [], [], []
+    for i in range(n):
+        payload = {"question": f"question {i}", "thread_id": f"t{i}"}
+        t0 = time.perf_counter()
+        tokens, events, final = [], [], None
+        async for event, data in main.chat_events(payload):
+            if not events:
+                first.append(time.perf_counter() - t0)
+            if event == "token" and not tokens:
+                first_token.append(time.perf_counter() - t0)
+            events.append(event)
+            if event == "token":
+                tokens.append(data["text"])
+            if event == "final":
+                final = data
+        total.append(time.perf_counter() - t0)
+        assert final and "".join(tokens) == final["answer"], "streamed tokens differ from the final answer"
+
+        t0 = time.perf_counter()
+        state = await main.arun_once(main._chat_state(payload))
+        plain.append(time.perf_counter() - t0)
+        assert set(main.chat_response(state)) == set(final)
+    print("events:", " ".join(dict.fromkeys(events)))
+    ms = lambda xs: statistics.median(xs) * 1000
+    print(f"stream: first event {ms(first):.0f} ms, first token {ms(first_token):.0f} ms, done {ms(total):.0f} ms")
+    print(f"/api/chat: response {ms(plain):.0f} ms  -> time to first byte {ms(plain) / ms(first):.1f}x lower")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--questions", type=int, default=5)
+    ap.add_argument("--latency", type=float, default=0.1, help="seconds per stubbed LLM call")
+    a = ap.parse_args()
+    stubs.install(chat_latency=a.latency, embed_latency=a.latency / 4, index_latency=a.latency / 4)
+    asyncio.run(run(a.questions))
@@ -0,0 +1,53 @@
+"""
+Per-stage timeline of one chat request against stubbed backends, showing
+definitions and xref overlapping, plus end-to-end latency for the DAG
+pipeline vs running the same stages strictly one after another.
+
+    python bench/bench_stage_overlap.py --latency 0.2
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before graph imports
+
+import argparse, asyncio, time
+from graph.app import arun_once, CLAUSE_STAGES, RETRIEVED
+from graph.dag import without
+
+def timeline(timings, scale_ms: float):
+    for name, t in sorted(timings.items(), key=lambda kv: kv[1]["start_ms"]):
+        a, b = int(t["start_ms"] / scale_ms), int(t["end_ms"] / scale_ms)
+        print(f"  {name:<16}{t['start_ms']:8.0f} -> {t['end_ms']:6.0f} ms  " + " " * a + "#" * max(b - a, 1))
+
+async def main_async(a):
+    import graph.app as app
+
+    stubs.install(chat_latency=a.latency, embed_latency=a.latency / 4, index_latency=a.latency / 4)
+    t0 = time.perf_counter()
+    state = await arun_once(stubs.new_state("What must providers of high-risk AI systems ensure?"))
+    dag = time.perf_counter() - t0
+    print(f"DAG pipeline: {dag * 1000:.0f} ms")
+    timeline(state["_timings"], a.latency * 1000 / 10)
+
+    # same stages, each depending on the previous one; arun_once reads the stage
+    # lists graph/app.py derives from CLAUSE_STAGES at import, so patch those
+    chain, prev = [], ()
+    for s in CLAUSE_STAGES:
+        chain.append(s._replace(deps=prev))
+        prev = (s.name,)
+    saved = app.RETRIEVE_STAGES, app.FALLBACK_STAGES
+    app.RETRIEVE_STAGES, app.FALLBACK_STAGES = chain[:len(RETRIEVED)], without(chain, RETRIEVED)
+    try:
+        stubs.install(chat_latency=a.latency, embed_latency=a.latency / 4, index_latency=a.latency / 4)
+        t0 = time.perf_counter()
+        state = await app.arun_once(stubs.new_state("What must providers of high-risk AI systems ensure?"))
+        seq = time.perf_counter() - t0
+    finally:
+        app.RETRIEVE_STAGES, app.FALLBACK_STAGES = saved
+    print(f"\nsequential  : {seq * 1000:.0f} ms   saved {(seq - dag) * 1000:.0f} ms per request")
+    timeline(state["_timings"], a.latency * 1000 / 10)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--latency", type=float, default=0.2, help="seconds per stubbed LLM call")
+    asyncio.run(main_async(ap.parse_args()))
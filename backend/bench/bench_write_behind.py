@@ -0,0 +1,66 @@
+"""
+Inline Mongo writes (WRITE_BEHIND=0) vs the write-behind queue (db/write_behind.py): time the
+"persist" stage adds to each request and Mongo round trips, at increasing
+concurrency, against stub collections with a fixed round-trip latency.
+
+    python bench/bench_write_behind.py --mongo-latency 0.005 --requests 200
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bench import stubs  # sets placeholder env before graph imports
+
+import argparse, asyncio, statistics, threading, time
+import db.write_behind as wb
+from graph import nodes
+from graph.app import arun_once
+
+class CountingCollection(stubs.StubCollection):
+    def __init__(self, latency):
+        super().__init__(latency)
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def _write(self, n=1):
+        time.sleep(self.latency)
+        with self._lock:  # inline mode writes from many threads
+            self.round_trips += 1
+            self.writes += n
+
+async def run(enabled: bool, n: int, concurrency: int, mongo_latency: float):
+    stubs.install(chat_latency=0.02, embed_latency=0.005, index_latency=0.005)
+    nodes.chats, nodes.clauses = CountingCollection(mongo_latency), CountingCollection(mongo_latency)
+    wb._WRITER = wb.WriteBehind(enabled=enabled)
+    sem, persist_ms = asyncio.Semaphore(concurrency), []
+
+    async def one(i):
+        async with sem:
+            st = await arun_once(stubs.new_state(f"question {i}", f"t{i}"))
+            t = st["_timings"]["persist"]
+            persist_ms.append(t["end_ms"] - t["start_ms"])
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - t0
+    wb._WRITER.close()
+    return {
+        "persist_p50": statistics.median(persist_ms),
+        "rps": n / elapsed,
+        "round_trips": nodes.chats.round_trips + nodes.clauses.round_trips,
+        "writes": nodes.chats.writes + nodes.clauses.writes,
+    }
+
+async def main_async(a):
+    print(f"{'mode':<14}{'conc':>6}{'persist p50 ms':>16}{'req/s':>8}{'round trips':>13}{'docs':>7}")
+    for conc in a.concurrency:
+        for enabled in (False, True):
+            r = await run(enabled, a.requests, conc, a.mongo_latency)
+            name = "write-behind" if enabled else "inline"
+            print(f"{name:<14}{conc:>6}{r['persist_p50']:>16.1f}{r['rps']:>8.1f}{r['round_trips']:>13}{r['writes']:>7}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    ap.add_argument("--mongo-latency", type=float, default=0.005, help="seconds per Mongo round trip")
+    asyncio.run(main_async(ap.parse_args()))
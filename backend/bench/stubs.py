@@ -0,0 +1,204 @@
+"""
+Stub backends for pipeline benchmarks: a canned-JSON chat model, a hashing
+embedder, an in-memory index and no-op Mongo collections, each with
+simulated latency. Import this module before anything from graph/ or main.
+"""
+import os
+for _k, _v in {
+    "OPENAI_API_KEY": "stub", "MONGODB_URI": "mongodb://localhost:1", "MONGODB_DB": "bench",
+    "MONGODB_COLL_DOCS": "docs", "MONGODB_COLL_CLAUSES": "clauses", "MONGODB_COLL_CHATS": "chats",
+    "EMBEDDINGS_MODEL": "stub-embeddings", "CHAT_MODEL": "stub-chat",
+    "PINECONE_API_KEY": "stub", "PINECONE_INDEX": "stub", "EMBED_CACHE": "0", "ANSWER_CACHE": "0",
+    "LLM_MEMO": "0", "CLAUSE_LOOKUP": "0", "HYBRID_RETRIEVAL": "0",
+}.items():
+    os.environ.setdefault(_k, _v)
+
+import asyncio, hashlib, json, threading, time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from utils.tokens import count_tokens
+
+PASSAGES = [
+    ("Article 9", "Article 9 Risk management system 1. A risk management system shall be established, "
+                  "implemented, documented and maintained in relation to high-risk AI systems."),
+    ("Article 10", "Article 10 Data and data governance 2. Training, validation and testing data sets shall be "
+                   "subject to data governance and management practices appropriate for the intended purpose."),
+    ("Article 13", "Article 13 Transparency 1. High-risk AI systems shall be designed and developed in such a way "
+                   "as to ensure that their operation is sufficiently transparent to enable deployers to interpret "
+                   "a system's output and use it appropriately."),
+    ("Article 16", "Article 16 Obligations of providers of high-risk AI systems. Providers of high-risk AI systems "
+                   "shall ensure that their high-risk AI systems are compliant with the requirements set out in "
+                   "Section 2, where the system is placed on the market."),
+    ("Article 26", "Article 26 Obligations of deployers of high-risk AI systems 1. Deployers shall take appropriate "
+                   "technical and organisational measures to ensure they use such systems in accordance with the "
+                   "instructions for use accompanying the systems."),
+    ("Article 5", "Article 5 Prohibited AI practices 1. The following AI practices shall be prohibited: the placing "
+                  "on the market of an AI system that deploys subliminal techniques beyond a person's consciousness."),
+]
+
+def _prompt_replies() -> List[Any]:
+    from graph import prompts as P
+    clause = {"text": PASSAGES[3][1], "article_id": "Art 16"}
+    return [
+        (P.SEGMENTER_PROMPT, {"clauses": [clause, {"text": PASSAGES[4][1], "article_id": "Art 26(1)"}]}),
+        (P.CLASSIFIER_PROMPT, {"modality": "OBLIGATION", "actor": "providers", "action_verb": "ensure",
+                               "object": "compliance of high-risk AI systems", "condition": "placed on the market",
+                               "exceptions": [], "scope": {}, "confidence": 0.92}),
+        (P.DEFINITIONS_PROMPT, {"actor_canonical": "AI_Act.Provider",
+                                "definition_hits": [{"term": "provider", "article": "Art 3(3)"}], "notes": ""}),
+        (P.XREF_PROMPT, {"xref_links": [{"target": "Chapter III Section 2", "type": "subject_to"}],
+                         "imported_conditions": [], "notes": ""}),
+        (P.FORMALIZER_PROMPT, {"formula": "O(provider -> ensure[compliance] & placed on market)", "confidence": 0.9}),
+        (P.VALIDATOR_PROMPT, {"pass": True, "retriable": False, "errors": [], "confidence": 0.9}),
+        (P.AMBIGUITY_PROMPT, {"route": "ACCEPT_LOW_CONF", "reason": "stub"}),
+        (P.ANSWER_PROMPT, {"answer": "• **OBLIGATION** for providers: ensure compliance (Art 16)."}),
+        (P.FUSED_PROMPT, {"clauses": [{
+            **clause, "modality": "OBLIGATION", "actor": "providers", "actor_canonical": "AI_Act.Provider",
+            "action_verb": "ensure", "object": "compliance of high-risk AI systems",
+            "condition": "placed on the market", "exceptions": [], "scope": {},
+            "definition_hits": [{"term": "provider", "article": "Art 3(3)"}],
+            "xref_links": [{"target": "Chapter III Section 2", "type": "subject_to"}], "imported_conditions": [],
+            "formula": "O(provider -> ensure[compliance] & placed on market)", "confidence": 0.9,
+        }]}),
+    ]
+
+class StubChat:
+    """Answers by recognising which prompt from graph/prompts.py opens the message."""
+
+    def __init__(self, latency: float = 0.05, replies: List[Any] = None):
+        self.latency = latency
+        self.replies = replies if replies is not None else _prompt_replies()
+        self.calls = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self._lock = threading.Lock()
+
+    def reply_for(self, msg: str) -> Dict[str, Any]:
+        for prompt, reply in self.replies:
+            if msg.startswith(prompt):
+                return reply
+        return {}
+
+    def _reply(self, messages):
+        msg = messages[-1][1] if isinstance(messages[-1], tuple) else messages[-1].content
+        out = json.dumps(self.reply_for(msg))
+        with self._lock:
+            self.calls += 1
+            self.tokens_in += count_tokens(msg)
+            self.tokens_out += count_tokens(out)
+        return SimpleNamespace(content=out)
+
+    def invoke(self, messages, **_):
+        time.sleep(self.latency)
+        return self._reply(messages)
+
+    async def ainvoke(self, messages, **_):
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
+
+    async def astream(self, messages, pieces: int = 8, **_):
+        # first piece after ~1/pieces of the latency, like a streamed completion
+        text = self._reply(messages).content
+        step = max(1, -(-len(text) // pieces))
+        for i in range(0, len(text), step):
+            await asyncio.sleep(self.latency / pieces)
+            yield SimpleNamespace(content=text[i:i + step])
+
+class StubEmbeddings:
+    def __init__(self, latency: float = 0.02, dim: int = 64):
+        self.latency, self.dim, self.calls = latency, dim, 0
+
+    def _vec(self, text: str) -> List[float]:
+        h = hashlib.sha256(text.encode("utf-8")).digest()
+        return [(h[i % len(h)] - 128) / 128.0 for i in range(self.dim)]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self._vec(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return [self._vec(t) for t in texts]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+class StubIndex:
+    def __init__(self, latency: float = 0.03):
+        self.latency, self.calls = latency, 0
+
+    def query(self, vector=None, top_k=6, include_metadata=True, **_):
+        self.calls += 1
+        time.sleep(self.latency)
+        matches = []
+        for i, (art, text) in enumerate(PASSAGES[:top_k]):
+            matches.append({
+                "id": f"stubdoc:{i}",
+                "score": 0.9 - i * 0.05,
+                "metadata": {"text": text, "article_id": art, "source_uri": "stub:eu_ai_act",
+                             "source_version": "stub", "doc_id": "stubdoc", "chunk_id": f"stubdoc:{i}",
+                             "text_hash": hashlib.sha1(text.encode("utf-8")).hexdigest()},
+            })
+        return {"matches": matches}
+
+class StubCursor(list):
+    def limit(self, n): return StubCursor(self[:n]) if n else self
+    def sort(self, *a, **k): return self
+
+class StubCollection:
+    """Accepts writes and answers reads with nothing, after a small delay."""
+
+    def __init__(self, latency: float = 0.005):
+        self.latency, self.writes = latency, 0
+
+    def _write(self, n=1):
+        time.sleep(self.latency)
+        self.writes += n
+        return SimpleNamespace(upserted_id=None, inserted_ids=[], modified_count=0)
+
+    def insert_one(self, *a, **k): return self._write()
+    def insert_many(self, docs, *a, **k): return self._write(len(docs))
+    def update_one(self, *a, **k): return self._write()
+    def bulk_write(self, ops, *a, **k): return self._write(len(ops))
+    def find_one(self, *a, **k):
+        time.sleep(self.latency)
+        return None
+    def find(self, *a, **k):
+        time.sleep(self.latency)
+        return StubCursor()
+    def aggregate(self, *a, **k):
+        time.sleep(self.latency)
+        return iter(())
+
+def install(chat_latency: float = 0.05, embed_latency: float = 0.02, index_latency: float = 0.03,
+            mongo_latency: float = 0.005) -> SimpleNamespace:
+    """Points graph.nodes at fresh stubs and returns them."""
+    from graph import nodes
+    import db.mongo
+    stubs = SimpleNamespace(
+        chat=StubChat(chat_latency),
+        emb=StubEmbeddings(embed_latency),
+        index=StubIndex(index_latency),
+        chats=StubCollection(mongo_latency),
+        clauses=StubCollection(mongo_latency),
+        docs=StubCollection(mongo_latency),
+    )
+    nodes.get_chat = lambda *a, **k: stubs.chat
+    nodes.get_embeddings = lambda *a, **k: stubs.emb
+    nodes.get_index = lambda *a, **k: stubs.index
+    nodes.chats = stubs.chats
+    nodes.clauses = stubs.clauses
+    db.mongo.docs = stubs.docs
+    return stubs
+
+def new_state(question: str, thread_id: str = "bench") -> Dict[str, Any]:
+    return {
+        "thread_id": thread_id, "messages": [], "query": question, "contexts": [],
+        "working_clause": None, "retries": {}, "answer": None, "citations": [],
+    }
@@ -0,0 +1,154 @@
+"""
+Explains the queries behind the API against MONGODB_URI and fails if any
+winning plan is a collection scan.
+
+Before that, and without a server, it checks statically that every query
+has a candidate in db/mongo.py's indexes: a text index for $text, else an
+index whose leading field the filter constrains or the sort starts with.
+That is only a necessary condition. The winning plan is what proves it, so
+with no server reachable the script says so and exits 2.
+
+    python db/explain_check.py    # 0 ok, 1 COLLSCAN / no candidate, 2 plans not checked
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import datetime
+from typing import Any, Dict, List, Optional, Set
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from db.queries import clauses_filter, graph_filter, after_cursor, encode_cursor, CLAUSES_SORT
+from graph.clause_lookup import lookup_filter
+
+def plan_stages(plan: Any) -> Set[str]:
+    """Every stage name in an explain() winning plan (classic or SBE layout)."""
+    out: Set[str] = set()
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            out.add(plan["stage"])
+        for v in plan.values():
+            out |= plan_stages(v)
+    elif isinstance(plan, list):
+        for v in plan:
+            out |= plan_stages(v)
+    return out
+
+PING_TIMEOUT_MS = 3000
+
+def constrained_fields(flt: Dict[str, Any]) -> Set[str]:
+    """Fields every document matching `flt` is constrained on ($and: any branch, $or: all branches)."""
+    out: Set[str] = set()
+    for k, v in flt.items():
+        if k == "$and":
+            for f in v:
+                out |= constrained_fields(f)
+        elif k == "$or":
+            out |= set.intersection(*(constrained_fields(f) for f in v)) if v else set()
+        elif not k.startswith("$"):
+            out.add(k)
+    return out
+
+def _filter_index(flt: Dict[str, Any], keys: List[Any]) -> Optional[str]:
+    fields = constrained_fields(flt)
+
+    def prefix(key):  # leading index fields the filter constrains
+        return next((i for i, (f, d) in enumerate(key) if f not in fields or d == "text"), len(key))
+
+    best = max(keys, key=lambda nk: prefix(nk[1]), default=None)
+    if best and prefix(best[1]):
+        return best[0]
+    # an $or is served by one index scan per branch
+    ors = [f["$or"] for f in [flt, *flt.get("$and", [])] if f.get("$or")]
+    for branches in ors:
+        names = [_filter_index(b, keys) for b in branches]
+        if all(names):
+            return " | ".join(dict.fromkeys(names))
+    return None
+
+def index_candidate(q: Dict[str, Any], indexes: List[Any]) -> Optional[str]:
+    """Name of an index the planner could use for query `q` instead of a collection scan, or None."""
+    keys = [(m.document["name"], list(m.document["key"].items())) for m in indexes]
+    if "$text" in q["filter"]:
+        return next((n for n, key in keys if any(d == "text" for _, d in key)), None)
+    first_sort = q["sort"][0][0] if q["sort"] else None
+    # else a full scan of an index in sort order
+    return _filter_index(q["filter"], keys) or next((n for n, key in keys if key[0][0] == first_sort), None)
+
+def static_check(indexes: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """index_candidate() for each API query; `indexes` maps "clauses"/"chats" to IndexModels."""
+    out = []
+    for q in api_queries():
+        name = index_candidate(q, indexes[q["coll"]])
+        out.append({"name": q["name"], "index": name, "ok": name is not None})
+    return out
+
+def api_queries() -> List[Dict[str, Any]]:
+    """(name, collection, filter, sort, limit) for each read path, with sample values."""
+    ctx = {"chunk_id": "doc:0", "text_hash": "0" * 40, "source_version": "v1"}
+    page = encode_cursor({"_id": ObjectId(), "updated": datetime.datetime.utcnow()})
+    return [
+        {"name": "/api/clauses", "coll": "clauses", "filter": clauses_filter(), "sort": CLAUSES_SORT, "limit": 30},
+        {"name": "/api/clauses?modality", "coll": "clauses", "filter": clauses_filter(modality="OBLIGATION"),
+         "sort": CLAUSES_SORT, "limit": 30},
+        {"name": "/api/clauses?article", "coll": "clauses", "filter": clauses_filter(article="Art 16"),
+         "sort": CLAUSES_SORT, "limit": 30},
+        {"name": "/api/clauses?actor", "coll": "clauses", "filter": clauses_filter(actor="providers"),
+         "sort": CLAUSES_SORT, "limit": 30},
+        {"name": "/api/clauses?modality&article", "coll": "clauses",
+         "filter": clauses_filter(modality="OBLIGATION", article="Art 16"), "sort": CLAUSES_SORT, "limit": 30},
+        {"name": "/api/clauses?search", "coll": "clauses", "filter": clauses_filter(search="risk management"),
+         "sort": CLAUSES_SORT, "limit": 30},
+        {"name": "/api/clauses?cursor", "coll": "clauses", "filter": after_cursor(clauses_filter(), page),
+         "sort": CLAUSES_SORT, "limit": 30},
+        {"name": "/api/clauses?modality&cursor", "coll": "clauses",
+         "filter": after_cursor(clauses_filter(modality="OBLIGATION"), page), "sort": CLAUSES_SORT, "limit": 30},
+        {"name": "/api/clauses/export?modality", "coll": "clauses", "filter": clauses_filter(modality="OBLIGATION"),
+         "sort": None, "limit": 0},
+        {"name": "/api/graph", "coll": "clauses", "filter": graph_filter(), "sort": CLAUSES_SORT, "limit": 100},
+        {"name": "/api/graph?actor", "coll": "clauses", "filter": graph_filter(actor="AI_Act.Provider"),
+         "sort": CLAUSES_SORT, "limit": 100},
+        {"name": "clause upsert", "coll": "clauses", "filter": {"text_hash": "0" * 40, "article_id": "Art 16"},
+         "sort": None, "limit": 1},
+        {"name": "clause_lookup", "coll": "clauses", "filter": lookup_filter(ctx), "sort": [("updated", -1)],
+         "limit": 5},
+        {"name": "chat history", "coll": "chats", "filter": {"thread_id": "default"}, "sort": [("created", 1)],
+         "limit": 50},
+    ]
+
+def check_plans(colls: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Explains each API query; `colls` maps "clauses"/"chats" to collections."""
+    out = []
+    for q in api_queries():
+        cur = colls[q["coll"]].find(q["filter"])
+        if q["sort"]:
+            cur = cur.sort(q["sort"])
+        plan = cur.limit(q["limit"]).explain().get("queryPlanner", {}).get("winningPlan", {})
+        stages = plan_stages(plan)
+        out.append({"name": q["name"], "stages": sorted(stages), "ok": "COLLSCAN" not in stages})
+    return out
+
+def print_static(results: List[Dict[str, Any]]):
+    for r in results:
+        print(f"{'index' if r['ok'] else 'NO INDEX'} {r['name']:<32} {r['index'] or '-'}")
+
+def main() -> int:
+    from pymongo import MongoClient
+    from db.mongo import MONGODB_URI, DB_NAME, COLL_CLAUSES, COLL_CHATS, CLAUSE_INDEXES, CHAT_INDEXES
+    static = static_check({"clauses": CLAUSE_INDEXES, "chats": CHAT_INDEXES})
+    if not all(r["ok"] for r in static):
+        print_static(static)
+        return 1
+    db = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=PING_TIMEOUT_MS)[DB_NAME]
+    try:
+        db.command("ping")
+    except PyMongoError as e:
+        print_static(static)
+        print(f"no server at MONGODB_URI ({type(e).__name__}): winning plans NOT checked")
+        return 2
+    results = check_plans({"clauses": db[COLL_CLAUSES], "chats": db[COLL_CHATS]})
+    for r in results:
+        print(f"{'ok ' if r['ok'] else 'COLLSCAN'} {r['name']:<32} {' > '.join(r['stages'])}")
+    return 0 if all(r["ok"] for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,429 @@
+import bisect, datetime, logging, os, threading, time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from utils.aho_corasick import AhoCorasick
+
+GRAPH_INDEX_ENABLED = os.getenv("GRAPH_INDEX", "1").lower() not in {"0", "false", "off"}
+GRAPH_SYNC_INTERVAL = float(os.getenv("GRAPH_SYNC_INTERVAL", "5"))  # seconds between catch-up queries
+# writes reach Mongo after their `updated` is stamped (write-behind, other
+# workers), so each sync re-reads this much history before the watermark
+GRAPH_SYNC_LAG = float(os.getenv("GRAPH_SYNC_LAG", "60"))
+
+# what /api/graph draws; everything else stays in Mongo
+GRAPH_PROJECTION = {
+    "actor": 1, "actor_canonical": 1, "object": 1, "condition": 1, "modality": 1,
+    "article_id": 1, "text": 1, "formulas.deontic": 1, "updated": 1,
+}
+GRAPH_BUCKETS = ("modality", "article_id", "actor_canonical")  # graph_filter's fields
+TEXT_KEEP = 101  # graph_payload shows text[:100] + "..." past 100 chars
+
+log = logging.getLogger(__name__)
+
+def _pat(s: Any) -> str:
+    return s.lower() if isinstance(s, str) and s else ""
+
+def _actor_pat(r: Dict[str, Any]) -> str:
+    return _pat(r.get("actor_canonical") or r.get("actor"))
+
+def _sort_key(doc: Dict[str, Any]) -> Tuple:
+    # ascending == CLAUSES_SORT reversed: a missing `updated` (BSON null) sorts
+    # lowest, string ids before ObjectIds; the last item is the record id
+    u, i = doc.get("updated"), doc["_id"]
+    dated = isinstance(u, datetime.datetime)
+    return (int(dated), u if dated else 0, int(not isinstance(i, str)), str(i))
+
+def _record(doc: Dict[str, Any]) -> Dict[str, Any]:
+    rec = {k: doc[k] for k in GRAPH_PROJECTION if k in doc and "." not in k}
+    rec["_id"] = doc["_id"]
+    if "formulas" in doc:
+        f = doc["formulas"] or {}
+        rec["formulas"] = {"deontic": f["deontic"]} if "deontic" in f else {}
+    if isinstance(rec.get("text"), str):
+        rec["text"] = rec["text"][:TEXT_KEEP]
+    return rec
+
+class GraphIndex:
+    """
+    The clause dependency graph, materialized in process so /api/graph
+    slices it instead of rebuilding it per request.
+
+    - records: the projected clause per id, plus sorted (updated, _id) key
+      lists overall and per modality / article_id / actor_canonical value
+    - incoming[i] = {j: is_actor_match} for every clause j that clause i's
+      condition depends on (same rule as utils/dependencies.py); outgoing[j]
+      is the reverse, for removal
+
+    load() builds it with one scan and one Aho-Corasick pass. upsert(doc)
+    re-links a single clause: its condition is matched by looking up its
+    substrings of each pattern length present, and its actor / object
+    against the distinct conditions. sync() upserts whatever Mongo changed
+    since the `updated` watermark (minus GRAPH_SYNC_LAG); it runs every
+    GRAPH_SYNC_INTERVAL seconds or once mark_stale() was called (the
+    write-behind queue does after each flush). Deleted clauses are only
+    dropped on remove() or a reload.
+    """
+
+    def __init__(self, coll=None, sync_interval: float = GRAPH_SYNC_INTERVAL, sync_lag: float = GRAPH_SYNC_LAG):
+        self.coll, self.sync_interval, self.sync_lag = coll, sync_interval, sync_lag
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._reset()
+        self.loaded = False
+        self._stale = True
+        self._synced_at = 0.0
+        self._watermark: Optional[datetime.datetime] = None
+        self.loads = self.syncs = self.upserts = 0
+
+    def _reset(self):
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._keys: Dict[str, Tuple] = {}
+        self._order: List[Tuple] = []
+        self._buckets: Dict[Tuple[str, Any], List[Tuple]] = {}
+        self._by_actor: Dict[str, Set[str]] = {}
+        self._by_object: Dict[str, Set[str]] = {}
+        self._plen: Counter = Counter()  # distinct pattern lengths -> count
+        self._conds: Dict[str, Set[str]] = {}
+        self._incoming: Dict[str, Dict[str, bool]] = {}
+        self._outgoing: Dict[str, Set[str]] = {}
+
+    # --- keeping it current
+
+    def load(self, docs: Optional[Iterable[Dict[str, Any]]] = None):
+        """Rebuilds from `docs` (default: a full scan of the collection)."""
+        if docs is None:
+            docs = self.coll.find({}, GRAPH_PROJECTION).batch_size(1000)
+        with self._lock:
+            self._reset()
+            self._watermark = None
+            for d in docs:
+                self._register(_record(d))
+                self._advance(d)
+            plist = list(set(self._by_actor) | set(self._by_object))
+            ac = AhoCorasick(plist)
+            for low, ids in self._conds.items():
+                hit = {plist[k] for k in ac.matches(low)}
+                if hit:
+                    self._link(ids, hit)
+            self.loaded, self._stale, self._synced_at = True, False, time.monotonic()
+            self.loads += 1
+
+    def sync(self) -> int:
+        """Pulls clauses updated since the watermark; returns how many changed."""
+        # every write path stamps `updated`; undated clauses were all seen by load()
+        q: Dict[str, Any] = {"updated": {"$type": "date"}}
+        if self._watermark is not None:
+            q = {"updated": {"$gte": self._watermark - datetime.timedelta(seconds=self.sync_lag)}}
+        self._stale, self._synced_at = False, time.monotonic()
+        changed = sum(self.upsert(d) for d in self.coll.find(q, GRAPH_PROJECTION))
+        self.syncs += 1
+        return changed
+
+    def refresh(self):
+        """Loads on first use, then syncs when stale or due."""
+        if not self.loaded:
+            with self._sync_lock:
+                if not self.loaded:
+                    self.load()
+            return
+        due = self._stale or time.monotonic() - self._synced_at >= self.sync_interval
+        # one catch-up at a time; concurrent readers serve the current graph
+        if due and self._sync_lock.acquire(blocking=False):
+            try:
+                self.sync()
+            except Exception:
+                log.exception("graph index sync failed")
+            finally:
+                self._sync_lock.release()
+
+    def mark_stale(self):
+        self._stale = True
+
+    def upsert(self, doc: Dict[str, Any]) -> bool:
+        """Adds or replaces one clause (any dict with _id); False if nothing changed."""
+        rec = _record(doc)
+        sid = str(rec["_id"])
+        with self._lock:
+            self._advance(doc)
+            old = self._records.get(sid)
+            if old == rec:
+                return False
+            self.upserts += 1
+            same_links = old is not None and _actor_pat(old) == _actor_pat(rec) and all(
+                _pat(old.get(k)) == _pat(rec.get(k)) for k in ("condition", "object"))
+            if same_links:
+                self._unregister_rows(sid)
+                self._register_rows(sid, rec)
+                return True
+            if old is not None:
+                self._remove(sid)
+            self._register(rec)
+            self._link_one(sid, rec)
+            return True
+
+    def remove(self, _id: Any):
+        with self._lock:
+            if str(_id) in self._records:
+                self._remove(str(_id))
+
+    def _advance(self, doc: Dict[str, Any]):
+        u = doc.get("updated")
+        if isinstance(u, datetime.datetime) and (self._watermark is None or u > self._watermark):
+            self._watermark = u
+
+    # --- bookkeeping (callers hold _lock)
+
+    def _register_rows(self, sid: str, rec: Dict[str, Any]):
+        key = _sort_key(rec)
+        self._records[sid], self._keys[sid] = rec, key
+        bisect.insort(self._order, key)
+        for f in GRAPH_BUCKETS:
+            v = rec.get(f)
+            if isinstance(v, str):
+                bisect.insort(self._buckets.setdefault((f, v), []), key)
+
+    def _unregister_rows(self, sid: str):
+        rec, key = self._records.pop(sid), self._keys.pop(sid)
+        _drop_sorted(self._order, key)
+        for f in GRAPH_BUCKETS:
+            v = rec.get(f)
+            if isinstance(v, str):
+                b = self._buckets[(f, v)]
+                _drop_sorted(b, key)
+                if not b:
+                    del self._buckets[(f, v)]
+
+    def _register(self, rec: Dict[str, Any]):
+        sid = str(rec["_id"])
+        self._register_rows(sid, rec)
+        self._add_pattern(self._by_actor, _actor_pat(rec), sid)
+        self._add_pattern(self._by_object, _pat(rec.get("object")), sid)
+        low = _pat(rec.get("condition"))
+        if low:
+            self._conds.setdefault(low, set()).add(sid)
+        self._incoming[sid] = {}
+        self._outgoing[sid] = set()
+
+    def _remove(self, sid: str):
+        rec = self._records[sid]
+        for i in self._outgoing.pop(sid):
+            self._incoming[i].pop(sid, None)
+        for j in self._incoming.pop(sid):
+            self._outgoing[j].discard(sid)
+        self._drop_pattern(self._by_actor, _actor_pat(rec), sid)
+        self._drop_pattern(self._by_object, _pat(rec.get("object")), sid)
+        low = _pat(rec.get("condition"))
+        if low:
+            ids = self._conds[low]
+            ids.discard(sid)
+            if not ids:
+                del self._conds[low]
+        self._unregister_rows(sid)
+
+    def _add_pattern(self, by: Dict[str, Set[str]], p: str, sid: str):
+        if not p:
+            return
+        if p not in self._by_actor and p not in self._by_object:
+            self._plen[len(p)] += 1
+        by.setdefault(p, set()).add(sid)
+
+    def _drop_pattern(self, by: Dict[str, Set[str]], p: str, sid: str):
+        if not p:
+            return
+        ids = by[p]
+        ids.discard(sid)
+        if not ids:
+            del by[p]
+            if p not in self._by_actor and p not in self._by_object:
+                self._plen[len(p)] -= 1
+                if not self._plen[len(p)]:
+                    del self._plen[len(p)]
+
+    def _link(self, ids: Set[str], hit: Set[str]):
+        """Edges into every clause in `ids` (sharing one condition) from the clauses owning `hit`."""
+        cands: Set[str] = set()
+        for p in hit:
+            cands.update(self._by_actor.get(p, ()))
+            cands.update(self._by_object.get(p, ()))
+        for i in ids:
+            inc = self._incoming[i]
+            for j in cands:
+                if j != i:
+                    r = self._records[j]
+                    inc[j] = _actor_pat(r) in hit
+                    self._outgoing[j].add(i)
+
+    def _link_one(self, sid: str, rec: Dict[str, Any]):
+        low = _pat(rec.get("condition"))
+        if low:
+            # the patterns inside this condition: one dict probe per substring of a live pattern length
+            hit = {low[s:s + n] for n in self._plen for s in range(len(low) - n + 1)}
+            hit = {p for p in hit if p in self._by_actor or p in self._by_object}
+            if hit:
+                self._link({sid}, hit)
+        # the conditions mentioning this clause's actor / object
+        a = _actor_pat(rec)
+        o = _pat(rec.get("object"))
+        if not (a or o):
+            return
+        out = self._outgoing[sid]
+        for c, ids in self._conds.items():
+            is_actor = bool(a) and a in c
+            if is_actor or (o and o in c):
+                for i in ids:
+                    if i != sid:
+                        self._incoming[i][sid] = is_actor
+                        out.add(i)
+
+    # --- reading
+
+    def slice(self, q: Dict[str, Any], limit: int = 100) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        (clauses, dependency edges) for a graph_filter() query, newest first,
+        the same as clauses.find(q).sort(CLAUSES_SORT).limit(limit) followed by
+        dependency_edges(); cost follows limit and in-degree, not corpus size.
+        """
+        n = abs(limit) or None  # Mongo: limit 0 means none
+        with self._lock:
+            lists = [self._buckets.get((f, v), []) for f, v in q.items()] if q else [self._order]
+            keys = min(lists, key=len)
+            results: List[Dict[str, Any]] = []
+            for k in reversed(keys):
+                r = self._records[k[3]]
+                if all(r.get(f) == v for f, v in q.items()):
+                    results.append(r)
+                    if n is not None and len(results) >= n:
+                        break
+            return results, self._edges_among(results)
+
+    def _edges_among(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ids = [str(r["_id"]) for r in results]
+        pos = {sid: k for k, sid in enumerate(ids)}
+        edges: List[Dict[str, Any]] = []
+        for i in ids:
+            inc = self._incoming[i]
+            deps = sorted((pos[j], j) for j in inc if j in pos) if len(inc) < len(pos) \
+                else [(k, j) for k, j in enumerate(ids) if j in inc]
+            for _, j in deps:
+                if inc[j]:
+                    edges.append({"id": f"dep_{i}_on_{j}", "source": j, "target": i,
+                                  "type": "dependency", "label": "condition"})
+                else:
+                    edges.append({"id": f"dep_{i}_on_{j}_obj", "source": j, "target": i,
+                                  "type": "dependency", "label": "requires"})
+        return edges
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": GRAPH_INDEX_ENABLED,
+            "loaded": self.loaded,
+            "clauses": len(self._records),
+            "dependencies": sum(len(v) for v in self._incoming.values()),
+            "loads": self.loads,
+            "syncs": self.syncs,
+            "upserts": self.upserts,
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+        }
+
+def _drop_sorted(keys: List[Tuple], key: Tuple):
+    k = bisect.bisect_left(keys, key)
+    if k < len(keys) and keys[k] == key:
+        del keys[k]
+
+def graph_payload(results: List[Dict[str, Any]], dependencies: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The /api/graph response: clause, actor and article nodes, their edges, then `dependencies`."""
+    nodes = []
+    edges = []
+    actor_nodes = {}
+    article_nodes = {}
+
+    for clause in results:
+        clause_id = str(clause.get("_id"))
+
+        # Create clause node
+        node = {
+            "id": clause_id,
+            "type": "clause",
+            "data": {
+                "label": f"{clause.get('article_id', 'Unknown')}: {clause.get('actor', 'Unknown')}",
+                "modality": clause.get("modality", "UNKNOWN"),
+                "actor": clause.get("actor_canonical") or clause.get("actor"),
+                "object": clause.get("object", ""),
+                "article_id": clause.get("article_id"),
+                "condition": clause.get("condition"),
+                "formula": clause.get("formulas", {}).get("deontic", ""),
+                "text": clause.get("text", "")[:100] + "..." if len(clause.get("text", "")) > 100 else clause.get("text", "")
+            },
+            "position": {"x": 0, "y": 0}  # Will be laid out by frontend
+        }
+        nodes.append(node)
+
+        # Track actors
+        actor_name = clause.get("actor_canonical") or clause.get("actor")
+        if actor_name and actor_name not in actor_nodes:
+            actor_nodes[actor_name] = {
+                "id": f"actor_{len(actor_nodes)}",
+                "type": "actor",
+                "data": {"label": actor_name, "type": "actor"},
+                "position": {"x": 0, "y": 0}
+            }
+
+        # Track articles
+        article_id = clause.get("article_id")
+        if article_id and article_id not in article_nodes:
+            article_nodes[article_id] = {
+                "id": f"article_{article_id}",
+                "type": "article",
+                "data": {"label": f"Article {article_id}", "article_id": article_id},
+                "position": {"x": 0, "y": 0}
+            }
+
+        # Create edges from clause to actor
+        if actor_name and actor_name in actor_nodes:
+            edges.append({
+                "id": f"edge_{clause_id}_to_actor_{actor_name}",
+                "source": clause_id,
+                "target": actor_nodes[actor_name]["id"],
+                "type": "actor_edge",
+                "label": "binds"
+            })
+
+        # Create edges from article to clause
+        if article_id and article_id in article_nodes:
+            edges.append({
+                "id": f"edge_article_{article_id}_to_{clause_id}",
+                "source": article_nodes[article_id]["id"],
+                "target": clause_id,
+                "type": "article_edge",
+                "label": "defines"
+            })
+
+    # Add actor and article nodes
+    nodes.extend(actor_nodes.values())
+    nodes.extend(article_nodes.values())
+
+    edges.extend(dependencies)
+
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "stats": {
+            "total_clauses": len(results),
+            "total_actors": len(actor_nodes),
+            "total_articles": len(article_nodes),
+            "total_edges": len(edges)
+        }
+    }
+
+_GRAPH = None
+_GRAPH_LOCK = threading.Lock()
+
+def get_graph() -> GraphIndex:
+    """The process-wide index over db.mongo.clauses, refreshed on every flush of queued clause upserts."""
+    global _GRAPH
+    with _GRAPH_LOCK:
+        if _GRAPH is None:
+            from db.mongo import clauses
+            from db.write_behind import get_writer
+            _GRAPH = GraphIndex(clauses)
+            get_writer().add_listener(_GRAPH.mark_stale)
+        return _GRAPH
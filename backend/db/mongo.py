@@ -1,6 +1,9 @@
-import os
-from pymongo import MongoClient
+import os, logging
+from typing import Dict, List
+from pymongo import MongoClient, UpdateOne, IndexModel, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
 from bootstrap.env import load_and_validate_env
+from utils.hashing import sha1
 
 # ensure .env is loaded & validated once
 load_and_validate_env()
@@ -16,3 +19,56 @@ db = _client[DB_NAME]
 docs = db[COLL_DOCS]
 clauses = db[COLL_CLAUSES]
 chats = db[COLL_CHATS]
+
+log = logging.getLogger(__name__)
+
+# One index per read path; db/explain_check.py verifies the API queries use them.
+CLAUSE_INDEXES = [
+    # persist_results / extract job upsert key
+    IndexModel([("text_hash", ASCENDING), ("article_id", ASCENDING)], name="text_hash_article"),
+    # /api/clauses: optional equality filter + sort by updated
+    # (_id breaks ties for keyset pagination, see db/queries.py)
+    IndexModel([("updated", DESCENDING), ("_id", DESCENDING)], name="updated"),
+    IndexModel([("modality", ASCENDING), ("updated", DESCENDING), ("_id", DESCENDING)], name="modality_updated"),
+    IndexModel([("article_id", ASCENDING), ("updated", DESCENDING), ("_id", DESCENDING)], name="article_updated"),
+    IndexModel([("actor", ASCENDING), ("updated", DESCENDING), ("_id", DESCENDING)], name="actor_updated"),
+    # /api/graph
+    IndexModel([("actor_canonical", ASCENDING), ("updated", DESCENDING), ("_id", DESCENDING)],
+               name="actor_canonical_updated"),
+    # /api/clauses?search=
+    IndexModel([("text", TEXT), ("object", TEXT), ("condition", TEXT)], name="clause_text",
+               weights={"text": 5, "object": 2, "condition": 1}),
+    # graph/clause_lookup
+    IndexModel([("provenance.chunk_ids", ASCENDING), ("provenance.source_version", ASCENDING)], name="lookup_chunk"),
+    IndexModel([("provenance.text_hashes", ASCENDING), ("provenance.source_version", ASCENDING)], name="lookup_hash"),
+]
+CHAT_INDEXES = [
+    IndexModel([("thread_id", ASCENDING), ("created", ASCENDING)], name="thread_created"),
+]
+
+def ensure_indexes(clauses_coll=None, chats_coll=None) -> Dict[str, List[str]]:
+    """
+    Creates missing indexes; a no-op for ones that already exist. An index that
+    conflicts with an existing one (e.g. a differently named text index) is
+    logged and skipped rather than failing startup.
+    """
+    created: Dict[str, List[str]] = {}
+    for coll, models in ((clauses_coll or clauses, CLAUSE_INDEXES), (chats_coll or chats, CHAT_INDEXES)):
+        for m in models:
+            try:
+                created.setdefault(coll.name, []).extend(coll.create_indexes([m]))
+            except OperationFailure as e:
+                log.warning("index %s on %s not created: %s", m.document["name"], coll.name, e)
+    return created
+
+def backfill_clause_hashes(batch: int = 1000) -> int:
+    """Adds text_hash (the clause upsert key) to clauses stored before it existed."""
+    n, ops = 0, []
+    for c in clauses.find({"text_hash": {"$exists": False}}, {"text": 1}):
+        ops.append(UpdateOne({"_id": c["_id"]}, {"$set": {"text_hash": sha1(c.get("text") or "")}}))
+        if len(ops) >= batch:
+            n += clauses.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        n += clauses.bulk_write(ops, ordered=False).modified_count
+    return n
@@ -0,0 +1,56 @@
+import base64, datetime, json
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+
+# Filters behind the read endpoints; db/explain_check.py explains the same
+# shapes, so keep the two in step with db/mongo.py's indexes.
+
+# newest first; _id breaks ties so keyset pages never skip or repeat
+CLAUSES_SORT: List[Tuple[str, int]] = [("updated", -1), ("_id", -1)]
+
+def clauses_filter(modality: Optional[str] = None, article: Optional[str] = None,
+                   actor: Optional[str] = None, search: Optional[str] = None) -> Dict[str, Any]:
+    q: Dict[str, Any] = {}
+    if modality and modality != "all": q["modality"] = modality
+    if article: q["article_id"] = article
+    if actor: q["actor"] = actor
+    if search: q["$text"] = {"$search": search}
+    return q
+
+def graph_filter(modality: Optional[str] = None, article: Optional[str] = None,
+                 actor: Optional[str] = None) -> Dict[str, Any]:
+    q: Dict[str, Any] = {}
+    if modality and modality != "all": q["modality"] = modality
+    if article: q["article_id"] = article
+    if actor: q["actor_canonical"] = actor
+    return q
+
+# ---------- Keyset pagination over CLAUSES_SORT ----------
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Opaque token for the page after `doc` (the last one returned)."""
+    u, i = doc.get("updated"), doc["_id"]
+    raw = {"u": u.isoformat() if isinstance(u, datetime.datetime) else None,
+           "i": str(i), "o": isinstance(i, ObjectId)}
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(token: str) -> Tuple[Optional[datetime.datetime], Any]:
+    """Raises ValueError for a malformed token."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        u = datetime.datetime.fromisoformat(raw["u"]) if raw["u"] else None
+        return u, ObjectId(raw["i"]) if raw["o"] else raw["i"]
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {token!r}") from e
+
+def after_cursor(q: Dict[str, Any], token: Optional[str]) -> Dict[str, Any]:
+    """Narrows q to the documents that sort after the cursor position."""
+    if not token:
+        return q
+    u, i = decode_cursor(token)
+    if u is None:
+        # clauses without `updated` sort last; page through them by _id
+        after = {"updated": None, "_id": {"$lt": i}}
+    else:
+        after = {"$or": [{"updated": {"$lt": u}}, {"updated": u, "_id": {"$lt": i}}, {"updated": None}]}
+    return {"$and": [q, after]} if q else after
@@ -0,0 +1,186 @@
+import atexit, contextlib, contextvars, json, logging, os, threading, time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND", "1").lower() not in {"0", "false", "off"}
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "500"))          # ops per flush
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "0.5"))  # seconds
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "20000"))
+WRITE_BEHIND_ATTEMPTS = 3
+
+log = logging.getLogger(__name__)
+DUPLICATE_KEY = 11000
+# set inside WriteBehind.deferred(): flushes a write calls for are left to the caller
+_DEFERRED: contextvars.ContextVar = contextvars.ContextVar("write_behind_deferred", default=None)
+
+class WriteBehind:
+    """
+    Buffers Mongo writes off the request path.
+    - insert(coll, doc) -> insert_many per collection
+    - upsert(coll, filter, set) -> bulk_write of UpdateOne; repeated upserts of
+      one filter within a flush are merged (last $set wins per field)
+    A daemon thread flushes every `interval` seconds or once `batch` ops are
+    pending; close() (app shutdown / atexit) flushes what is left. Past
+    `max_pending` ops, callers flush synchronously (backpressure).
+    With enabled=False every write goes straight to Mongo.
+    Inside deferred(), writes only enqueue and those flushes are left to
+    the caller (event-loop code runs them via asyncio.to_thread).
+    Listeners (add_listener) are called after each flush that wrote something.
+    """
+
+    def __init__(self, batch: int = WRITE_BEHIND_BATCH, interval: float = WRITE_BEHIND_INTERVAL,
+                 max_pending: int = WRITE_BEHIND_MAX_PENDING, enabled: bool = WRITE_BEHIND_ENABLED):
+        self.batch, self.interval, self.max_pending, self.enabled = batch, interval, max_pending, enabled
+        self._colls: Dict[int, Any] = {}
+        self._inserts: Dict[int, List[Dict[str, Any]]] = {}
+        self._upserts: Dict[int, Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]] = {}
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # one flush at a time, in op order
+        self._closed = False
+        self._listeners: List[Any] = []
+        self.ops = self.flushes = self.errors = self.dropped = 0
+        self._thread = None
+        if enabled:
+            self._thread = threading.Thread(target=self._run, name="mongo-write-behind", daemon=True)
+            self._thread.start()
+
+    # --- enqueue
+
+    def insert(self, coll, doc: Dict[str, Any]):
+        self._add(coll, lambda k: self._inserts.setdefault(k, []).append(doc))
+
+    def upsert(self, coll, filter: Dict[str, Any], fields: Dict[str, Any]):
+        def add(k):
+            ups = self._upserts.setdefault(k, {})
+            key = json.dumps(filter, sort_keys=True, default=str)
+            prev = ups.get(key)
+            ups[key] = (filter, {**prev[1], **fields} if prev else fields)
+        self._add(coll, add)
+
+    def _add(self, coll, add):
+        with self._cond:
+            k = id(coll)
+            self._colls[k] = coll
+            add(k)
+            self._pending += 1
+            if self._pending >= self.batch:
+                self._cond.notify()
+            backlog = self._pending >= self.max_pending
+        if not self.enabled or backlog or self._closed:
+            due = _DEFERRED.get()
+            if due is None:
+                self.flush()
+            else:
+                due.flush = True
+
+    @contextlib.contextmanager
+    def deferred(self):
+        """Writes in the block never flush on the caller's thread; the yielded .flush says one is due."""
+        due = SimpleNamespace(flush=False)
+        token = _DEFERRED.set(due)
+        try:
+            yield due
+        finally:
+            _DEFERRED.reset(token)
+
+    def add_listener(self, fn):
+        """fn() runs after each flush, e.g. to refresh views derived from the written collections."""
+        self._listeners.append(fn)
+
+    # --- flushing
+
+    def _take(self):
+        with self._cond:
+            inserts, upserts, n = self._inserts, self._upserts, self._pending
+            self._inserts, self._upserts, self._pending = {}, {}, 0
+            return inserts, upserts, n
+
+    def flush(self) -> int:
+        """Writes everything pending now; returns the number of ops written."""
+        with self._flush_lock:
+            inserts, upserts, n = self._take()
+            if not n:
+                return 0
+            for k, docs in inserts.items():
+                # unordered: a retry re-sends docs that already got an _id; those come back as
+                # duplicate-key errors and count as written, the rest are still inserted
+                self._write(lambda: self._colls[k].insert_many(docs, ordered=False), len(docs), duplicates_ok=True)
+            for k, ups in upserts.items():
+                ops = [UpdateOne(f, {"$set": s}, upsert=True) for f, s in ups.values()]
+                self._write(lambda: self._colls[k].bulk_write(ops, ordered=False), len(ops))
+            self.flushes += 1
+            self.ops += n
+        for fn in self._listeners:
+            try:
+                fn()
+            except Exception:
+                log.exception("write-behind listener failed")
+        return n
+
+    def _write(self, fn, n: int, duplicates_ok: bool = False):
+        for attempt in range(1, WRITE_BEHIND_ATTEMPTS + 1):
+            try:
+                fn()
+                return
+            except BulkWriteError as e:
+                failed = [err for err in e.details.get("writeErrors", [])
+                          if not (duplicates_ok and err.get("code") == DUPLICATE_KEY)]
+                if not failed and not e.details.get("writeConcernErrors"):
+                    return
+                lost = len(failed) or n
+            except Exception:
+                lost = n
+            self.errors += 1
+            if attempt == WRITE_BEHIND_ATTEMPTS:
+                self.dropped += lost
+                log.exception("write-behind: dropping %d ops after %d attempts", lost, attempt)
+                return
+            time.sleep(0.2 * 2 ** attempt)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and self._pending < self.batch:
+                    self._cond.wait(self.interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception:
+                log.exception("write-behind flush failed")
+            if closed:
+                return
+
+    def close(self, timeout: float = 30.0):
+        """Stops the flusher after a final flush."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pending": self._pending,
+            "ops": self.ops,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "dropped": self.dropped,
+        }
+
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+
+def get_writer() -> WriteBehind:
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = WriteBehind()
+            atexit.register(_WRITER.close)  # scripts and non-FastAPI callers
+        return _WRITER
@@ -0,0 +1,157 @@
+import os, re, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "1").lower() not in {"0", "false", "off"}
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))           # seconds
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine
+ANSWER_CACHE_EPOCH_CHECK = float(os.getenv("ANSWER_CACHE_EPOCH_CHECK", "30"))  # seconds
+
+ANY_VERSION = "*"
+
+def normalize_query(q: str) -> str:
+    q = re.sub(r"\s+", " ", (q or "").lower()).strip()
+    return q.strip(" ?!.")
+
+class AnswerCache:
+    """
+    Two-layer cache of full /api/chat responses, scoped per source_version
+    and, within it, per variant (what else shapes the answer besides the
+    wording: the articles the question names, the pipeline mode).
+    - exact: normalized query text
+    - semantic: cosine similarity of query embeddings >= threshold, only
+      against entries of the same scope and variant
+    Entries expire after `ttl` seconds; the least recently used are evicted
+    past `max_items`. A scope is dropped when its corpus is re-ingested.
+    """
+
+    def __init__(self, max_items: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 threshold: float = ANSWER_CACHE_THRESHOLD):
+        self.max_items, self.ttl, self.threshold = max_items, ttl, threshold
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        # (scope, variant) -> (keys, unit vectors)
+        self._matrix: Dict[Tuple[str, str], Tuple[List[Tuple[str, str, str]], np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._epochs: Optional[Dict[str, Any]] = None
+        self._epoch_checked = 0.0
+        self.exact_hits = self.semantic_hits = self.misses = self.evictions = self.invalidations = 0
+
+    # --- lookups
+
+    def get_exact(self, query: str, scope: Optional[str], variant: str = "") -> Optional[Dict[str, Any]]:
+        key = ((scope or ANY_VERSION), variant, normalize_query(query))
+        with self._lock:
+            e = self._entries.get(key)
+            if e is None or time.time() - e["created"] > self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return e["response"]
+
+    def get_semantic(self, scope: Optional[str], qvec: List[float], variant: str = "") -> Optional[Dict[str, Any]]:
+        """Best cached answer within `threshold` cosine of qvec; counts a miss otherwise."""
+        with self._lock:
+            hit = self._nearest((scope or ANY_VERSION, variant), qvec, time.time())
+            if hit is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(hit)
+            self.semantic_hits += 1
+            return self._entries[hit]["response"]
+
+    def _nearest(self, scope: Tuple[str, str], qvec: List[float], now: float) -> Optional[Tuple[str, str, str]]:
+        if scope not in self._matrix:
+            keys = [k for k, e in self._entries.items() if k[:2] == scope and e["vec"] is not None]
+            mat = np.stack([self._entries[k]["vec"] for k in keys]) if keys else np.zeros((0, 0), np.float32)
+            self._matrix[scope] = (keys, mat)
+        keys, mat = self._matrix[scope]
+        if not keys:
+            return None
+        q = _unit(qvec)
+        if q.shape[0] != mat.shape[1]:
+            return None
+        sims = mat @ q
+        for i in np.argsort(-sims):
+            if sims[i] < self.threshold:
+                return None
+            k = keys[i]
+            e = self._entries.get(k)
+            if e is not None and now - e["created"] <= self.ttl:
+                return k
+        return None
+
+    # --- writes
+
+    def put(self, query: str, scope: Optional[str], qvec: Optional[List[float]], response: Dict[str, Any],
+            variant: str = ""):
+        key = (scope or ANY_VERSION, variant, normalize_query(query))
+        with self._lock:
+            self._entries[key] = {
+                "response": response,
+                "vec": _unit(qvec) if qvec is not None else None,
+                "created": time.time(),
+            }
+            self._entries.move_to_end(key)
+            self._matrix.pop(key[:2], None)
+            while len(self._entries) > self.max_items:
+                old, _ = self._entries.popitem(last=False)
+                self._matrix.pop(old[:2], None)
+                self.evictions += 1
+
+    def invalidate(self, scope: Optional[str] = None):
+        """Drops one source_version (plus unscoped answers) or, with no scope, everything."""
+        with self._lock:
+            if scope is None:
+                self._entries.clear()
+                self._matrix.clear()
+            else:
+                for k in [k for k in self._entries if k[0] in (scope, ANY_VERSION)]:
+                    del self._entries[k]
+                for m in [m for m in self._matrix if m[0] in (scope, ANY_VERSION)]:
+                    del self._matrix[m]
+            self.invalidations += 1
+
+    def epoch_due(self) -> bool:
+        return time.time() - self._epoch_checked >= ANSWER_CACHE_EPOCH_CHECK
+
+    def check_corpus_epoch(self, force: bool = False):
+        """
+        Re-ingest invalidation across processes: ingest rewrites the doc
+        manifests in the docs collection, so compare their latest `updated`
+        per source_version with what we saw last time.
+        """
+        if not force and not self.epoch_due():
+            return
+        self._epoch_checked = time.time()
+        from db.mongo import docs
+        try:
+            rows = docs.aggregate([{"$group": {"_id": "$source_version", "updated": {"$max": "$updated"}}}])
+            epochs = {r["_id"]: r["updated"] for r in rows}
+        except Exception:
+            return  # Mongo unavailable: keep serving, retry on the next check
+        if self._epochs is not None:
+            for version, updated in epochs.items():
+                if self._epochs.get(version) != updated:
+                    self.invalidate(version)
+        self._epochs = epochs
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "items": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+def _unit(v) -> np.ndarray:
+    a = np.asarray(v, dtype=np.float32)
+    n = float(np.linalg.norm(a))
+    return a / n if n else a
+
+CACHE = AnswerCache()
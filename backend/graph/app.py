@@ -1,42 +1,339 @@
-from graph.state import BotState
+import os, asyncio, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+from graph.state import BotState, Clause
+from graph.answer_cache import CACHE as ANSWER_CACHE, ANSWER_CACHE_ENABLED
+from graph.clause_lookup import CLAUSE_LOOKUP_ENABLED, STATS as LOOKUP_STATS
+from graph.dag import Stage, check_dag, without, run_dag, arun_dag, timed
+from retrieval.planner import question_articles
 from graph.nodes import (
-    rag_retriever, provision_segmenter, clause_classifier,
+    query_planner, rag_retriever, rerank_contexts, provision_segmenter, clause_classifier,
     definitions_node, xref_node,
     deontic_formalizer, validator, ambiguity_router,
-    answer_composer, persist_results
+    answer_composer, persist_results, fused_extractor,
+    query_vector, persist_chats, aquery_vector, apersist_chats,
+    clause_lookup, aclause_lookup, clause_result, clause_results,
+    aquery_planner, arag_retriever, arerank_contexts, aprovision_segmenter, aclause_classifier,
+    adefinitions_node, axref_node,
+    adeontic_formalizer, avalidator, aambiguity_router,
+    aanswer_composer, apersist_results, afused_extractor
 )
 
 MAX_REFINES = 2
 
-def run_once(state: BotState):
-    # 1) Retrieve top-k chunks (vector search; no in-memory store)
-    state = rag_retriever(state)
+# Stages up to formalization, as a dependency DAG. definitions and xref both
+# read only the classified clause, so they run concurrently.
+CLAUSE_STAGES = [
+    Stage("plan", (), query_planner, aquery_planner, ("_plan",)),
+    Stage("retrieve", ("plan",), rag_retriever, arag_retriever, ("contexts",)),
+    Stage("rerank", ("retrieve",), rerank_contexts, arerank_contexts, ("contexts",)),
+    Stage("segment", ("rerank",), provision_segmenter, aprovision_segmenter, ("working_clause",)),
+    Stage("classify", ("segment",), clause_classifier, aclause_classifier,
+          ("modality", "actor", "action_verb", "object", "condition", "exceptions", "scope", "ambiguity",
+           "confidence.classify", "provenance.classified_by")),
+    Stage("definitions", ("classify",), definitions_node, adefinitions_node,
+          ("actor_canonical", "provenance.definition_hits")),
+    Stage("xref", ("classify",), xref_node, axref_node,
+          ("condition", "provenance.xref_links")),
+]
+check_dag(CLAUSE_STAGES)
+RETRIEVAL = CLAUSE_STAGES[:3]
+RETRIEVED = [s.name for s in RETRIEVAL]
+
+# Opt-in "fused" mode: one schema-constrained call replaces segment, classify,
+# definitions, xref and the first formalizer pass. If its output fails
+# validation the per-node stages run instead.
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "chain")   # "chain" | "fused"
+FUSED_STAGES = RETRIEVAL + [
+    Stage("fused", ("rerank",), fused_extractor, afused_extractor, ("working_clause",)),
+]
+FALLBACK_STAGES = without(CLAUSE_STAGES, RETRIEVED)
+FUSED_REST = without(FUSED_STAGES, RETRIEVED)
+check_dag(FUSED_STAGES)
+
+# Retrieval, then a lookup of clauses already derived from the top chunk;
+# on a hit segmenter -> validator (and the ambiguity router) are skipped.
+LOOKUP_STAGES = RETRIEVAL + [
+    Stage("lookup", ("rerank",), clause_lookup, aclause_lookup, ("working_clause",)),
+]
+RETRIEVE_STAGES = LOOKUP_STAGES if CLAUSE_LOOKUP_ENABLED else RETRIEVAL
+check_dag(LOOKUP_STAGES)
+
+# Opt-in multi-clause mode: every segmented clause (not just the first) goes
+# through classify -> formalize/validate -> ambiguity, at most
+# MULTI_CLAUSE_CONCURRENCY at a time, and the answer is grounded in all of them.
+MULTI_CLAUSE = os.getenv("MULTI_CLAUSE", "0").lower() in {"1", "true", "on"}
+MULTI_CLAUSE_CONCURRENCY = int(os.getenv("MULTI_CLAUSE_CONCURRENCY", "4"))
+MULTI_CLAUSE_MAX = int(os.getenv("MULTI_CLAUSE_MAX", "8"))
+SEGMENT_STAGES = without(CLAUSE_STAGES[:4], RETRIEVED)
+ENRICH_STAGES = without(CLAUSE_STAGES, RETRIEVED + ["segment"])
+
+def _fused(state: BotState) -> bool:
+    return (state.get("_mode") or PIPELINE_MODE) == "fused"
+
+def _multi(state: BotState) -> bool:
+    m = state.get("_multi")
+    return MULTI_CLAUSE if m is None else bool(m)
+
+def _has_formula(state: BotState) -> bool:
+    # a formula from the fused call stands in for the first formalizer pass
+    c = state.get("working_clause")
+    return bool(state.get("_fused_ok") and c and c.formulas.get("deontic"))
+
+# ---------- Answer cache (exact / semantic, per source_version) ----------
+
+def _use_cached(state: BotState, r: Dict[str, Any], kind: str) -> BotState:
+    state["answer"] = r["answer"]
+    state["citations"] = list(r["citations"])
+    state["contexts"] = list(r["contexts"])
+    state["working_clause"] = Clause(**r["clause"]) if r["clause"] else None
+    state["_clause_results"] = [{**x, "clause": Clause(**x["clause"])} for x in r.get("clauses", [])]
+    state["_route"] = r["route"]
+    state["_ambiguity_reason"] = r["ambiguity_reason"]
+    state["_cache"] = kind
+    return state
+
+def _cacheable(state: BotState) -> bool:
+    # answers are keyed on (question, source_version, _cache_variant); requests that narrow retrieval further
+    # bypass the cache
+    return ANSWER_CACHE_ENABLED and not any(state.get(k) for k in ("_articles", "_source_uri", "_top_k"))
+
+def _cache_variant(state: BotState) -> str:
+    # "What does Article 10 require?" is within the semantic threshold of the Article 11 question, and a
+    # multi-clause answer is not a single-clause one: neither may replay the other
+    arts = ",".join(sorted(question_articles(state["query"] or ""), key=int))
+    return f"{'fused' if _fused(state) else 'chain'}|{'multi' if _multi(state) else 'single'}|{arts}"
 
-    # 2) Segment current context into a clause, then classify it
-    state = provision_segmenter(state)
-    state = clause_classifier(state)
+def _remember(state: BotState):
+    # don't replay answers that were routed to human review
+    if not _cacheable(state) or not state.get("answer") or state.get("_route") == "REVIEW":
+        return
+    c = state.get("working_clause")
+    ANSWER_CACHE.put(state["query"] or "", state.get("_source_version"), state.get("_qvec"), {
+        "answer": state["answer"],
+        "citations": state.get("citations", []),
+        "contexts": state.get("contexts", []),
+        "clause": c.model_dump() if c else {},
+        "clauses": [{**x, "clause": x["clause"].model_dump()} for x in clause_results(state)],
+        "route": state.get("_route", "OK"),
+        "ambiguity_reason": state.get("_ambiguity_reason", ""),
+    }, _cache_variant(state))
 
-    # 3) Enrich with definitions and xrefs
-    state = definitions_node(state)
-    state = xref_node(state)
+def cached_answer(state: BotState) -> bool:
+    """Fills state from the answer cache; True on a hit (the pipeline is skipped)."""
+    if not _cacheable(state):
+        return False
+    with timed(state, "answer_cache"):
+        ANSWER_CACHE.check_corpus_epoch()
+        query, scope, variant = state["query"] or "", state.get("_source_version"), _cache_variant(state)
+        r = ANSWER_CACHE.get_exact(query, scope, variant)
+        if r is not None:
+            _use_cached(state, r, "exact")
+            return True
+        r = ANSWER_CACHE.get_semantic(scope, query_vector(state), variant)
+        if r is not None:
+            _use_cached(state, r, "semantic")
+            return True
+    return False
 
+async def acached_answer(state: BotState) -> bool:
+    if not _cacheable(state):
+        return False
+    with timed(state, "answer_cache"):
+        if ANSWER_CACHE.epoch_due():
+            await asyncio.to_thread(ANSWER_CACHE.check_corpus_epoch, True)
+        query, scope, variant = state["query"] or "", state.get("_source_version"), _cache_variant(state)
+        r = ANSWER_CACHE.get_exact(query, scope, variant)
+        if r is not None:
+            _use_cached(state, r, "exact")
+            return True
+        r = ANSWER_CACHE.get_semantic(scope, await aquery_vector(state), variant)
+        if r is not None:
+            _use_cached(state, r, "semantic")
+            return True
+    return False
+
+def _lookup_hit(state: BotState) -> bool:
+    if state.get("_clause_hit"):
+        LOOKUP_STATS.hit()
+        return True
+    return False
+
+def _derived(state: BotState, t0: float):
+    if CLAUSE_LOOKUP_ENABLED:
+        LOOKUP_STATS.miss((time.perf_counter() - t0) * 1000)
+
+def _formalize_validate(state: BotState) -> BotState:
     # 4) Formalize + Validate; bounded refine loop
     refines = 0
+    skip_formalize = _has_formula(state)
     while True:
-        state = deontic_formalizer(state)
-        state = validator(state)
+        state["_refining"] = refines > 0  # refine passes bypass the LLM memo (nodes._memo_ok)
+        if not skip_formalize:
+            with timed(state, f"formalize#{refines}"):
+                state = deontic_formalizer(state)
+        skip_formalize = False
+        with timed(state, f"validate#{refines}"):
+            state = validator(state)
         if state.get("_route") == "REFINE" and refines < MAX_REFINES:
             refines += 1
             continue
         break
 
     # 5) Ambiguity handling (may request a final refine or human review)
-    state = ambiguity_router(state)
+    with timed(state, "ambiguity"):
+        state = ambiguity_router(state)
+    if state.get("_route") == "REFINE" and refines < MAX_REFINES:
+        state["_refining"] = True
+        with timed(state, "formalize#final"):
+            state = deontic_formalizer(state)
+        with timed(state, "validate#final"):
+            state = validator(state)
+    return state
+
+async def _aformalize_validate(state: BotState) -> BotState:
+    refines = 0
+    skip_formalize = _has_formula(state)
+    while True:
+        state["_refining"] = refines > 0
+        if not skip_formalize:
+            with timed(state, f"formalize#{refines}"):
+                state = await adeontic_formalizer(state)
+        skip_formalize = False
+        with timed(state, f"validate#{refines}"):
+            state = await avalidator(state)
+        if state.get("_route") == "REFINE" and refines < MAX_REFINES:
+            refines += 1
+            continue
+        break
+
+    with timed(state, "ambiguity"):
+        state = await aambiguity_router(state)
     if state.get("_route") == "REFINE" and refines < MAX_REFINES:
-        state = deontic_formalizer(state)
-        state = validator(state)
+        state["_refining"] = True
+        with timed(state, "formalize#final"):
+            state = await adeontic_formalizer(state)
+        with timed(state, "validate#final"):
+            state = await avalidator(state)
+    return state
+
+# ---------- Multi-clause fan-out ----------
+
+def _clause_state(state: BotState, clause: Clause) -> BotState:
+    # per-clause copy; contexts are shared read-only, everything written is fresh
+    sub = dict(state)
+    sub.update(working_clause=clause, retries={}, _timings={}, _errors=[], _validated=False,
+               _route="OK", _ambiguity_reason="")
+    return sub
+
+def _fan_in(state: BotState, subs) -> BotState:
+    # the first clause stays the primary one (working_clause, route, ...)
+    first = subs[0]
+    for k in ("working_clause", "_route", "_ambiguity_reason", "_validated", "_errors"):
+        state[k] = first.get(k)
+    state["_clause_results"] = [clause_result(sub) for sub in subs]
+    for i, sub in enumerate(subs):
+        for name, t in sub["_timings"].items():
+            state.setdefault("_timings", {})[f"clause{i}.{name}"] = t
+    return state
+
+def _derive_one(sub: BotState, enrich: bool) -> BotState:
+    if enrich:
+        sub = run_dag(sub, ENRICH_STAGES)
+    return _formalize_validate(sub)
+
+def _derive_all(state: BotState, enrich: bool) -> BotState:
+    subs = [_clause_state(state, c) for c in state["_segmented"][:MULTI_CLAUSE_MAX]]
+    with timed(state, "clauses"), ThreadPoolExecutor(MULTI_CLAUSE_CONCURRENCY) as pool:
+        subs = list(pool.map(lambda sub: _derive_one(sub, enrich), subs))
+    return _fan_in(state, subs)
+
+async def _aderive_all(state: BotState, enrich: bool) -> BotState:
+    sem = asyncio.Semaphore(MULTI_CLAUSE_CONCURRENCY)
+
+    async def one(sub: BotState) -> BotState:
+        async with sem:
+            if enrich:
+                sub = await arun_dag(sub, ENRICH_STAGES)
+            return await _aformalize_validate(sub)
+
+    subs = [_clause_state(state, c) for c in state["_segmented"][:MULTI_CLAUSE_MAX]]
+    with timed(state, "clauses"):
+        subs = list(await asyncio.gather(*(one(sub) for sub in subs)))
+    return _fan_in(state, subs)
+
+# ---------- Pipeline ----------
+
+def derive_clauses(state: BotState) -> BotState:
+    # 2-3) Segment + classify a clause, enrich it with definitions and xrefs
+    #      (in parallel); fused mode does all of it in one call
+    if _fused(state):
+        state = run_dag(state, FUSED_REST)
+        if state["_fused_ok"]:
+            return _derive_all(state, enrich=False) if _multi(state) else _formalize_validate(state)
+    if _multi(state):
+        return _derive_all(run_dag(state, SEGMENT_STAGES), enrich=True)
+    return _formalize_validate(run_dag(state, FALLBACK_STAGES))
+
+async def aderive_clauses(state: BotState) -> BotState:
+    if _fused(state):
+        state = await arun_dag(state, FUSED_REST)
+        if state["_fused_ok"]:
+            return await (_aderive_all(state, enrich=False) if _multi(state) else _aformalize_validate(state))
+    if _multi(state):
+        return await _aderive_all(await arun_dag(state, SEGMENT_STAGES), enrich=True)
+    return await _aformalize_validate(await arun_dag(state, FALLBACK_STAGES))
+
+def run_once(state: BotState):
+    # 0) Same or near-duplicate question answered before: replay it
+    if cached_answer(state):
+        return persist_chats(state)
+
+    # 1) Retrieve top-k chunks; reuse a stored clause derived from them
+    state = run_dag(state, RETRIEVE_STAGES)
+    if _lookup_hit(state):
+        with timed(state, "answer"):
+            state = answer_composer(state)
+        with timed(state, "persist"):
+            state = persist_chats(state)
+        _remember(state)
+        return state
+
+    # 2-5) Derive, formalize and validate the clause(s)
+    t0 = time.perf_counter()
+    state = derive_clauses(state)
+    _derived(state, t0)
 
     # 6) Compose grounded answer and persist artifacts
-    state = answer_composer(state)
-    state = persist_results(state)
+    with timed(state, "answer"):
+        state = answer_composer(state)
+    with timed(state, "persist"):
+        state = persist_results(state)
+    _remember(state)
+    return state
+
+
+async def arun_once(state: BotState):
+    """Async twin of run_once: same stages, awaiting each LLM / IO call."""
+    if await acached_answer(state):
+        return await apersist_chats(state)
+
+    state = await arun_dag(state, RETRIEVE_STAGES)
+    if _lookup_hit(state):
+        with timed(state, "answer"):
+            state = await aanswer_composer(state)
+        with timed(state, "persist"):
+            state = await apersist_chats(state)
+        _remember(state)
+        return state
+
+    t0 = time.perf_counter()
+    state = await aderive_clauses(state)
+    _derived(state, t0)
+
+    with timed(state, "answer"):
+        state = await aanswer_composer(state)
+    with timed(state, "persist"):
+        state = await apersist_results(state)
+    _remember(state)
     return state
@@ -0,0 +1,79 @@
+import os, threading
+from typing import Any, Dict, Iterable, List, Optional
+
+CLAUSE_LOOKUP_ENABLED = os.getenv("CLAUSE_LOOKUP", "1").lower() not in {"0", "false", "off"}
+CLAUSE_LOOKUP_CANDIDATES = int(os.getenv("CLAUSE_LOOKUP_CANDIDATES", "5"))
+
+def source_provenance(contexts: List[Dict[str, Any]], route: str) -> Dict[str, Any]:
+    """
+    Provenance fields that let a later request find this clause again.
+    contexts: the ones the segmenter read; a stored clause is keyed on the first.
+    """
+    return {
+        "chunk_ids": [h.get("chunk_id") for h in contexts],
+        "text_hashes": [h.get("text_hash") for h in contexts],
+        "source_version": contexts[0].get("source_version") if contexts else None,
+        "route": route,
+    }
+
+def lookup_filter(ctx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Mongo filter for validated clauses derived from the same top chunk.
+    - chunk_id or text_hash must be the clause's primary source
+    - source_version must match, so re-ingested documents are re-derived
+    """
+    # the plain array match lets the multikey indexes narrow; ".0" pins the position
+    keys = []
+    if ctx.get("chunk_id"):
+        keys.append({"provenance.chunk_ids": ctx["chunk_id"], "provenance.chunk_ids.0": ctx["chunk_id"]})
+    if ctx.get("text_hash"):
+        keys.append({"provenance.text_hashes": ctx["text_hash"], "provenance.text_hashes.0": ctx["text_hash"]})
+    if not keys:
+        return None  # vectors ingested before chunk ids were stored
+    return {
+        "provenance.route": "OK",
+        "provenance.source_version": ctx.get("source_version"),
+        "$or": keys,
+    }
+
+def pick(docs: Iterable[Dict[str, Any]], ctx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Prefers a clause with the chunk's article_id, then the first match."""
+    best = None
+    for d in docs:
+        d.pop("_id", None)
+        if ctx.get("article_id") and d.get("article_id") == ctx["article_id"]:
+            return d
+        best = best or d
+    return best
+
+class LookupStats:
+    """Hit rate of the stored-clause lookup and the derivation time it saved."""
+
+    def __init__(self):
+        self.hits = self.misses = 0
+        self.derive_ms = 0.0   # moving average over misses
+        self.saved_ms = 0.0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+            self.saved_ms += self.derive_ms
+
+    def miss(self, derive_ms: float):
+        with self._lock:
+            self.misses += 1
+            self.derive_ms = derive_ms if self.misses == 1 else 0.9 * self.derive_ms + 0.1 * derive_ms
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": CLAUSE_LOOKUP_ENABLED,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "avg_derive_ms": round(self.derive_ms, 1),
+            "saved_ms": round(self.saved_ms, 1),
+        }
+
+STATS = LookupStats()
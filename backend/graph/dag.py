@@ -0,0 +1,121 @@
+import asyncio, time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Sequence, Tuple
+from graph.state import BotState
+
+class Stage(NamedTuple):
+    """
+    One pipeline node in a dependency DAG.
+    - deps: names of stages whose output this stage reads
+    - writes: state / clause fields the stage sets ("provenance.x" for one
+      provenance key); stages that may run concurrently must write disjoint sets
+    """
+    name: str
+    deps: Tuple[str, ...]
+    run: Callable[[BotState], BotState]
+    arun: Callable[[BotState], Awaitable[BotState]]
+    writes: Tuple[str, ...] = ()
+
+def _ancestors(stages: Sequence[Stage]) -> Dict[str, set]:
+    by_name = {s.name: s for s in stages}
+    memo: Dict[str, set] = {}
+
+    def walk(name: str) -> set:
+        if name not in memo:
+            memo[name] = set()
+            for d in by_name[name].deps:
+                memo[name] |= {d} | walk(d)
+        return memo[name]
+
+    for s in stages:
+        walk(s.name)
+    return memo
+
+def check_dag(stages: Sequence[Stage]):
+    """Raises ValueError for unknown deps, cycles, or concurrent stages with overlapping writes."""
+    names = [s.name for s in stages]
+    seen = set()
+    for s in stages:
+        missing = [d for d in s.deps if d not in names]
+        if missing:
+            raise ValueError(f"stage {s.name!r} depends on unknown stages {missing}")
+        if any(d not in seen for d in s.deps):
+            raise ValueError(f"stage {s.name!r} must be declared after its deps {list(s.deps)}")
+        seen.add(s.name)
+    anc = _ancestors(stages)
+    for i, a in enumerate(stages):
+        for b in stages[i + 1:]:
+            ordered = a.name in anc[b.name] or b.name in anc[a.name]
+            clash = set(a.writes) & set(b.writes)
+            if not ordered and clash:
+                raise ValueError(f"stages {a.name!r} and {b.name!r} may run concurrently but both write {sorted(clash)}")
+
+def without(stages: Sequence[Stage], done: Sequence[str]) -> List[Stage]:
+    """The stages not in `done`, with deps on `done` dropped (they are already satisfied)."""
+    return [s._replace(deps=tuple(d for d in s.deps if d not in done)) for s in stages if s.name not in done]
+
+def _waves(stages: Sequence[Stage]) -> List[List[Stage]]:
+    level: Dict[str, int] = {}
+    for s in stages:  # declaration order is topological (check_dag)
+        level[s.name] = 1 + max((level[d] for d in s.deps), default=-1)
+    waves: List[List[Stage]] = [[] for _ in range(max(level.values(), default=-1) + 1)]
+    for s in stages:
+        waves[level[s.name]].append(s)
+    return waves
+
+@contextmanager
+def timed(state: BotState, name: str):
+    """
+    Records {"start_ms", "end_ms"} for a stage under state["_timings"], relative to the first stage.
+    - calls state["_on_stage"](name, state) once the stage succeeded (SSE events)
+    """
+    timings = state.setdefault("_timings", {})
+    t0 = state.setdefault("_t0", time.perf_counter())
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        timings[name] = {"start_ms": round((start - t0) * 1000, 1), "end_ms": round((end - t0) * 1000, 1)}
+    on_stage = state.get("_on_stage")
+    if on_stage is not None:
+        on_stage(name, state)
+
+def run_dag(state: BotState, stages: Sequence[Stage]) -> BotState:
+    """Runs stages wave by wave; independent stages of a wave run on threads."""
+    for wave in _waves(stages):
+        if len(wave) == 1:
+            with timed(state, wave[0].name):
+                wave[0].run(state)
+            continue
+
+        def call(s: Stage):
+            with timed(state, s.name):
+                s.run(state)
+
+        with ThreadPoolExecutor(max_workers=len(wave)) as pool:
+            for f in [pool.submit(call, s) for s in wave]:
+                f.result()
+    return state
+
+async def arun_dag(state: BotState, stages: Sequence[Stage]) -> BotState:
+    """Starts every stage as soon as its deps finish; a failure cancels the rest."""
+    done = {s.name: asyncio.Event() for s in stages}
+
+    async def call(s: Stage):
+        for d in s.deps:
+            await done[d].wait()
+        with timed(state, s.name):
+            await s.arun(state)
+        done[s.name].set()
+
+    tasks = [asyncio.ensure_future(call(s)) for s in stages]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return state
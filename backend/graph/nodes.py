@@ -1,35 +1,101 @@
-import json
-from typing import Dict, Any, List, Optional
+import json, asyncio, datetime
+from typing import Dict, Any, List, Optional, Tuple
+from pydantic import ValidationError
 from tenacity import retry, stop_after_attempt, wait_exponential
 from langchain_openai import OpenAIEmbeddings
 from utils.openai_client import get_chat, get_embeddings
+from retrieval.backends import get_index
+from retrieval.hybrid import LexicalPlan, lexical_plan
+from retrieval.planner import SOURCES, plan_query, filtered_query
+from retrieval.packing import CONTEXT_BUDGETS, rerank, pack, joined
+from utils.llm_memo import get_llm_memo
+from utils.rate_limit import LLM_LIMITER, estimate_tokens
+from utils.json_stream import JsonFieldStream
+from utils.hashing import sha1
+from utils import deontic_rules
+from db.write_behind import get_writer
+from graph.clause_lookup import CLAUSE_LOOKUP_CANDIDATES, source_provenance, lookup_filter, pick
 from db.mongo import docs, clauses, chats
 from graph.state import BotState, Clause
 from graph import prompts as P
-from pinecone import Pinecone
-import os
+
+# Every LLM node is split into a request half (state -> prompt, payload) and
+# an apply half (state, result -> state), shared by the sync node `x` and its
+# async twin `ax`; only the transport differs.
+
+LLMRequest = Tuple[str, Dict[str, Any]]
 
 # ---------- Helpers ----------
 
-def _llm_json(prompt: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-    chat = get_chat()
-    msg = f"{prompt}\n\nReturn ONLY a single JSON object.\n\nINPUT:\n{json.dumps(payload, ensure_ascii=False)}"
-    resp = chat.invoke([("user", msg)])
-    txt = resp.content or ""
+def _llm_message(prompt: str, payload: Dict[str, Any]) -> str:
+    return f"{prompt}\n\nReturn ONLY a single JSON object.\n\nINPUT:\n{json.dumps(payload, ensure_ascii=False)}"
+
+def _parse_json(txt: Optional[str]) -> Dict[str, Any]:
+    txt = txt or ""
     try:
         return json.loads(txt)
     except Exception:
         # Fallback: return raw text as an "answer" so UI never goes blank
         return {"answer": txt.strip(), "_raw": True}
 
+def _memo_lookup(chat, prompt: str, payload: Dict[str, Any], memo: bool):
+    # identical (prompt, model, payload) -> identical result; see utils/llm_memo.py
+    m = get_llm_memo() if memo else None
+    if m is None:
+        return None, None, None
+    key = m.key(prompt, getattr(chat, "model_name", ""), payload)
+    return m, key, m.get(key)
+
+def _memo_store(m, key, r):
+    # raw-text fallbacks are not worth remembering
+    if m is not None and not (isinstance(r, dict) and r.get("_raw")):
+        m.put(key, r)
+
+def _llm_json(prompt: str, payload: Dict[str, Any], memo: bool = True) -> Dict[str, Any]:
+    chat = get_chat()
+    m, key, hit = _memo_lookup(chat, prompt, payload, memo)
+    if hit is not None:
+        return hit
+    resp = chat.invoke([("user", _llm_message(prompt, payload))])
+    r = _parse_json(resp.content)
+    _memo_store(m, key, r)
+    return r
+
+async def _allm_json(prompt: str, payload: Dict[str, Any], memo: bool = True) -> Dict[str, Any]:
+    chat = get_chat()
+    # memo reads/writes are SQLite (and the first get_llm_memo() prunes it): off the event loop
+    m, key, hit = await asyncio.to_thread(_memo_lookup, chat, prompt, payload, memo) if memo else (None, None, None)
+    if hit is not None:
+        return hit
+    msg = _llm_message(prompt, payload)
+    limiter = LLM_LIMITER.get()
+    if limiter is not None:
+        # set by batch jobs that must stay within an RPM / TPM budget
+        await limiter.acquire(tokens=estimate_tokens(msg))
+    resp = await chat.ainvoke([("user", msg)])
+    r = _parse_json(resp.content)
+    if m is not None:
+        await asyncio.to_thread(_memo_store, m, key, r)
+    return r
+
+
+def _merge_provenance(c: Clause, **updates: Any):
+    # update the existing dict in place so enrichment stages running
+    # concurrently never overwrite each other's keys
+    if c.provenance is None:
+        c.provenance = {}
+    c.provenance.update(updates)
+
 
 def _embed_query(q: str) -> List[float]:
     emb = get_embeddings()
     return emb.embed_query(q)
 
 def _persist_chat(thread_id: str, role: str, content: str, retrieval_log: Optional[Dict[str, Any]] = None):
-    chats.insert_one({
+    # queued; db/write_behind.py batches it into insert_many
+    get_writer().insert(chats, {
         "thread_id": thread_id,
+        "created": datetime.datetime.utcnow(),
         "role": role,
         "content": content,
         "retrieval_log": retrieval_log or {},
@@ -37,41 +103,146 @@ def _persist_chat(thread_id: str, role: str, content: str, retrieval_log: Option
 
 # ---------- Retrieval ----------
 
+TOP_K = 6  # contexts handed to the pipeline, unless the query plan sets its own
+
+def context_from_metadata(md: Dict[str, Any], score: Optional[float] = None) -> Dict[str, Any]:
+    return {
+        "text": md.get("text",""),
+        "article_id": md.get("article_id"),
+        "source_uri": md.get("source_uri"),
+        "source_version": md.get("source_version"),
+        "chunk_id": md.get("chunk_id"),
+        "text_hash": md.get("text_hash"),
+        "score": score
+    }
+
+def _contexts_from_matches(res) -> List[Dict[str, Any]]:
+    return [context_from_metadata(m["metadata"], m.get("score")) for m in res.get("matches", [])]
+
+def _retrieve_apply(state: BotState, res, plan: Optional[LexicalPlan], hits) -> BotState:
+    if plan is None:
+        state["contexts"] = _contexts_from_matches(res)
+    else:
+        # hybrid: the named article's chunks, then RRF of the dense and BM25 rankings
+        state["contexts"] = [context_from_metadata(md, score)
+                             for md, score in plan.fuse(res.get("matches", []) if res else [], hits)]
+    return state
+
+def query_vector(state: BotState) -> List[float]:
+    # embedded once per request; the answer cache and the retriever share it
+    if state.get("_qvec") is None:
+        state["_qvec"] = get_embeddings().embed_query(state["query"] or "")
+    return state["_qvec"]
+
+async def aquery_vector(state: BotState) -> List[float]:
+    if state.get("_qvec") is None:
+        state["_qvec"] = await get_embeddings().aembed_query(state["query"] or "")
+    return state["_qvec"]
+
+def query_planner(state: BotState) -> BotState:
+    """Articles, regulation / version scope and top_k for the retriever (retrieval/planner.py)."""
+    state["_plan"] = plan_query(state, TOP_K)
+    return state
+
+async def aquery_planner(state: BotState) -> BotState:
+    if SOURCES.due():
+        await asyncio.to_thread(SOURCES.refresh)
+    return query_planner(state)
+
+def _query_plan(state: BotState) -> Dict[str, Any]:
+    # the retriever also runs outside the DAG (benchmarks)
+    if state.get("_plan") is None:
+        query_planner(state)
+    return state["_plan"]
+
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
 def rag_retriever(state: BotState) -> BotState:
-    emb = get_embeddings()
-    qvec = emb.embed_query(state["query"] or "")
-    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-    idx = pc.Index(os.getenv("PINECONE_INDEX"))
-    res = idx.query(vector=qvec, top_k=6, include_metadata=True)
-    state["contexts"] = [
-        {
-            "text": m["metadata"].get("text",""),
-            "article_id": m["metadata"].get("article_id"),
-            "source_uri": m["metadata"].get("source_uri"),
-            "source_version": m["metadata"].get("source_version"),
-            "score": m.get("score")
-        }
-        for m in res.get("matches", [])
-    ]
+    qp = _query_plan(state)
+    plan = lexical_plan(state["query"], qp["top_k"], qp["articles"], qp["scope"])
+    if plan is not None and plan.fast:
+        return _retrieve_apply(state, None, plan, plan.search())
+    qvec = query_vector(state)
+    lexical = plan.submit() if plan is not None else None
+    res = filtered_query(get_index(), qvec, qp, plan.dense_top_k if plan else qp["top_k"])
+    return _retrieve_apply(state, res, plan, lexical.result() if lexical else None)
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
+async def arag_retriever(state: BotState) -> BotState:
+    qp = _query_plan(state)
+    # the lexical index is SQLite (a snapshot rebuild after each ingest commit), and the
+    # index clients are synchronous (Pinecone: a network round trip); keep both off the event loop
+    plan = await asyncio.to_thread(lexical_plan, state["query"], qp["top_k"], qp["articles"], qp["scope"])
+    if plan is not None and plan.fast:
+        return await asyncio.to_thread(lambda: _retrieve_apply(state, None, plan, plan.search()))
+    qvec = await aquery_vector(state)
+    idx = get_index()
+    dense = asyncio.to_thread(filtered_query, idx, qvec, qp, plan.dense_top_k if plan else qp["top_k"])
+    if plan is None:
+        return _retrieve_apply(state, await dense, None, None)
+    res, hits = await asyncio.gather(dense, asyncio.wrap_future(plan.submit()))
+    # fuse() reads metadata of BM25-only hits from SQLite
+    return await asyncio.to_thread(_retrieve_apply, state, res, plan, hits)
+
+def rerank_contexts(state: BotState) -> BotState:
+    """Local MMR rerank of the retrieved contexts (retrieval/packing.py); no model call."""
+    state["contexts"] = rerank(state["query"] or "", state["contexts"])
+    return state
+
+async def arerank_contexts(state: BotState) -> BotState:
+    return rerank_contexts(state)
+
+def stage_contexts(state: BotState, stage: str) -> List[Dict[str, Any]]:
+    """The contexts an LLM stage reads: reranked contexts packed into CONTEXT_BUDGETS[stage] tokens."""
+    return pack(state["contexts"], CONTEXT_BUDGETS[stage])
+
+def _find_stored_clause(state: BotState) -> Optional[Dict[str, Any]]:
+    f = lookup_filter(state["contexts"][0]) if state["contexts"] else None
+    if f is None:
+        return None
+    return pick(clauses.find(f).sort("updated", -1).limit(CLAUSE_LOOKUP_CANDIDATES), state["contexts"][0])
+
+def _lookup_apply(state: BotState, doc: Optional[Dict[str, Any]]) -> BotState:
+    state["_clause_hit"] = doc is not None
+    if doc is not None:
+        state["working_clause"] = Clause(**doc)
+        state["_route"] = "OK"
     return state
 
+def clause_lookup(state: BotState) -> BotState:
+    """Reuses a clause already formalized and validated from the same chunk."""
+    return _lookup_apply(state, _find_stored_clause(state))
+
+async def aclause_lookup(state: BotState) -> BotState:
+    return _lookup_apply(state, await asyncio.to_thread(_find_stored_clause, state))
+
 # ---------- Pipeline nodes ----------
 
-def provision_segmenter(state: BotState) -> BotState:
-    # concatenate a couple of best contexts to avoid exploding tokens
-    ctx = "\n\n".join([h["text"] for h in state["contexts"][:2]])
-    r = _llm_json(P.SEGMENTER_PROMPT, {"text": ctx})
+def _segmenter_request(state: BotState) -> LLMRequest:
+    return P.SEGMENTER_PROMPT, {"text": joined(stage_contexts(state, "segment"))}
+
+def _segmenter_apply(state: BotState, r: Any) -> BotState:
     items = r if isinstance(r, list) else r.get("clauses", [])
     if not items:
         # fall back to a single "clause" being the top chunk itself
         text = state["contexts"][0]["text"] if state["contexts"] else ""
         state["working_clause"] = Clause(text=text, article_id=(state["contexts"][0].get("article_id") if state["contexts"] else None))
+        state["_segmented"] = [state["working_clause"]]
         return state
     first = items[0]
     state["working_clause"] = Clause(text=first["text"], article_id=first.get("article_id"))
+    # every clause, for the multi-clause fan-out; the single-clause path uses only the first
+    state["_segmented"] = [state["working_clause"]] + [
+        Clause(text=it["text"], article_id=it.get("article_id"))
+        for it in items[1:] if isinstance(it, dict) and it.get("text")
+    ]
     return state
 
+def provision_segmenter(state: BotState) -> BotState:
+    return _segmenter_apply(state, _llm_json(*_segmenter_request(state)))
+
+async def aprovision_segmenter(state: BotState) -> BotState:
+    return _segmenter_apply(state, await _allm_json(*_segmenter_request(state)))
+
 # def clause_classifier(state: BotState) -> BotState:
 #     c = state["working_clause"]
 #     r = _llm_json(P.CLASSIFIER_PROMPT, {"text": c.text})
@@ -81,9 +252,11 @@ def provision_segmenter(state: BotState) -> BotState:
 #     c.confidence["classify"] = r.get("confidence", 0.8)
 #     return state
 
-def clause_classifier(state: BotState) -> BotState:
+def _classifier_request(state: BotState) -> LLMRequest:
+    return P.CLASSIFIER_PROMPT, {"text": state["working_clause"].text}
+
+def _classifier_apply(state: BotState, r: Dict[str, Any]) -> BotState:
     c = state["working_clause"]
-    r = _llm_json(P.CLASSIFIER_PROMPT, {"text": c.text})
 
     # only set known structural fields
     for k in ["modality","actor","action_verb","object","condition","exceptions","scope","ambiguity"]:
@@ -101,29 +274,115 @@ def clause_classifier(state: BotState) -> BotState:
 
     return state
 
+def _rules_classification(state: BotState) -> Optional[Dict[str, Any]]:
+    # local keyword patterns first (utils/deontic_rules.py); None = ambiguous, ask the LLM
+    r = deontic_rules.confident(state["working_clause"].text)
+    deontic_rules.STATS.record(r is not None)
+    if r is not None:
+        _merge_provenance(state["working_clause"], classified_by="rules")
+    return r
 
-def definitions_node(state: BotState) -> BotState:
+def clause_classifier(state: BotState) -> BotState:
+    r = _rules_classification(state)
+    return _classifier_apply(state, r if r is not None else _llm_json(*_classifier_request(state)))
+
+async def aclause_classifier(state: BotState) -> BotState:
+    r = _rules_classification(state)
+    return _classifier_apply(state, r if r is not None else await _allm_json(*_classifier_request(state)))
+
+
+def _definitions_request(state: BotState) -> LLMRequest:
+    c = state["working_clause"]
+    defs_ctx = joined(stage_contexts(state, "definitions"))
+    return P.DEFINITIONS_PROMPT, {"clause": c.model_dump(), "definitions_context": defs_ctx}
+
+def _definitions_apply(state: BotState, r: Dict[str, Any]) -> BotState:
     c = state["working_clause"]
-    defs_ctx = "\n\n".join([d["text"] for d in state["contexts"][:3]])
-    r = _llm_json(P.DEFINITIONS_PROMPT, {"clause": c.model_dump(), "definitions_context": defs_ctx})
     if r.get("actor_canonical"):
         c.actor_canonical = r["actor_canonical"]
-    prov = c.provenance or {}
-    prov["definition_hits"] = r.get("definition_hits", [])
-    c.provenance = prov
+    _merge_provenance(c, definition_hits=r.get("definition_hits", []))
     return state
 
-def xref_node(state: BotState) -> BotState:
+def definitions_node(state: BotState) -> BotState:
+    return _definitions_apply(state, _llm_json(*_definitions_request(state)))
+
+async def adefinitions_node(state: BotState) -> BotState:
+    return _definitions_apply(state, await _allm_json(*_definitions_request(state)))
+
+def _xref_request(state: BotState) -> LLMRequest:
+    return P.XREF_PROMPT, {"clause": state["working_clause"].model_dump()}
+
+def _xref_apply(state: BotState, r: Dict[str, Any]) -> BotState:
     c = state["working_clause"]
-    r = _llm_json(P.XREF_PROMPT, {"clause": c.model_dump()})
-    prov = c.provenance or {}
-    prov["xref_links"] = r.get("xref_links", [])
-    c.provenance = prov
+    _merge_provenance(c, xref_links=r.get("xref_links", []))
     imported = r.get("imported_conditions", [])
     if imported:
         c.condition = (c.condition + " AND " if c.condition else "") + " AND ".join(imported)
     return state
 
+def xref_node(state: BotState) -> BotState:
+    return _xref_apply(state, _llm_json(*_xref_request(state)))
+
+async def axref_node(state: BotState) -> BotState:
+    return _xref_apply(state, await _allm_json(*_xref_request(state)))
+
+# ---------- Fused mode: segment + classify + definitions + xref (+ formula) in one call ----------
+
+_MODALITIES = {"OBLIGATION","PROHIBITION","PERMISSION","EXEMPTION","RECOMMENDATION"}
+
+def _fused_request(state: BotState) -> LLMRequest:
+    ctx = stage_contexts(state, "segment")
+    # definitions come from the contexts the clause text did not use
+    defs = pack(state["contexts"], CONTEXT_BUDGETS["fused_definitions"], skip=[c.get("chunk_id") for c in ctx])
+    return P.FUSED_PROMPT, {"text": joined(ctx), "definitions_context": joined(defs)}
+
+def _fused_clause(item: Any) -> Optional[Clause]:
+    """Builds a Clause from one fused item, or None if it fails the schema checks."""
+    if not isinstance(item, dict) or not item.get("text"):
+        return None
+    if item.get("modality") not in _MODALITIES:
+        return None
+    if not (item.get("actor") or item.get("actor_canonical")) or not (item.get("action_verb") or item.get("object")):
+        return None
+    fields = {k: item[k] for k in ["text","article_id","modality","actor","actor_canonical","action_verb",
+                                   "object","condition","exceptions","scope"] if k in item}
+    try:
+        c = Clause(**fields)
+    except ValidationError:
+        return None
+    imported = item.get("imported_conditions") or []
+    if isinstance(imported, list) and imported:
+        c.condition = (c.condition + " AND " if c.condition else "") + " AND ".join(map(str, imported))
+    try:
+        conf = float(item.get("confidence"))
+        c.confidence["classify"] = c.confidence["formalize"] = conf
+    except (TypeError, ValueError):
+        pass
+    if isinstance(item.get("formula"), str) and item["formula"].strip():
+        c.formulas["deontic"] = item["formula"]
+    _merge_provenance(c,
+        definition_hits=item.get("definition_hits") or [],
+        xref_links=item.get("xref_links") or [],
+        pipeline="fused",
+    )
+    return c
+
+def _fused_apply(state: BotState, r: Any) -> BotState:
+    items = r if isinstance(r, list) else r.get("clauses", [])
+    c = _fused_clause(items[0]) if items else None
+    # on failure the caller falls back to the per-node chain
+    state["_fused_ok"] = c is not None
+    if c is not None:
+        state["working_clause"] = c
+        state["_segmented"] = [c] + [x for x in map(_fused_clause, items[1:]) if x is not None]
+    return state
+
+def fused_extractor(state: BotState) -> BotState:
+    return _fused_apply(state, _llm_json(*_fused_request(state)))
+
+async def afused_extractor(state: BotState) -> BotState:
+    return _fused_apply(state, await _allm_json(*_fused_request(state)))
+
 # def deontic_formalizer(state: BotState) -> BotState:
 #     c = state["working_clause"]
 #     r = _llm_json(P.FORMALIZER_PROMPT, {"json": c.model_dump()})
@@ -135,9 +394,15 @@ def xref_node(state: BotState) -> BotState:
 #                 setattr(c, k, v)
 #     return state
 
-def deontic_formalizer(state: BotState) -> BotState:
+def _memo_ok(state: BotState) -> bool:
+    # app.py marks refine passes: they re-ask on purpose, and the memo would repeat the result being refined
+    return not state.get("_refining")
+
+def _formalizer_request(state: BotState) -> LLMRequest:
+    return P.FORMALIZER_PROMPT, {"json": state["working_clause"].model_dump()}
+
+def _formalizer_apply(state: BotState, r: Dict[str, Any]) -> BotState:
     c = state["working_clause"]
-    r = _llm_json(P.FORMALIZER_PROMPT, {"json": c.model_dump()})
     c.formulas["deontic"] = r.get("formula")
 
     if not isinstance(c.confidence, dict):
@@ -157,6 +422,12 @@ def deontic_formalizer(state: BotState) -> BotState:
             setattr(c, k, v)
     return state
 
+def deontic_formalizer(state: BotState) -> BotState:
+    return _formalizer_apply(state, _llm_json(*_formalizer_request(state), memo=_memo_ok(state)))
+
+async def adeontic_formalizer(state: BotState) -> BotState:
+    return _formalizer_apply(state, await _allm_json(*_formalizer_request(state), memo=_memo_ok(state)))
+
 
 # def validator(state: BotState) -> BotState:
 #     from utils.validation import cheap_checks
@@ -176,14 +447,10 @@ def deontic_formalizer(state: BotState) -> BotState:
 #         state["_route"] = "OK"
 #     return state
 
-def validator(state: BotState) -> BotState:
-    """
-    Validates the current clause with local rules + LLM.
-    - Sets state["_errors"] (merged list)
-    - Sets state["_route"] in {"OK","REFINE","REVIEW"}
-    - Increments bounded retries for formalizer
-    - Records a numeric confidence under c.confidence["validate"]
-    """
+def _validator_request(state: BotState) -> LLMRequest:
+    return P.VALIDATOR_PROMPT, state["working_clause"].model_dump()
+
+def _validator_apply(state: BotState, remote: Dict[str, Any]) -> BotState:
     from utils.validation import cheap_checks
 
     c = state["working_clause"]
@@ -191,7 +458,6 @@ def validator(state: BotState) -> BotState:
     local = cheap_checks(c)  # {"pass": bool, "errors": [...]}
 
     # --- LLM checks (force JSON; tolerate plain text)
-    remote = _llm_json(P.VALIDATOR_PROMPT, c.model_dump())
     # Normalize remote fields
     remote_pass = bool(remote.get("pass", False))
     remote_retriable = bool(remote.get("retriable", True))
@@ -203,6 +469,7 @@ def validator(state: BotState) -> BotState:
     errors = (local.get("errors") or []) + remote_errors
     passed = bool(local.get("pass", False) and remote_pass)
     state["_errors"] = errors
+    state["_validated"] = passed
 
     # --- Confidence merge (always keep dict)
     if not isinstance(c.confidence, dict):
@@ -235,11 +502,27 @@ def validator(state: BotState) -> BotState:
 
     return state
 
+def validator(state: BotState) -> BotState:
+    """
+    Validates the current clause with local rules + LLM.
+    - Sets state["_errors"] (merged list)
+    - Sets state["_route"] in {"OK","REFINE","REVIEW"}
+    - Increments bounded retries for formalizer
+    - Records a numeric confidence under c.confidence["validate"]
+    """
+    return _validator_apply(state, _llm_json(*_validator_request(state), memo=_memo_ok(state)))
+
+async def avalidator(state: BotState) -> BotState:
+    return _validator_apply(state, await _allm_json(*_validator_request(state), memo=_memo_ok(state)))
 
-def ambiguity_router(state: BotState) -> BotState:
+
+def _ambiguity_request(state: BotState) -> LLMRequest:
     c = state["working_clause"]
     val = {"errors": state.get("_errors", []), "confidence": c.confidence.get("formalize", 0.0)}
-    r = _llm_json(P.AMBIGUITY_PROMPT, {"clause": c.model_dump(), "validator": val})
+    return P.AMBIGUITY_PROMPT, {"clause": c.model_dump(), "validator": val}
+
+def _ambiguity_apply(state: BotState, r: Dict[str, Any]) -> BotState:
+    c = state["working_clause"]
     route = r.get("route", "REVIEW")
     reason = r.get("reason", "")
     state["_route"] = route
@@ -250,17 +533,36 @@ def ambiguity_router(state: BotState) -> BotState:
     c.provenance = prov
     return state
 
-def answer_composer(state: BotState) -> BotState:
+def ambiguity_router(state: BotState) -> BotState:
+    return _ambiguity_apply(state, _llm_json(*_ambiguity_request(state)))
+
+async def aambiguity_router(state: BotState) -> BotState:
+    return _ambiguity_apply(state, await _allm_json(*_ambiguity_request(state)))
+
+def _answer_request(state: BotState) -> LLMRequest:
+    # ids, hashes and scores are for provenance, not the model
+    contexts = [{"article_id": h.get("article_id"), "text": h["text"]} for h in stage_contexts(state, "answer")]
+    results = state.get("_clause_results") or []
+    if len(results) > 1:
+        # multi-clause mode: ground the answer in every derived clause
+        return P.ANSWER_PROMPT, {
+            "question": state["query"], "clauses": [r["clause"].model_dump() for r in results],
+            "contexts": contexts
+        }
     c = state["working_clause"]
-    r = _llm_json(P.ANSWER_PROMPT, {
-        "question": state["query"], "clause": c.model_dump(), "contexts": state["contexts"]
-    })
+    return P.ANSWER_PROMPT, {
+        "question": state["query"], "clause": c.model_dump(), "contexts": contexts
+    }
+
+def _answer_apply(state: BotState, r: Dict[str, Any]) -> BotState:
     if isinstance(r, dict) and r.get("answer"):
         state["answer"] = r["answer"]
     else:
-        # final safeguard: synthesize a minimal answer from the clause
+        # final safeguard: synthesize a minimal answer from the clause(s)
         bits = []
-        if c.modality and (c.actor or c.actor_canonical) and (c.object or c.action_verb):
+        for c in [x["clause"] for x in state.get("_clause_results") or []] or [state["working_clause"]]:
+            if not (c.modality and (c.actor or c.actor_canonical) and (c.object or c.action_verb)):
+                continue
             who = c.actor_canonical or c.actor or "Actor"
             what = c.object or c.action_verb or "the required action"
             line = f"• **{c.modality}** for **{who}**: {what}"
@@ -270,14 +572,37 @@ def answer_composer(state: BotState) -> BotState:
     # citations (unchanged) ...
     return state
 
-
-def persist_results(state: BotState) -> BotState:
-    # persist chat
+def answer_composer(state: BotState) -> BotState:
+    # depends on the question, so never memoized
+    return _answer_apply(state, _llm_json(*_answer_request(state), memo=False))
+
+async def _astream_answer(state: BotState) -> Dict[str, Any]:
+    # forwards the "answer" field to state["_on_token"] as the model writes it
+    on_token, field, parts = state["_on_token"], JsonFieldStream("answer"), []
+    async for chunk in get_chat().astream([("user", _llm_message(*_answer_request(state)))]):
+        parts.append(chunk.content or "")
+        delta = field.feed(chunk.content or "")
+        if delta:
+            on_token(delta)
+    return _parse_json("".join(parts))
+
+async def aanswer_composer(state: BotState) -> BotState:
+    if state.get("_on_token") is not None:
+        return _answer_apply(state, await _astream_answer(state))
+    return _answer_apply(state, await _allm_json(*_answer_request(state), memo=False))
+
+
+def _plan_log(state: BotState) -> Optional[Dict[str, Any]]:
+    # the vector filter is left out: Mongo field names can't start with "$"
+    qp = state.get("_plan")
+    return {k: qp[k] for k in ("articles", "scope", "top_k", "relaxed")} if qp else None
+
+def persist_chats(state: BotState) -> BotState:
     _persist_chat(
         thread_id=state["thread_id"],
         role="user",
         content=state["query"],
-        retrieval_log={"doc_hits": [h.get("source_uri","") for h in state["contexts"]]}
+        retrieval_log={"doc_hits": [h.get("source_uri","") for h in state["contexts"]], "plan": _plan_log(state)}
     )
     _persist_chat(
         thread_id=state["thread_id"],
@@ -285,11 +610,61 @@ def persist_results(state: BotState) -> BotState:
         content=state.get("answer",""),
         retrieval_log={"citations": state.get("citations", [])}
     )
-    # upsert clause
-    c = state["working_clause"].model_dump()
-    clauses.update_one(
-        {"text": c["text"], "article_id": c.get("article_id")},
-        {"$set": c},
-        upsert=True
-    )
     return state
+
+def clause_result(state: BotState) -> Dict[str, Any]:
+    """The outcome for state["working_clause"] after formalize/validate/ambiguity."""
+    return {
+        "clause": state["working_clause"],
+        "route": state.get("_route", "OK"),
+        "validated": bool(state.get("_validated")),
+        "ambiguity_reason": state.get("_ambiguity_reason", ""),
+    }
+
+def clause_results(state: BotState) -> List[Dict[str, Any]]:
+    # one entry per derived clause (several in multi-clause mode)
+    if state.get("_clause_results"):
+        return state["_clause_results"]
+    return [clause_result(state)] if state.get("working_clause") else []
+
+def clause_docs(state: BotState) -> List[Dict[str, Any]]:
+    """Clause documents to upsert, remembering which chunks they came from (see clause_lookup)."""
+    out = []
+    for r in clause_results(state):
+        c = r["clause"].model_dump()
+        # "OK" = passed validation and not sent to review; only those are reused
+        route = "OK" if r["validated"] and r["route"] != "REVIEW" else r["route"]
+        c["provenance"] = {**(c.get("provenance") or {}), **source_provenance(stage_contexts(state, "segment"), route)}
+        c["text_hash"] = sha1(c["text"])
+        c["updated"] = datetime.datetime.utcnow()
+        out.append(c)
+    return out
+
+def clause_filter(c: Dict[str, Any]) -> Dict[str, Any]:
+    # identity of a stored clause (upsert key); text_hash is indexed, full text is not
+    return {"text_hash": c["text_hash"], "article_id": c.get("article_id")}
+
+def persist_results(state: BotState) -> BotState:
+    # persist chat
+    persist_chats(state)
+    # upsert clauses (write-behind: merged into one bulk_write per flush)
+    writer = get_writer()
+    for c in clause_docs(state):
+        writer.upsert(clauses, clause_filter(c), c)
+    return state
+
+async def _apersist(persist, state: BotState) -> BotState:
+    # enqueue on the loop; a flush the writes call for (writer disabled, backpressure,
+    # shut down) is blocking pymongo, so it runs in a worker thread
+    writer = get_writer()
+    with writer.deferred() as due:
+        persist(state)
+    if due.flush:
+        await asyncio.to_thread(writer.flush)
+    return state
+
+async def apersist_results(state: BotState) -> BotState:
+    return await _apersist(persist_results, state)
+
+async def apersist_chats(state: BotState) -> BotState:
+    return await _apersist(persist_chats, state)
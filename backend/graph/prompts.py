@@ -100,5 +100,33 @@ Use REVIEW if semantic gaps/definitions missing; REFINE if fixable formatting/st
 
 ANSWER_PROMPT = """Return ONLY JSON:
 {"answer": "<concise grounded summary with bullets and article ids>"}
-Use ONLY the provided clause/contexts; no extra sources."""
+Use ONLY the provided clause(s)/contexts; no extra sources."""
 
+
+FUSED_PROMPT = """You turn legal text into formalized normative clauses in ONE pass.
+Return JSON exactly like:
+{"clauses": [{
+  "text": "original wording of one atomic normative clause",
+  "article_id": "Art 10(2)" or null,
+  "modality": "OBLIGATION|PROHIBITION|PERMISSION|EXEMPTION|RECOMMENDATION",
+  "actor": "actor as it appears in the text",
+  "actor_canonical": "AI_Act.Provider|AI_Act.Deployer|AI_Act.Distributor|AI_Act.Importer|AI_Act.AuthorizedRepresentative|AI_Act.NotifiedBody|AI_Act.MarketSurveillanceAuthority|AI_Act.AI_Office|AI_Act.ProductManufacturer|AI_Act.User" or null,
+  "action_verb": "...",
+  "object": "...",
+  "condition": null or "...",
+  "exceptions": [],
+  "scope": {},
+  "definition_hits": [{"term":"provider","article":"Art 3(3)"}],
+  "xref_links": [{"target":"Art 6(2)","type":"subject_to"}],
+  "imported_conditions": [],
+  "formula": "SDL formula",
+  "confidence": 0.0-1.0
+}]}
+
+Segmentation: keep original wording; split by normative force ("shall", "must", "is prohibited", "may"); keep conditions attached to the clause they constrain. List the most relevant clause first.
+Modality: OBLIGATION = shall/must/is required to; PROHIBITION = shall not/must not/prohibited; PERMISSION = may/is permitted to; EXEMPTION = exempt from/does not apply to; RECOMMENDATION = should/encouraged to.
+Canonical actor: use the EU AI Act definitions in "definitions_context" ("providers" -> AI_Act.Provider, "deployers"/"users of AI systems" -> AI_Act.Deployer); null if uncertain.
+Cross-references: record references such as "subject to Article 6(2)" or "as set out in Annex III" in xref_links.
+Formula by modality: OBLIGATION -> O(Actor -> Action [& Condition]), PROHIBITION -> F(...), PERMISSION -> P(...), EXEMPTION -> ¬O(Actor -> Action), RECOMMENDATION -> R(...); e.g. O(provider -> test[high-risk systems] & before placing on market).
+If uncertain, set confidence < 0.7.
+"""
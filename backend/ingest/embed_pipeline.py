@@ -0,0 +1,68 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+# batch size for embed_documents and how many batches may be in flight at once
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+UPSERT_BATCH = 100
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
+def _embed_batch(emb, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    vecs = emb.embed_documents([r["metadata"]["text"] for r in batch])
+    return [{**r, "values": v} for r, v in zip(batch, vecs)]
+
+def upsert_vectors(index, vectors: List[Dict[str, Any]], lexical=None):
+    for s in range(0, len(vectors), UPSERT_BATCH):
+        index.upsert(vectors=vectors[s:s+UPSERT_BATCH])
+    if lexical is not None:
+        # BM25 side of hybrid retrieval (retrieval/lexical.py), same ids and metadata
+        lexical.add(vectors)
+
+def embed_and_upsert(
+    records: Iterable[Dict[str, Any]],
+    emb,
+    index,
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    lexical=None,
+) -> int:
+    """
+    Embeds `records` ({"id", "metadata": {"text", ...}}) with embed_documents in
+    batches and upserts them into `index`.
+    - At most `concurrency` batches are being embedded at any time; `records`
+      is consumed lazily, so a generator keeps memory bounded.
+    - Finished batches are upserted as they complete, while later batches are
+      still being embedded.
+    - With `lexical` (a LexicalIndex) each upserted batch is indexed for BM25 too.
+    Returns the number of vectors upserted.
+    """
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    concurrency = max(1, concurrency or EMBED_CONCURRENCY)
+    batches = batched(records, batch_size)
+    total = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = set()
+        for batch in islice(batches, concurrency):
+            pending.add(pool.submit(_embed_batch, emb, batch))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                vectors = fut.result()
+                # refill the slot before upserting so embedding never idles
+                nxt = next(batches, None)
+                if nxt is not None:
+                    pending.add(pool.submit(_embed_batch, emb, nxt))
+                upsert_vectors(index, vectors, lexical)
+                total += len(vectors)
+    return total
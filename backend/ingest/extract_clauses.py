@@ -0,0 +1,335 @@
+"""
+Offline clause extraction over every chunk of ingested documents.
+
+    python ingest/extract_clauses.py --doc-id <doc_id> [--doc-id ...]          # chunks from the vector index
+    python ingest/extract_clauses.py --chunks chunks.jsonl --stub --out clauses.jsonl
+    python ingest/extract_clauses.py --doc-id <doc_id> --batch-export batch_input.jsonl
+    python ingest/extract_clauses.py --doc-id <doc_id> --batch-import batch_output.jsonl
+
+Each chunk goes through segment -> classify -> enrich -> formalize -> validate
+in multi-clause mode, so every clause in the chunk is kept. A concurrency
+limit and an RPM / TPM budget apply to the whole run. Clauses are upserted
+into `clauses` with bulk writes. Finished chunks are appended to a
+checkpoint, so a rerun skips them and retries only the failures.
+
+--batch-export / --batch-import go through the OpenAI Batch API instead.
+Each chunk becomes one fused extraction request: cheaper, but asynchronous.
+Imported clauses only get the local checks (utils/validation.py), so they
+are stored with route "BATCH" (or "REVIEW"). clause_lookup does not reuse
+them until they are re-validated.
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import argparse, asyncio, json, os, time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+DEFAULT_CHECKPOINT = ".cache/extract_checkpoint.jsonl"
+FETCH_BATCH = 100
+
+# ---------- Chunk sources ----------
+
+def metadata_from_index(doc_ids: List[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(chunk_id, raw vector metadata) of every chunk of each doc_id that has text, in document order."""
+    from ingest.manifest import load_manifest
+    from retrieval.backends import get_index
+
+    index = get_index()
+    for doc_id in doc_ids:
+        ids = list(load_manifest(doc_id))  # saved in document order (chunk ids are content hashes)
+        if not ids:
+            print(f"[extract] no manifest for doc_id {doc_id}; ingest it first")
+        for i in range(0, len(ids), FETCH_BATCH):
+            vectors = index.fetch(ids=ids[i:i + FETCH_BATCH]).vectors
+            for cid in ids[i:i + FETCH_BATCH]:
+                v = vectors.get(cid)
+                md = (v.metadata if hasattr(v, "metadata") else (v or {}).get("metadata")) or {}
+                if md.get("text"):
+                    yield cid, md
+
+def chunks_from_index(doc_ids: List[str]) -> List[Dict[str, Any]]:
+    """Every chunk of each doc_id, in document order, with its text from the index metadata."""
+    from graph.nodes import context_from_metadata
+    return [context_from_metadata({**md, "chunk_id": cid}) for cid, md in metadata_from_index(doc_ids)]
+
+def chunks_from_jsonl(path: str) -> List[Dict[str, Any]]:
+    """One chunk per line: {"text", "chunk_id"?, "article_id"?, "source_uri"?, "source_version"?, ...}."""
+    from graph.nodes import context_from_metadata
+    from utils.hashing import sha1
+
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            md = json.loads(line)
+            h = md.get("text_hash") or sha1(md["text"])
+            out.append(context_from_metadata({**md, "chunk_id": md.get("chunk_id") or h, "text_hash": h}))
+    return out
+
+# ---------- Checkpoint + writers ----------
+
+class ChunkCheckpoint:
+    """Append-only {"chunk_id", "status", ...} lines; the last status per chunk wins."""
+
+    def __init__(self, path: str):
+        self.path, self.done, self.failed = path, set(), set()
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._apply(json.loads(line))
+        except FileNotFoundError:
+            pass
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._f = open(path, "a", encoding="utf-8")
+
+    def _apply(self, e: Dict[str, Any]):
+        ok = e["status"] == "ok"
+        (self.done if ok else self.failed).add(e["chunk_id"])
+        (self.failed if ok else self.done).discard(e["chunk_id"])
+
+    def record(self, chunk_id: str, status: str, **info: Any):
+        e = {"chunk_id": chunk_id, "status": status, **info}
+        self._apply(e)
+        self._f.write(json.dumps(e, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+def mongo_writer() -> Callable[[List[Dict[str, Any]]], None]:
+    from pymongo import UpdateOne
+    from db.mongo import clauses
+    from graph.nodes import clause_filter
+
+    def write(docs: List[Dict[str, Any]]):
+        ops = [UpdateOne(clause_filter(d), {"$set": d}, upsert=True) for d in docs]
+        if ops:
+            clauses.bulk_write(ops, ordered=False)
+    return write
+
+def jsonl_writer(path: str) -> Callable[[List[Dict[str, Any]]], None]:
+    from utils.export import dumps  # datetimes ("updated") as ISO 8601, like /api/export
+
+    def write(docs: List[Dict[str, Any]]):
+        with open(path, "a", encoding="utf-8") as f:
+            for d in docs:
+                f.write(dumps(d) + "\n")
+    return write
+
+class BufferedWriter:
+    """Collects clause docs per chunk; a chunk is checkpointed only once its clauses are written."""
+
+    def __init__(self, write: Callable[[List[Dict[str, Any]]], None], ckpt: ChunkCheckpoint, batch: int):
+        self.write, self.ckpt, self.batch = write, ckpt, batch
+        self.pending: List[Any] = []
+        self.n_docs = self.written = 0
+        self._lock = asyncio.Lock()
+
+    async def add(self, chunk_id: str, docs: List[Dict[str, Any]], status: str = "ok"):
+        self.pending.append((chunk_id, docs, status))
+        self.n_docs += len(docs)
+        if self.n_docs >= self.batch:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            batch, self.pending, self.n_docs = self.pending, [], 0
+            docs = [d for _, ds, _ in batch for d in ds]
+            if docs:
+                await asyncio.to_thread(self.write, docs)
+                self.written += len(docs)
+            for chunk_id, ds, status in batch:
+                self.ckpt.record(chunk_id, status, clauses=len(ds))
+
+# ---------- Online extraction ----------
+
+def _chunk_state(ctx: Dict[str, Any], mode: Optional[str]) -> Dict[str, Any]:
+    return {
+        "thread_id": "extract", "messages": [], "query": None, "contexts": [ctx],
+        "working_clause": None, "retries": {}, "answer": None, "citations": [],
+        "_multi": True, "_mode": mode,
+    }
+
+async def run_extract(
+    chunks: List[Dict[str, Any]],
+    write: Callable[[List[Dict[str, Any]]], None],
+    concurrency: int = 8,
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+    mode: Optional[str] = None,
+    checkpoint_path: str = DEFAULT_CHECKPOINT,
+    write_batch: int = 200,
+    attempts: int = 3,
+) -> int:
+    from graph.app import aderive_clauses
+    from graph.nodes import clause_docs
+    from utils.rate_limit import AsyncRateLimiter, LLM_LIMITER
+
+    # every LLM call below (including the per-clause fan-out) shares one budget
+    LLM_LIMITER.set(AsyncRateLimiter(rpm=rpm, tpm=tpm))
+    slots = asyncio.Semaphore(concurrency)
+    ckpt = ChunkCheckpoint(checkpoint_path)
+    writer = BufferedWriter(write, ckpt, write_batch)
+    todo = [c for c in chunks if c["chunk_id"] not in ckpt.done]
+    print(f"[extract] {len(todo)} chunks to process ({len(chunks) - len(todo)} already done per {checkpoint_path})")
+    t0, done, failed = time.perf_counter(), 0, 0
+
+    @retry(stop=stop_after_attempt(attempts), wait=wait_exponential(min=1, max=30), reraise=True)
+    async def derive(ctx: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return clause_docs(await aderive_clauses(_chunk_state(ctx, mode)))
+
+    async def one(ctx: Dict[str, Any]):
+        nonlocal done, failed
+        async with slots:
+            try:
+                docs = await derive(ctx)
+            except Exception as e:
+                failed += 1
+                ckpt.record(ctx["chunk_id"], "failed", error=repr(e)[:500])
+                print(f"[extract] FAILED {ctx['chunk_id']}: {e!r}")
+                return
+        await writer.add(ctx["chunk_id"], docs)
+        done += 1
+        if done % 50 == 0:
+            dt = time.perf_counter() - t0
+            print(f"[extract] {done}/{len(todo)} chunks  {done / dt:6.2f} chunks/s  {writer.written} clauses written")
+
+    try:
+        await asyncio.gather(*(one(c) for c in todo))
+        await writer.flush()
+    finally:
+        ckpt.close()
+    print(f"[extract] done: {done} chunks, {writer.written} clauses, {failed} failed "
+          f"in {time.perf_counter() - t0:.1f}s (rerun to retry failures)")
+    return 1 if failed else 0
+
+# ---------- OpenAI Batch API ----------
+
+def batch_export(chunks: List[Dict[str, Any]], path: str, checkpoint_path: str = DEFAULT_CHECKPOINT) -> int:
+    """Writes one /v1/chat/completions request per pending chunk (custom_id = chunk_id)."""
+    from graph.nodes import _fused_request, _llm_message
+    from utils.openai_client import CHAT_MODEL
+
+    ckpt = ChunkCheckpoint(checkpoint_path)
+    ckpt.close()
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for ctx in chunks:
+            if ctx["chunk_id"] in ckpt.done:
+                continue
+            prompt, payload = _fused_request(_chunk_state(ctx, "fused"))
+            f.write(json.dumps({
+                "custom_id": ctx["chunk_id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": CHAT_MODEL,
+                    "temperature": 0.1,
+                    "response_format": {"type": "json_object"},
+                    "messages": [{"role": "user", "content": _llm_message(prompt, payload)}],
+                },
+            }, ensure_ascii=False) + "\n")
+            n += 1
+    print(f"[extract] wrote {n} batch requests to {path}; submit with purpose=batch, endpoint=/v1/chat/completions")
+    return 0
+
+def _batch_results(path: str) -> Iterable[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+async def batch_import(
+    chunks: List[Dict[str, Any]],
+    path: str,
+    write: Callable[[List[Dict[str, Any]]], None],
+    checkpoint_path: str = DEFAULT_CHECKPOINT,
+    write_batch: int = 200,
+) -> int:
+    """Reads a Batch API output file; fused clauses that fail to parse are left for an online rerun."""
+    from graph.nodes import _fused_apply, _parse_json, clause_docs
+    from utils.validation import cheap_checks
+
+    by_id = {c["chunk_id"]: c for c in chunks}
+    ckpt = ChunkCheckpoint(checkpoint_path)
+    writer = BufferedWriter(write, ckpt, write_batch)
+    ok = failed = unknown = 0
+    try:
+        for r in _batch_results(path):
+            ctx = by_id.get(r.get("custom_id"))
+            if ctx is None:
+                unknown += 1
+                continue
+            choices = (((r.get("response") or {}).get("body") or {}).get("choices")) or []
+            state = _chunk_state(ctx, "fused")
+            if r.get("error") or not choices:
+                state["_fused_ok"] = False
+            else:
+                _fused_apply(state, _parse_json(choices[0]["message"]["content"]))
+            if not state["_fused_ok"]:
+                failed += 1
+                ckpt.record(ctx["chunk_id"], "failed", error=str(r.get("error") or "invalid fused output")[:500])
+                continue
+            state["_clause_results"] = [
+                {"clause": c, "route": "BATCH" if cheap_checks(c).get("pass") else "REVIEW",
+                 "validated": False, "ambiguity_reason": ""}
+                for c in state["_segmented"]
+            ]
+            await writer.add(ctx["chunk_id"], clause_docs(state))
+            ok += 1
+        await writer.flush()
+    finally:
+        ckpt.close()
+    print(f"[extract] imported {ok} chunks, {writer.written} clauses; {failed} failed, {unknown} unknown custom_ids")
+    return 1 if failed else 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Extract and formalize clauses from every chunk of ingested documents.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--doc-id", action="append", help="ingested doc_id (repeatable); chunks come from the index")
+    src.add_argument("--chunks", help="JSONL of chunks instead of the index")
+    ap.add_argument("--out", help="write clauses to this JSONL file instead of Mongo")
+    ap.add_argument("--mode", choices=["chain", "fused"], default=None, help="pipeline mode (default: PIPELINE_MODE)")
+    ap.add_argument("--concurrency", type=int, default=8, help="chunks in flight")
+    ap.add_argument("--rpm", type=float, default=float(os.getenv("EXTRACT_RPM", "0")) or None,
+                    help="max LLM requests per minute")
+    ap.add_argument("--tpm", type=float, default=float(os.getenv("EXTRACT_TPM", "0")) or None,
+                    help="max prompt tokens per minute (estimated)")
+    ap.add_argument("--attempts", type=int, default=3, help="tries per chunk before it is recorded as failed")
+    ap.add_argument("--write-batch", type=int, default=200, help="clauses per bulk write")
+    ap.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    ap.add_argument("--fresh", action="store_true", help="ignore the existing checkpoint")
+    ap.add_argument("--batch-export", metavar="JSONL", help="write OpenAI Batch API requests and exit")
+    ap.add_argument("--batch-import", metavar="JSONL", help="load an OpenAI Batch API output file")
+    ap.add_argument("--stub", action="store_true", help="use the local stub chat model (bench/stubs.py)")
+    ap.add_argument("--stub-latency", type=float, default=0.05)
+    a = ap.parse_args(argv)
+
+    if a.stub:
+        # placeholder env must be in place before graph/ is imported
+        from bench.stubs import StubChat
+        from graph import nodes
+        chat = StubChat(a.stub_latency)
+        nodes.get_chat = lambda *_, **__: chat
+
+    if a.fresh and os.path.exists(a.checkpoint):
+        os.remove(a.checkpoint)
+    chunks = chunks_from_jsonl(a.chunks) if a.chunks else chunks_from_index(a.doc_id)
+    if not chunks:
+        print("[extract] no chunks found")
+        return 1
+    if a.batch_export:
+        return batch_export(chunks, a.batch_export, a.checkpoint)
+    write = jsonl_writer(a.out) if a.out else mongo_writer()
+    if a.batch_import:
+        return asyncio.run(batch_import(chunks, a.batch_import, write, a.checkpoint, a.write_batch))
+    return asyncio.run(run_extract(chunks, write, a.concurrency, a.rpm, a.tpm, a.mode,
+                                   a.checkpoint, a.write_batch, a.attempts))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Corpus ingest: delegated acts, guidelines, national transpositions, ...
+
+    python ingest/ingest_corpus.py ./corpus/                 # every *.pdf under a directory
+    python ingest/ingest_corpus.py ./corpus/manifest.jsonl   # {"path", "source_uri", "source_version"} per line
+
+PDF extraction + splitting (CPU-bound) runs in a process pool; embedding and
+upsert go through one shared, rate-limited async stage. Finished documents are
+recorded in a checkpoint file so an interrupted run resumes where it stopped.
+"""
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import argparse, asyncio, json, os, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+from tenacity import retry, stop_after_attempt, wait_exponential
+from utils.hashing import sha1
+from utils.rate_limit import AsyncRateLimiter
+from ingest.pdf_stream import extract_document
+from ingest.embed_pipeline import batched, upsert_vectors, EMBED_BATCH_SIZE, EMBED_CONCURRENCY
+
+DEFAULT_CHECKPOINT = ".cache/ingest_checkpoint.json"
+
+def discover(path: str, default_version: str) -> List[Dict[str, Any]]:
+    """Resolves a directory or a .json/.jsonl manifest into ingest items."""
+    p = pathlib.Path(path)
+    if p.is_dir():
+        entries = [{"path": str(f)} for f in sorted(p.rglob("*.pdf"))]
+        root = p
+    else:
+        raw = p.read_text(encoding="utf-8")
+        if p.suffix == ".jsonl":
+            entries = [json.loads(l) for l in raw.splitlines() if l.strip()]
+        else:
+            entries = json.loads(raw)
+        root = p.parent
+    items = []
+    for e in entries:
+        f = pathlib.Path(e["path"])
+        if not f.is_absolute() and not f.exists():
+            f = root / f
+        uri = e.get("source_uri") or f"file:{f.resolve().relative_to(root.resolve()).as_posix()}"
+        version = e.get("source_version") or default_version
+        items.append({
+            "path": str(f),
+            "source_uri": uri,
+            "source_version": version,
+            "doc_id": sha1(uri + ":" + version),
+        })
+    return items
+
+class Checkpoint:
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.done: Dict[str, Any] = json.load(f).get("done", {})
+        except FileNotFoundError:
+            self.done = {}
+
+    def mark(self, doc_id: str, info: Dict[str, Any]):
+        self.done[doc_id] = info
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"done": self.done}, f, indent=1)
+        os.replace(tmp, self.path)  # never leave a half-written checkpoint
+
+class Progress:
+    def __init__(self, total_docs: int):
+        self.total_docs, self.docs, self.pages, self.chunks, self.upserted = total_docs, 0, 0, 0, 0
+        self.t0 = time.perf_counter()
+
+    def rates(self) -> str:
+        dt = max(time.perf_counter() - self.t0, 1e-9)
+        return f"{self.pages / dt:7.1f} pages/s {self.chunks / dt:7.1f} chunks/s"
+
+    def doc_done(self, item: Dict[str, Any], pages: int, chunks: int, upserted: int, stale: int):
+        self.docs += 1
+        self.pages += pages
+        self.chunks += chunks
+        self.upserted += upserted
+        print(f"[corpus] {self.docs}/{self.total_docs} docs  {self.rates()}  "
+              f"{item['source_uri']}: {pages} pages, {chunks} chunks, +{upserted} upserted, -{stale} stale")
+
+async def run_corpus(
+    items: List[Dict[str, Any]],
+    workers: int,
+    concurrency: int = EMBED_CONCURRENCY,
+    batch_size: int = EMBED_BATCH_SIZE,
+    rpm: Optional[float] = None,
+    checkpoint_path: str = DEFAULT_CHECKPOINT,
+    incremental: bool = False,
+) -> int:
+    # imported here so spawned pool workers never build API clients
+    from ingest.ingest_pdf import chunk_records, delete_stale
+    from ingest.manifest import load_manifest, save_manifest
+    from utils.openai_client import get_embeddings
+    from retrieval.backends import get_index
+    from retrieval.lexical import get_lexical_index
+
+    emb = get_embeddings()
+    index = get_index()
+    lexical = get_lexical_index()
+    limiter = AsyncRateLimiter(rpm=rpm)
+    embed_slots = asyncio.Semaphore(concurrency)
+    # bounds documents that are extracted but not yet embedded
+    doc_slots = asyncio.Semaphore(workers * 2)
+    ckpt = Checkpoint(checkpoint_path)
+    todo = [it for it in items if it["doc_id"] not in ckpt.done]
+    if len(todo) < len(items):
+        print(f"[corpus] resuming: {len(items) - len(todo)} docs already done per {checkpoint_path}")
+    progress = Progress(len(todo))
+    loop = asyncio.get_running_loop()
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
+    async def embed_batch(batch: List[Dict[str, Any]]):
+        async with embed_slots:
+            await limiter.acquire()
+            vecs = await emb.aembed_documents([r["metadata"]["text"] for r in batch])
+        vectors = [{**r, "values": v} for r, v in zip(batch, vecs)]
+        await asyncio.to_thread(upsert_vectors, index, vectors, lexical)
+
+    async def ingest_one(item: Dict[str, Any], pool: ProcessPoolExecutor):
+        async with doc_slots:
+            pages, chunks = await loop.run_in_executor(pool, extract_document, item["path"])
+            doc_id = item["doc_id"]
+            previous = await asyncio.to_thread(load_manifest, doc_id) if incremental else {}
+            hashes: Dict[str, str] = {}
+            records = list(chunk_records(chunks, doc_id, item["source_uri"], item["source_version"], previous, hashes))
+            await asyncio.gather(*(embed_batch(b) for b in batched(records, batch_size)))
+            stale = await asyncio.to_thread(delete_stale, previous, hashes, lexical)
+            if hashes:
+                await asyncio.to_thread(save_manifest, doc_id, item["source_uri"], item["source_version"], hashes)
+            ckpt.mark(doc_id, {"path": item["path"], "source_uri": item["source_uri"],
+                               "source_version": item["source_version"], "pages": pages, "chunks": len(chunks)})
+            progress.doc_done(item, pages, len(chunks), len(records), len(stale))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = await asyncio.gather(*(ingest_one(it, pool) for it in todo), return_exceptions=True)
+
+    failed = [(it, r) for it, r in zip(todo, results) if isinstance(r, BaseException)]
+    for it, err in failed:
+        print(f"[corpus] FAILED {it['source_uri']} ({it['path']}): {err!r}")
+    print(f"[corpus] done: {progress.docs}/{len(todo)} docs, {progress.pages} pages, {progress.chunks} chunks, "
+          f"{progress.upserted} upserted in {time.perf_counter() - progress.t0:.1f}s ({progress.rates().strip()})")
+    return 1 if failed else 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Ingest a directory or manifest of PDFs into the vector index.")
+    ap.add_argument("path", help="directory of PDFs, or a .json/.jsonl manifest")
+    ap.add_argument("--source-version", default="unversioned", help="default source_version for entries without one")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="extraction processes")
+    ap.add_argument("--concurrency", type=int, default=EMBED_CONCURRENCY, help="embedding batches in flight")
+    ap.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    ap.add_argument("--rpm", type=float, default=float(os.getenv("EMBED_RPM", "0")) or None,
+                    help="max embedding requests per minute")
+    ap.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    ap.add_argument("--fresh", action="store_true", help="ignore the existing checkpoint")
+    ap.add_argument("--incremental", action="store_true", help="only re-embed changed chunks")
+    a = ap.parse_args(argv)
+
+    items = discover(a.path, a.source_version)
+    if not items:
+        print(f"[corpus] no PDFs found under {a.path}")
+        return 1
+    if a.fresh and os.path.exists(a.checkpoint):
+        os.remove(a.checkpoint)
+    return asyncio.run(run_corpus(items, a.workers, a.concurrency, a.batch_size, a.rpm, a.checkpoint, a.incremental))
+
+if __name__ == "__main__":
+    sys.exit(main())
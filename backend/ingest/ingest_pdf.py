@@ -2,18 +2,21 @@ import sys, pathlib
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 
 
-import os, time, hashlib
+import os, time
 from pathlib import Path
 import fitz  # PyMuPDF
-from typing import Dict, Any, List, Optional
-from pinecone import Pinecone
+from typing import Dict, Any, Iterable, Iterator, List, Optional
 from utils.openai_client import get_embeddings
-from ingest.text_utils import legal_text_splitter
+from retrieval.backends import get_index, VECTOR_BACKEND, VECTOR_INDEX
+from utils.hashing import sha1
+from ingest.text_utils import legal_text_splitter, extract_article_id, ArticleTracker
+from ingest.embed_pipeline import embed_and_upsert
+from retrieval.lexical import get_lexical_index
+from ingest.manifest import load_manifest, save_manifest
+from ingest.pdf_stream import iter_pages, iter_chunks
 
-# --- Pinecone client ---
-PC = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-PINECONE_INDEX = os.getenv("PINECONE_INDEX")
-INDEX = PC.Index(PINECONE_INDEX)
+CHUNK_ID_HASH = 16  # sha1 hex chars in a chunk id
+LEGACY_FETCH = 100  # positional ids probed per fetch
 
 def pdf_to_text(pdf_path: str) -> str:
     doc = fitz.open(pdf_path)
@@ -22,43 +25,102 @@ def pdf_to_text(pdf_path: str) -> str:
         texts.append(page.get_text("text"))
     return "\n".join(texts)
 
-def sha1(s: str) -> str:
-    return hashlib.sha1(s.encode("utf-8")).hexdigest()
-
-def extract_article_id(text: str) -> Optional[str]:
-    import re
-    m = re.search(r'\b(Article|Art)\.?\s+\d+(\(\d+\))?', text, re.IGNORECASE)
-    return m.group(0) if m else None
-
-def run_ingest(pdf_path: str, source_uri: str, source_version: str):
-    raw = pdf_to_text(pdf_path)
-    splitter = legal_text_splitter()
-    chunks: List[str] = splitter.split_text(raw)
-
-    emb = get_embeddings()
-    doc_id = sha1(source_uri + ":" + source_version)
-
-    vectors = []
-    for i, text in enumerate(chunks):
-        vec = emb.embed_query(text)
-        vectors.append({
-            "id": f"{doc_id}:{i}",
-            "values": vec,
+def chunk_records(
+    chunks: Iterable[Dict[str, Any]],
+    doc_id: str,
+    source_uri: str,
+    source_version: str,
+    previous: Dict[str, str],
+    hashes: Dict[str, str],
+) -> Iterator[Dict[str, Any]]:
+    """
+    Turns iter_chunks() output into vector records (without values), recording
+    every chunk's sha1 in `hashes` and skipping chunks unchanged in `previous`.
+    Chunk ids are keyed by content, "<doc_id>:<sha1 prefix>" (":<n>" for the
+    n-th repeat of the same text), so a paragraph inserted or removed early
+    in an amended document does not renumber every later chunk.
+    """
+    articles = ArticleTracker()
+    seen: Dict[str, int] = {}
+    for chunk in chunks:
+        text = chunk["text"]
+        h = sha1(text)
+        n = seen[h] = seen.get(h, -1) + 1
+        chunk_id = f"{doc_id}:{h[:CHUNK_ID_HASH]}" + (f":{n}" if n else "")
+        nums = articles(text)  # before the skip: it carries state across chunks
+        hashes[chunk_id] = h
+        if previous.get(chunk_id) == h:
+            continue  # unchanged since last ingest
+        yield {
+            "id": chunk_id,
             "metadata": {
                 "text": text,
                 "article_id": extract_article_id(text) or "",
+                "article_nums": nums,
                 "source_uri": source_uri,
                 "source_version": source_version,
                 "doc_id": doc_id,
-                "chunk_id": f"{doc_id}:{i}"
+                "chunk_id": chunk_id,
+                "text_hash": h,
+                "page_start": chunk["page_start"],
+                "page_end": chunk["page_end"]
             }
-        })
+        }
+
+def delete_stale(previous: Dict[str, str], hashes: Dict[str, str], lexical=None) -> List[str]:
+    stale = [cid for cid in previous if cid not in hashes]
+    for s in range(0, len(stale), 1000):
+        get_index().delete(ids=stale[s:s+1000])
+    if stale and lexical is not None:
+        lexical.delete(stale)
+    return stale
+
+def legacy_chunk_ids(doc_id: str) -> List[str]:
+    """
+    Positional ids ("<doc_id>:0", "<doc_id>:1", ...) that ingests before the
+    manifest wrote for this document. Neither backend lists ids by prefix, so
+    they are probed with fetch until a batch comes back short.
+    """
+    index, found = get_index(), []
+    for start in range(0, 10**9, LEGACY_FETCH):
+        ids = [f"{doc_id}:{i}" for i in range(start, start + LEGACY_FETCH)]
+        got = index.fetch(ids=ids).vectors
+        found += [i for i in ids if i in got]
+        if len(got) < LEGACY_FETCH:
+            return found
+
+def run_ingest(pdf_path: str, source_uri: str, source_version: str, incremental: bool = False):
+    """
+    Chunks, embeds and upserts a PDF. With incremental=True only chunks whose
+    sha1 differs from the stored manifest are embedded/upserted. Either way
+    chunk ids in the manifest that no longer exist are deleted from the index;
+    a document without a manifest has its positional ids from older ingests
+    deleted instead, so a re-ingest doesn't store every chunk twice.
+    """
+    # pages stream through extraction -> chunking -> embedding -> upsert
+    chunks = iter_chunks(iter_pages(pdf_path))
+
+    emb = get_embeddings()
+    doc_id = sha1(source_uri + ":" + source_version)
+    manifest = load_manifest(doc_id)
+    previous = manifest if incremental else {}
+    if not manifest:
+        manifest = dict.fromkeys(legacy_chunk_ids(doc_id), "")
+    hashes: Dict[str, str] = {}
+
+    # batched embed_documents calls, upserted as each batch finishes
+    records = chunk_records(chunks, doc_id, source_uri, source_version, previous, hashes)
+    lexical = get_lexical_index()
+    n = embed_and_upsert(records, emb, get_index(), lexical=lexical)
+    stale = delete_stale(manifest, hashes, lexical)
+    if hashes:
+        save_manifest(doc_id, source_uri, source_version, hashes)
 
-    if vectors:
-        BATCH = 100
-        for s in range(0, len(vectors), BATCH):
-            INDEX.upsert(vectors=vectors[s:s+BATCH])
-        print(f"[ingest] upserted {len(vectors)} vectors into Pinecone index={PINECONE_INDEX} doc_id={doc_id}")
+    if n or stale:
+        print(f"[ingest] upserted {n} vectors, deleted {len(stale)} stale, "
+              f"unchanged {len(hashes) - n} into {VECTOR_BACKEND} index={VECTOR_INDEX} doc_id={doc_id}")
+    elif hashes:
+        print(f"[ingest] {len(hashes)} chunks unchanged — nothing to do for doc_id={doc_id}")
     else:
         print("[ingest] no chunks generated — check your PDF/path")
 
@@ -66,4 +128,4 @@ if __name__ == "__main__":
     pdf = "./EU_AI_doc.pdf"
     source_uri = "eurlex:eu_ai_act_official_journal"
     source_version = "OJ-2024-07-12"
-    run_ingest(pdf, source_uri, source_version)
+    run_ingest(pdf, source_uri, source_version, incremental="--incremental" in sys.argv[1:])
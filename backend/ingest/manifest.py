@@ -0,0 +1,23 @@
+import datetime
+from typing import Dict
+from db.mongo import docs
+
+# One manifest per ingested document in the docs collection:
+# {_id: doc_id, source_uri, source_version, chunks: {chunk_id: sha1(text)}, updated}
+
+def load_manifest(doc_id: str) -> Dict[str, str]:
+    m = docs.find_one({"_id": doc_id}, {"chunks": 1})
+    return (m or {}).get("chunks") or {}
+
+def save_manifest(doc_id: str, source_uri: str, source_version: str, chunks: Dict[str, str]):
+    docs.update_one(
+        {"_id": doc_id},
+        {"$set": {
+            "source_uri": source_uri,
+            "source_version": source_version,
+            "chunks": chunks,
+            "n_chunks": len(chunks),
+            "updated": datetime.datetime.utcnow(),
+        }},
+        upsert=True,
+    )
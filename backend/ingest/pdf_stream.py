@@ -0,0 +1,179 @@
+from bisect import bisect_right
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+import fitz  # PyMuPDF
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from ingest.text_utils import legal_text_splitter
+
+# Page-wise streaming counterpart of pdf_to_text() + splitter.split_text():
+#   iter_pages(pdf) -> iter_chunks(pages) -> embed_and_upsert(...)
+# Memory stays bounded by roughly one page plus one chunk, and the chunks
+# are identical to legal_text_splitter().split_text(pdf_to_text(pdf)).
+
+def iter_pages(pdf_path: str) -> Iterator[Tuple[int, str]]:
+    """Yields (page_number, text) one page at a time (1-based page numbers)."""
+    with fitz.open(pdf_path) as doc:
+        for i, page in enumerate(doc):
+            yield i + 1, page.get_text("text")
+
+class StreamingSplitter:
+    """
+    Incremental RecursiveCharacterTextSplitter. Feed text pieces in order and
+    get back the same chunks split_text() would produce on their concatenation,
+    as (text, start_offset) pairs, as soon as they are final.
+
+    Mirrors the splitter's top level: the text is cut into pieces at the first
+    separator, small pieces are greedily merged with overlap, and oversized
+    pieces are handed to the splitter's own recursive split. Streaming starts
+    once the first (highest-priority) separator has been seen; until then the
+    top-level separator isn't known and text is buffered.
+    """
+
+    def __init__(self, splitter: Optional[RecursiveCharacterTextSplitter] = None):
+        self.s = splitter or legal_text_splitter()
+        self.sep = self.s._separators[0]
+        self.rest = self.s._separators[1:]
+        # only literal separators kept at the start of the next piece can be
+        # cut incrementally; anything else falls back to one split at close()
+        self._can_stream = (
+            self.s._keep_separator in (True, "start")
+            and not self.s._is_separator_regex
+            and self.sep != ""
+        )
+        self._buf = ""
+        self._buf_start = 0      # global offset of _buf[0]
+        self._skip = 0           # _buf starts with a separator that was already matched
+        self._streaming = False
+        self._doc: List[Tuple[str, int]] = []   # pieces of the chunk being merged
+        self._total = 0
+
+    def feed(self, text: str) -> List[Tuple[str, int]]:
+        self._buf += text
+        if not self._streaming:
+            if not (self._can_stream and self.sep in self._buf):
+                return []
+            self._streaming = True
+        return self._drain()
+
+    def close(self) -> List[Tuple[str, int]]:
+        if not self._streaming:
+            text, base = self._buf, self._buf_start
+            self._buf = ""
+            return _locate(self.s.split_text(text), text, base)
+        out = []
+        if self._buf:
+            out += self._piece(self._buf, self._buf_start)
+            self._buf = ""
+        out += self._flush()
+        return out
+
+    # --- top-level cutting
+
+    def _drain(self) -> List[Tuple[str, int]]:
+        out = []
+        while True:
+            m = self._buf.find(self.sep, self._skip)
+            if m == -1:
+                return out
+            if m > 0:
+                out += self._piece(self._buf[:m], self._buf_start)
+            self._buf = self._buf[m:]
+            self._buf_start += m
+            self._skip = len(self.sep)
+
+    def _piece(self, piece: str, start: int) -> List[Tuple[str, int]]:
+        if self.s._length_function(piece) < self.s._chunk_size:
+            return self._push(piece, start)
+        out = self._flush()
+        if not self.rest:
+            out.append((piece, start))
+        else:
+            out += _locate(self.s._split_text(piece, self.rest), piece, start)
+        return out
+
+    # --- incremental _merge_splits (separator is "" when separators are kept)
+
+    def _push(self, d: str, start: int) -> List[Tuple[str, int]]:
+        out = []
+        n = self.s._length_function(d)
+        if self._total + n > self.s._chunk_size and self._doc:
+            out += self._emit()
+            while self._total > self.s._chunk_overlap or (
+                self._total + n > self.s._chunk_size and self._total > 0
+            ):
+                self._total -= self.s._length_function(self._doc[0][0])
+                self._doc = self._doc[1:]
+        self._doc.append((d, start))
+        self._total += n
+        return out
+
+    def _flush(self) -> List[Tuple[str, int]]:
+        out = self._emit() if self._doc else []
+        self._doc, self._total = [], 0
+        return out
+
+    def _emit(self) -> List[Tuple[str, int]]:
+        doc = self.s._join_docs([p for p, _ in self._doc], "")
+        if doc is None:
+            return []
+        raw = "".join(p for p, _ in self._doc)
+        lead = len(raw) - len(raw.lstrip()) if self.s._strip_whitespace else 0
+        return [(doc, self._doc[0][1] + lead)]
+
+def _locate(chunks: List[str], text: str, base: int) -> List[Tuple[str, int]]:
+    out, pos = [], 0
+    for c in chunks:
+        i = text.find(c, pos)
+        if i == -1:
+            i = pos
+        out.append((c, base + i))
+        pos = i + 1
+    return out
+
+def iter_chunks(
+    pages: Iterable[Tuple[int, str]],
+    splitter: Optional[RecursiveCharacterTextSplitter] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Chunks (page_number, text) pages joined exactly like pdf_to_text() does and
+    yields {"text", "page_start", "page_end"} per chunk as soon as it is final.
+    """
+    ss = StreamingSplitter(splitter)
+    page_starts: List[int] = []
+    page_nos: List[int] = []
+    offset = 0
+
+    def provenance(chunks):
+        for text, start in chunks:
+            end = start + max(len(text) - 1, 0)
+            yield {
+                "text": text,
+                "page_start": page_nos[bisect_right(page_starts, start) - 1],
+                "page_end": page_nos[bisect_right(page_starts, end) - 1],
+            }
+
+    for page_no, text in pages:
+        if page_starts:
+            text = "\n" + text
+            page_starts.append(offset + 1)
+        else:
+            page_starts.append(0)
+        page_nos.append(page_no)
+        offset += len(text)
+        yield from provenance(ss.feed(text))
+    yield from provenance(ss.close())
+
+def extract_document(pdf_path: str) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Extracts and chunks a whole PDF; returns (page_count, chunks).
+    Module-level and free of client setup so it can run in a process pool.
+    """
+    pages = 0
+
+    def counted():
+        nonlocal pages
+        for p in iter_pages(pdf_path):
+            pages += 1
+            yield p
+
+    chunks = list(iter_chunks(counted()))
+    return pages, chunks
@@ -1,3 +1,5 @@
+import re
+from typing import List, Optional
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 def legal_text_splitter():
@@ -7,3 +9,36 @@ def legal_text_splitter():
         chunk_overlap=200,
         separators=["\n\n", "\n", ". ", "; ", ": ", " "]
     )
+
+ARTICLE_REF = re.compile(r'\b(Article|Art)\.?\s+\d+(\(\d+\))?', re.IGNORECASE)
+
+def extract_article_id(text: str) -> Optional[str]:
+    m = ARTICLE_REF.search(text)
+    return m.group(0) if m else None
+
+def article_number(article_id: Optional[str]) -> Optional[str]:
+    """The bare article number: 'Article 10(2)', 'Art. 10' and '10' all give '10'; None without one."""
+    m = re.search(r'\d+', article_id or "")
+    return m.group(0) if m else None
+
+# a line that is only "Article N" opens that article; an ANNEX heading closes it
+ARTICLE_HEADING = re.compile(r'^(?:Article (\d+)|ANNEX [IVXLC]+)\s*$', re.MULTILINE)
+
+class ArticleTracker:
+    """
+    The articles each chunk belongs to, as opposed to the first one it
+    mentions (article_id). Call with a document's chunks in order: returns
+    the article open where the chunk starts plus every article headed
+    inside it, as bare numbers.
+    """
+
+    def __init__(self):
+        self.current: Optional[str] = None
+
+    def __call__(self, text: str) -> List[str]:
+        nums = [self.current] if self.current else []
+        for m in ARTICLE_HEADING.finditer(text):
+            self.current = m.group(1)
+            if self.current and self.current not in nums:
+                nums.append(self.current)
+        return nums
@@ -1,9 +1,22 @@
-from fastapi import FastAPI, Request, Query, Body
+from fastapi import FastAPI, Request, Response, Query, Body, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from graph.state import BotState
-from graph.app import run_once
-from db.mongo import clauses  # same import as your own codebase
-import os
+from graph.app import arun_once
+from graph.nodes import clause_results
+from db.mongo import clauses, backfill_clause_hashes, ensure_indexes  # same import as your own codebase
+from db.queries import clauses_filter, graph_filter, after_cursor, encode_cursor, CLAUSES_SORT
+from utils.dependencies import dependency_edges
+from utils.export import EXPORT_FIELDS, projection, iter_json, iter_ndjson, iter_csv
+from db.write_behind import get_writer
+from db.graph_index import GRAPH_INDEX_ENABLED, GRAPH_PROJECTION, get_graph, graph_payload
+from utils.hashing import sha1
+from utils.embedding_cache import get_embedding_cache
+from graph.answer_cache import CACHE as ANSWER_CACHE
+from utils.llm_memo import get_llm_memo
+from graph.clause_lookup import STATS as LOOKUP_STATS
+from utils.deontic_rules import STATS as RULE_STATS
+import os, json, asyncio, datetime, threading
 
 app = FastAPI()
 
@@ -17,6 +30,22 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+@app.on_event("startup")
+def on_startup():
+    ensure_indexes()
+    # clauses written before upserts were keyed on text_hash
+    backfill_clause_hashes()
+    # create (and prune) the LLM memo here rather than inside the first request
+    get_llm_memo()
+    if GRAPH_INDEX_ENABLED:
+        # build the dependency graph off the startup path; /api/graph waits for it if it is early
+        threading.Thread(target=get_graph().refresh, name="graph-index-load", daemon=True).start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # queued chat / clause writes must not be lost on a graceful stop
+    get_writer().close()
+
 def status_check():
     # Simulated checks, replace with actual logic if needed
     status = {
@@ -30,22 +59,39 @@ def status_check():
 def api_status():
     return status_check()
 
-@app.post("/api/chat")
-async def api_chat(req: Request):
-    payload = await req.json()
-    question = payload.get('question')
-    thread_id = payload.get('thread_id', 'default')
-    state = {
-        'thread_id': thread_id,
+@app.get("/api/stats")
+def api_stats():
+    memo = get_llm_memo()
+    return {
+        "embeddings": get_embedding_cache().stats(),
+        "answers": ANSWER_CACHE.stats(),
+        "llm_memo": memo.stats() if memo else {"enabled": False},
+        "clause_lookup": LOOKUP_STATS.stats(),
+        "classifier": RULE_STATS.stats(),
+        "writes": get_writer().stats(),
+        "graph": get_graph().stats(),
+    }
+
+def _chat_state(payload: dict) -> dict:
+    return {
+        'thread_id': payload.get('thread_id', 'default'),
         'messages': [],
-        'query': question,
+        'query': payload.get('question'),
         'contexts': [],
         'working_clause': None,
         'retries': {},
         'answer': None,
-        'citations': []
+        'citations': [],
+        '_mode': payload.get('mode'),  # optional per-request "chain" | "fused"
+        '_source_version': payload.get('source_version'),
+        # optional retrieval narrowing (retrieval/planner.py): article numbers, a source_uri, top_k
+        '_articles': payload.get('articles'),
+        '_source_uri': payload.get('source_uri'),
+        '_top_k': payload.get('top_k'),
+        '_multi': payload.get('multi')  # optional: derive every segmented clause
     }
-    state = run_once(state)
+
+def chat_response(state: dict) -> dict:
     # Return full clause for UI evidence, plus pipeline state
     clause = state.get("working_clause").model_dump() if state.get("working_clause") else {}
     return {
@@ -55,23 +101,110 @@ async def api_chat(req: Request):
         "clause": clause,
         "contexts": state.get("contexts", []),
         "ambiguity_reason": state.get("_ambiguity_reason", ""),
-        "thread_id": thread_id
+        "thread_id": state["thread_id"],
+        "clauses": [
+            {"clause": r["clause"].model_dump(), "route": r["route"], "ambiguity_reason": r["ambiguity_reason"]}
+            for r in clause_results(state)
+        ],
+        "timings": state.get("_timings", {}),
+        "cached": state.get("_cache")
     }
 
+@app.post("/api/chat")
+async def api_chat(req: Request):
+    payload = await req.json()
+    # async pipeline: concurrent chats share the worker's event loop
+    state = await arun_once(_chat_state(payload))
+    return chat_response(state)
+
+def _stage_event(name: str, state: dict):
+    """(event, data) to stream once stage `name` finished, or None."""
+    c = state.get("working_clause")
+    stage = name.split("#")[0]
+    if stage == "rerank":
+        return "contexts", {"contexts": state.get("contexts", [])}
+    if stage == "answer_cache" and state.get("_cache"):
+        return "cached", {"kind": state["_cache"]}
+    if stage in ("classify", "fused") or (stage == "lookup" and state.get("_clause_hit")):
+        return "clause", {"clause": c.model_dump() if c else {}, "stored": stage == "lookup"}
+    if stage == "formalize" and c:
+        return "formula", {"clause_id": c.clause_id, "formula": c.formulas.get("deontic"),
+                           "confidence": c.confidence.get("formalize")}
+    if stage in ("validate", "ambiguity"):
+        return "route", {"clause_id": c.clause_id if c else None, "stage": stage, "route": state.get("_route"),
+                         "errors": state.get("_errors", []), "ambiguity_reason": state.get("_ambiguity_reason", "")}
+    return None
+
+async def chat_events(payload: dict):
+    """
+    Runs the pipeline and yields (event, data) as it progresses:
+    contexts, cached, clause, formula, route, token (answer text), then
+    final (the /api/chat response) or error.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    def send(event, data):
+        # stages may finish on worker threads
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    def on_stage(name, st):
+        ev = _stage_event(name, st)
+        if ev is not None:
+            send(*ev)
+
+    state = _chat_state(payload)
+    state["_on_stage"] = on_stage
+    state["_on_token"] = lambda text: send("token", {"text": text})
+
+    async def run():
+        try:
+            send("final", chat_response(await arun_once(state)))
+        except Exception as e:
+            send("error", {"detail": repr(e)})
+        finally:
+            send(None, None)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            event, data = await queue.get()
+            if event is None:
+                break
+            yield event, data
+    finally:
+        if not task.done():
+            task.cancel()  # client went away
+
+@app.post("/api/chat/stream")
+async def api_chat_stream(req: Request):
+    payload = await req.json()
+
+    async def sse():
+        async for event, data in chat_events(payload):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+    return StreamingResponse(sse(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/api/clauses")
 def api_clauses(
     modality: str = Query(None),
     article: str = Query(None),
     actor: str = Query(None),
     limit: int = Query(30),
-    search: str = Query(None)
+    search: str = Query(None),
+    cursor: str = Query(None),
+    response: Response = None
 ):
-    q = {}
-    if modality and modality != "all": q["modality"] = modality
-    if article: q["article_id"] = article
-    if actor: q["actor"] = actor
-    if search: q["$text"] = {"$search": search}
-    results = list(clauses.find(q).sort("updated",-1).limit(limit))
+    # keyset pagination: pass back the X-Next-Cursor header of the previous page
+    try:
+        q = after_cursor(clauses_filter(modality, article, actor, search), cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results = list(clauses.find(q).sort(CLAUSES_SORT).limit(limit))
+    if results and len(results) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(results[-1])
     for r in results:
         r["id"] = str(r.get("_id"))
         r.pop("_id",None)
@@ -79,7 +212,14 @@ def api_clauses(
 
 @app.put("/api/clause/{id}")
 async def update_clause(id: str, payload: dict = Body(...)):
+    if "text" in payload:
+        payload["text_hash"] = sha1(payload["text"])
+    payload["updated"] = datetime.datetime.utcnow()
     clauses.update_one({"_id": id}, {"$set": payload})
+    if GRAPH_INDEX_ENABLED and get_graph().loaded:
+        doc = clauses.find_one({"_id": id}, GRAPH_PROJECTION)
+        if doc:
+            get_graph().upsert(doc)
     return {"ok": True}
 
 @app.get("/api/clause/{id}")
@@ -91,14 +231,37 @@ def get_clause(id: str):
         return r
     return {}
 
+EXPORT_BATCH = 1000
+EXPORT_FORMATS = {
+    "json": "application/json",        # {"data": [...]}, what the UI downloads
+    "ndjson": "application/x-ndjson",
+    "jsonl": "application/jsonl",
+    "csv": "text/csv; charset=utf-8",
+}
+
 @app.get("/api/clauses/export")
-def export_clauses(modality: str = Query(None), article: str = Query(None)):
-    q = {}
-    if modality and modality!="all": q["modality"] = modality
-    if article: q["article_id"] = article
-    results = list(clauses.find(q).limit(500))
-    for r in results: r.pop("_id", None)
-    return {"data": results}
+def export_clauses(
+    modality: str = Query(None),
+    article: str = Query(None),
+    format: str = Query("json"),
+    fields: str = Query(None, description="comma-separated; dotted paths allowed"),
+):
+    """Streams every matching clause from a server-side cursor (constant memory, no cap)."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(EXPORT_FORMATS)}")
+    cols = [f.strip() for f in fields.split(",") if f.strip()] if fields else EXPORT_FIELDS
+    docs = clauses.find(clauses_filter(modality, article), projection(cols)).batch_size(EXPORT_BATCH)
+    if format == "csv":
+        body = iter_csv(docs, cols)
+    elif format == "json":
+        body = iter_json(docs)
+    else:
+        body = iter_ndjson(docs)
+    ext = "json" if format == "json" else format
+    # a sync iterator: Starlette pulls it from a worker thread, off the event loop
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[format], headers={
+        "Content-Disposition": f'attachment; filename="clauses_export.{ext}"'
+    })
 
 @app.get("/api/graph")
 def api_graph(
@@ -108,122 +271,16 @@ def api_graph(
     limit: int = Query(100)
 ):
     """Generate dependency graph data from clauses"""
-    q = {}
-    if modality and modality != "all": q["modality"] = modality
-    if article: q["article_id"] = article
-    if actor: q["actor_canonical"] = actor
-
-    results = list(clauses.find(q).limit(limit))
-
-    # Build nodes and edges
-    nodes = []
-    edges = []
-    actor_nodes = {}
-    article_nodes = {}
-
-    for idx, clause in enumerate(results):
-        clause_id = str(clause.get("_id"))
-
-        # Create clause node
-        node = {
-            "id": clause_id,
-            "type": "clause",
-            "data": {
-                "label": f"{clause.get('article_id', 'Unknown')}: {clause.get('actor', 'Unknown')}",
-                "modality": clause.get("modality", "UNKNOWN"),
-                "actor": clause.get("actor_canonical") or clause.get("actor"),
-                "object": clause.get("object", ""),
-                "article_id": clause.get("article_id"),
-                "condition": clause.get("condition"),
-                "formula": clause.get("formulas", {}).get("deontic", ""),
-                "text": clause.get("text", "")[:100] + "..." if len(clause.get("text", "")) > 100 else clause.get("text", "")
-            },
-            "position": {"x": 0, "y": 0}  # Will be laid out by frontend
-        }
-        nodes.append(node)
-
-        # Track actors
-        actor_name = clause.get("actor_canonical") or clause.get("actor")
-        if actor_name and actor_name not in actor_nodes:
-            actor_nodes[actor_name] = {
-                "id": f"actor_{len(actor_nodes)}",
-                "type": "actor",
-                "data": {"label": actor_name, "type": "actor"},
-                "position": {"x": 0, "y": 0}
-            }
-
-        # Track articles
-        article_id = clause.get("article_id")
-        if article_id and article_id not in article_nodes:
-            article_nodes[article_id] = {
-                "id": f"article_{article_id}",
-                "type": "article",
-                "data": {"label": f"Article {article_id}", "article_id": article_id},
-                "position": {"x": 0, "y": 0}
-            }
-
-        # Create edges from clause to actor
-        if actor_name and actor_name in actor_nodes:
-            edges.append({
-                "id": f"edge_{clause_id}_to_actor_{actor_name}",
-                "source": clause_id,
-                "target": actor_nodes[actor_name]["id"],
-                "type": "actor_edge",
-                "label": "binds"
-            })
-
-        # Create edges from article to clause
-        if article_id and article_id in article_nodes:
-            edges.append({
-                "id": f"edge_article_{article_id}_to_{clause_id}",
-                "source": article_nodes[article_id]["id"],
-                "target": clause_id,
-                "type": "article_edge",
-                "label": "defines"
-            })
-
-    # Add actor and article nodes
-    nodes.extend(actor_nodes.values())
-    nodes.extend(article_nodes.values())
-
-    # Detect conditional dependencies
-    for i, clause1 in enumerate(results):
-        clause1_id = str(clause1.get("_id"))
-        condition = clause1.get("condition", "")
-
-        if condition:
-            # Check if condition mentions other actors
-            for j, clause2 in enumerate(results):
-                if i != j:
-                    clause2_id = str(clause2.get("_id"))
-                    actor2 = clause2.get("actor_canonical") or clause2.get("actor", "")
-                    object2 = clause2.get("object", "")
-
-                    # Simple string matching - mentions other clause's actor or object
-                    if actor2 and actor2.lower() in condition.lower():
-                        edges.append({
-                            "id": f"dep_{clause1_id}_on_{clause2_id}",
-                            "source": clause2_id,
-                            "target": clause1_id,
-                            "type": "dependency",
-                            "label": "condition"
-                        })
-                    elif object2 and object2.lower() in condition.lower():
-                        edges.append({
-                            "id": f"dep_{clause1_id}_on_{clause2_id}_obj",
-                            "source": clause2_id,
-                            "target": clause1_id,
-                            "type": "dependency",
-                            "label": "requires"
-                        })
+    q = graph_filter(modality, article, actor)
 
-    return {
-        "nodes": nodes,
-        "edges": edges,
-        "stats": {
-            "total_clauses": len(results),
-            "total_actors": len(actor_nodes),
-            "total_articles": len(article_nodes),
-            "total_edges": len(edges)
-        }
-    }
+    if GRAPH_INDEX_ENABLED:
+        # slice the materialized graph; refresh() picks up writes since the last sync
+        graph = get_graph()
+        graph.refresh()
+        results, dependencies = graph.slice(q, limit)
+    else:
+        # most recently updated first, so the (actor_canonical|modality|article_id, updated) indexes apply
+        results = list(clauses.find(q).sort(CLAUSES_SORT).limit(limit))
+        dependencies = dependency_edges(results)
+
+    return graph_payload(results, dependencies)
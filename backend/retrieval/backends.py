@@ -0,0 +1,19 @@
+import os
+from bootstrap.env import load_and_validate_env
+
+load_and_validate_env()
+
+# pinecone: the hosted index (default); local: retrieval/local_index.py under VECTOR_DIR
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+VECTOR_INDEX = os.getenv("PINECONE_INDEX") or "docs"
+
+def get_index(name: str = None):
+    """The vector index handle for VECTOR_BACKEND; both speak the same upsert / query / fetch / delete API."""
+    if VECTOR_BACKEND == "local":
+        from retrieval.local_index import get_local_index
+        return get_local_index(name or VECTOR_INDEX)
+    if VECTOR_BACKEND != "pinecone":
+        raise ValueError(f"VECTOR_BACKEND must be 'pinecone' or 'local', not {VECTOR_BACKEND!r}")
+    # imported lazily so offline deployments need neither the pinecone package nor its key
+    from utils.pinecone_client import get_index as get_pinecone_index
+    return get_pinecone_index(name)
@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from retrieval.lexical import LexicalIndex, get_lexical_index
+
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1").lower() not in {"0", "false", "off"}
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # depth of each ranked list before fusion
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical")
+
+Hits = Dict[str, List[Tuple[str, float]]]
+
+def rrf(rankings: List[List[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Reciprocal-rank fusion: each id scores sum(1 / (k + rank)) over the lists; ties keep first-seen order."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, i in enumerate(ranking, start=1):
+            scores[i] = scores.get(i, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: -kv[1])
+
+class LexicalPlan:
+    """
+    The lexical half of one retrieval: BM25 over every chunk in `scope`,
+    plus the chunks of the articles the query plan names. When those
+    articles alone fill top_k the plan is `fast`: their chunks are the
+    answer and the vector query is skipped.
+    """
+
+    def __init__(self, index: LexicalIndex, query: str, top_k: int, articles: Sequence[str] = (),
+                 scope: Optional[Dict[str, Any]] = None):
+        self.index, self.query, self.top_k, self.scope = index, query or "", top_k, scope or {}
+        self.articles = [a for a in articles if self.index.articles_size([a], self.scope)]
+        self.fast = bool(self.articles) and self.index.articles_size(self.articles, self.scope) >= top_k
+
+    @property
+    def dense_top_k(self) -> int:
+        return max(self.top_k, HYBRID_CANDIDATES)
+
+    def search(self) -> Hits:
+        return {
+            "article": self.index.search(self.query, HYBRID_CANDIDATES, articles=self.articles, scope=self.scope)
+                       if self.articles else [],
+            "bm25": [] if self.fast else self.index.search(self.query, HYBRID_CANDIDATES, scope=self.scope),
+        }
+
+    def submit(self) -> "Future[Hits]":
+        """search() on a worker thread, to overlap the vector query."""
+        return _POOL.submit(self.search)
+
+    def fuse(self, matches: List[Dict[str, Any]], hits: Hits) -> List[Tuple[Dict[str, Any], float]]:
+        """(metadata, RRF score) of the top_k chunks: the named articles' first, then dense + BM25 fused."""
+        article = [i for i, _ in hits["article"]]
+        fused = rrf([article, [m["id"] for m in matches], [i for i, _ in hits["bm25"]]])
+        named = set(article)
+        top = ([x for x in fused if x[0] in named] + [x for x in fused if x[0] not in named])[:self.top_k]
+        md = {m["id"]: m.get("metadata") or {} for m in matches}
+        missing = [i for i, _ in top if i not in md]
+        if missing:
+            md.update(self.index.metadata(missing))
+        return [(md[i], score) for i, score in top if i in md]
+
+def lexical_plan(query: str, top_k: int, articles: Sequence[str] = (),
+                 scope: Optional[Dict[str, Any]] = None) -> Optional[LexicalPlan]:
+    """None (dense retrieval only) when hybrid retrieval is off or nothing was indexed lexically."""
+    if not HYBRID_RETRIEVAL:
+        return None
+    index = get_lexical_index()
+    if not len(index):
+        return None
+    return LexicalPlan(index, query, top_k, articles, scope)
@@ -0,0 +1,277 @@
+import argparse, json, math, os, re, sqlite3, threading, time
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from ingest.text_utils import article_number
+
+LEXICAL_DIR = os.getenv("LEXICAL_DIR", ".cache/lexical")
+# how often a server re-checks the store for chunks written by an ingest process
+LEXICAL_RELOAD_INTERVAL = float(os.getenv("LEXICAL_RELOAD_INTERVAL", "30"))
+BM25_K1, BM25_B = 1.2, 0.75
+# metadata fields a search can be scoped to (equality)
+SCOPE_FIELDS = ("source_uri", "source_version", "doc_id")
+_NONE = np.zeros(0, dtype=np.int32)
+
+# "10(2)" stays one token (and also yields "10"), so paragraph references match exactly
+TOKEN = re.compile(r"\d+(?:\(\d+\))+|[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and any are as at be by for from has have in into is it its of on or shall such that the their "
+    "there these this those to was were where which with".split()
+)
+
+def _stem(t: str) -> str:
+    # plural folding only: providers -> provider, bodies -> body
+    if t[-1:] == "s" and len(t) > 3 and not t[0].isdigit() and not t.endswith("ss"):
+        return t[:-3] + "y" if t.endswith("ies") else t[:-1]
+    return t
+
+def tokenize(text: str) -> List[str]:
+    out = []
+    for t in TOKEN.findall(text.lower()):
+        if t in STOPWORDS:
+            continue
+        if "(" in t:
+            out.append(t)
+            t = t[:t.index("(")]
+        out.append(_stem(t))
+    return out
+
+def chunk_articles(md: Dict[str, Any]) -> List[str]:
+    """The article numbers a chunk belongs to: article_nums from ingest, else its article_id (older chunks)."""
+    if md.get("article_nums"):
+        return [str(a) for a in md["article_nums"]]
+    a = article_number(md.get("article_id"))
+    return [a] if a else []
+
+class _Snapshot:
+    """Immutable CSR postings over every stored chunk, with precomputed BM25 term weights."""
+
+    def __init__(self, rows: List[Tuple[Any, ...]], vocab: Dict[str, int]):
+        # rows: (id, articles, length, terms, tfs, *SCOPE_FIELDS values)
+        self.vocab = vocab
+        self.ids = [r[0] for r in rows]
+        self.n = len(rows)
+        lengths = np.fromiter((r[2] for r in rows), dtype=np.float32, count=self.n)
+        terms = [np.frombuffer(r[3], dtype=np.uint32) for r in rows]
+        counts = np.fromiter((len(t) for t in terms), dtype=np.int64, count=self.n)
+        term_all = np.concatenate(terms) if self.n else np.zeros(0, dtype=np.uint32)
+        tf_all = (np.concatenate([np.frombuffer(r[4], dtype=np.uint16) for r in rows]) if self.n
+                  else np.zeros(0, dtype=np.uint16)).astype(np.float32)
+        doc_all = np.repeat(np.arange(self.n, dtype=np.int32), counts)
+        order = np.argsort(term_all, kind="stable")
+        self.post_rows = doc_all[order]
+        avgdl = float(lengths.mean()) if self.n and lengths.sum() else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avgdl)
+        tf = tf_all[order]
+        self.post_w = tf * (BM25_K1 + 1) / (tf + norm[self.post_rows])
+        self.offsets = np.searchsorted(term_all[order], np.arange(max(vocab.values(), default=-1) + 2))
+        by_article: Dict[str, List[int]] = {}
+        by_scope: Dict[Tuple[str, Any], List[int]] = {}
+        for i, r in enumerate(rows):
+            for a in r[1].split(","):
+                if a:
+                    by_article.setdefault(a, []).append(i)
+            for f, v in zip(SCOPE_FIELDS, r[5:]):
+                if v is not None:
+                    by_scope.setdefault((f, v), []).append(i)
+        self.articles: Dict[str, np.ndarray] = {a: np.asarray(v, dtype=np.int32) for a, v in by_article.items()}
+        self.scoped: Dict[Tuple[str, Any], np.ndarray] = {k: np.asarray(v, dtype=np.int32) for k, v in by_scope.items()}
+
+    def rows(self, articles: Optional[Iterable[str]] = None, scope: Optional[Dict[str, Any]] = None) -> Optional[np.ndarray]:
+        """Sorted rows in any of `articles` and matching every field of `scope`; None when neither restricts."""
+        out = None
+        if articles is not None:
+            out = np.unique(np.concatenate([self.articles.get(a, _NONE) for a in articles] or [_NONE]))
+        for f, v in (scope or {}).items():
+            if f not in SCOPE_FIELDS:
+                raise ValueError(f"cannot scope a lexical search on {f!r}; use one of {SCOPE_FIELDS}")
+            r = self.scoped.get((f, v), _NONE)
+            out = r if out is None else np.intersect1d(out, r, assume_unique=True)
+        return out
+
+    def scores(self, query: str) -> np.ndarray:
+        rows, weights = [], []
+        for t in set(tokenize(query)):
+            tid = self.vocab.get(t)
+            if tid is None or tid + 1 >= len(self.offsets):
+                continue
+            a, b = self.offsets[tid], self.offsets[tid + 1]
+            if a == b:
+                continue
+            idf = math.log(1 + (self.n - (b - a) + 0.5) / ((b - a) + 0.5))
+            rows.append(self.post_rows[a:b])
+            weights.append(self.post_w[a:b] * idf)
+        if not rows:
+            return np.zeros(self.n, dtype=np.float32)
+        return np.bincount(np.concatenate(rows), weights=np.concatenate(weights), minlength=self.n)
+
+class LexicalIndex:
+    """
+    BM25 over the ingested chunks, next to the vector index.
+
+    Stored in one SQLite file: a term -> id vocabulary, and per chunk its
+    token count, packed (term id uint32, tf uint16) arrays, its article
+    numbers (chunk_articles) and the vector metadata (to return
+    lexical-only hits as contexts, and to scope searches on SCOPE_FIELDS). Searches run on an in-memory CSR
+    snapshot with the BM25 term weights precomputed, so a query costs the
+    postings of its terms.
+    The snapshot is rebuilt after local writes, and at most every
+    LEXICAL_RELOAD_INTERVAL seconds when another process (ingest) committed.
+    """
+
+    def __init__(self, path: str, reload_interval: float = LEXICAL_RELOAD_INTERVAL):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.path, self.reload_interval = path, reload_interval
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, id INTEGER NOT NULL UNIQUE)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, articles TEXT NOT NULL, length INTEGER NOT NULL, "
+            "terms BLOB NOT NULL, tfs BLOB NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._vocab: Dict[str, int] = dict(self._conn.execute("SELECT term, id FROM terms"))
+        self._snap: Optional[_Snapshot] = None
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._checked = 0.0
+
+    # --- writing (ingest)
+
+    def add(self, records: Iterable[Dict[str, Any]]) -> int:
+        """records: {"id", "metadata": {"text", "article_id", ...}}, as ingest builds them for the vector index."""
+        rows = []
+        with self._lock:
+            # IMMEDIATE: term ids are allocated from the vocabulary as committed by any writer
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reload_if_changed()
+                for r in records:
+                    md = r["metadata"]
+                    counts = Counter(tokenize(md.get("text", "")))
+                    ids = array("I")
+                    for t in counts:
+                        tid = self._vocab.get(t)
+                        if tid is None:
+                            tid = self._vocab[t] = len(self._vocab)
+                            self._conn.execute("INSERT INTO terms (term, id) VALUES (?, ?)", (t, tid))
+                        ids.append(tid)
+                    tfs = array("H", (min(c, 65535) for c in counts.values()))
+                    rows.append((r["id"], ",".join(chunk_articles(md)), sum(counts.values()),
+                                  ids.tobytes(), tfs.tobytes(), json.dumps(md)))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (id, articles, length, terms, tfs, metadata) VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._vocab = dict(self._conn.execute("SELECT term, id FROM terms"))
+                raise
+            self._conn.execute("COMMIT")
+            self._snap = None
+        return len(rows)
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM chunks WHERE id=?", [(i,) for i in ids])
+            self._conn.execute("COMMIT")
+            self._snap = None
+
+    # --- reading
+
+    def _reload_if_changed(self):
+        # data_version moves when another connection commits
+        v = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if v != self._data_version:
+            self._data_version = v
+            self._vocab = dict(self._conn.execute("SELECT term, id FROM terms"))
+            self._snap = None
+
+    def _current(self) -> _Snapshot:
+        with self._lock:
+            now = time.monotonic()
+            if self._snap is None or now - self._checked >= self.reload_interval:
+                self._checked = now
+                self._reload_if_changed()
+            if self._snap is None:
+                facets = ", ".join(f"json_extract(metadata, '$.{f}')" for f in SCOPE_FIELDS)
+                rows = self._conn.execute(f"SELECT id, articles, length, terms, tfs, {facets} FROM chunks").fetchall()
+                self._snap = _Snapshot(rows, dict(self._vocab))
+            return self._snap
+
+    def __len__(self) -> int:
+        return self._current().n
+
+    def articles_size(self, articles: List[str], scope: Optional[Dict[str, Any]] = None) -> int:
+        """Chunks belonging to any of these article numbers (within `scope`)."""
+        return len(self._current().rows(articles, scope))
+
+    def search(self, query: str, top_k: int = 20, articles: Optional[List[str]] = None,
+               scope: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """
+        (chunk id, BM25 score), best first. With `articles` only those articles'
+        chunks are ranked, and all of them are candidates, even those without a
+        query term. `scope` ({field: value} on SCOPE_FIELDS) restricts either.
+        """
+        snap = self._current()
+        if not snap.n or top_k <= 0:
+            return []
+        scores = snap.scores(query)
+        if articles is not None:
+            rows = snap.rows(articles, scope)
+        else:
+            rows = np.flatnonzero(scores > 0)
+            if scope:
+                rows = np.intersect1d(rows, snap.rows(None, scope), assume_unique=True)
+        if len(rows) > top_k:
+            rows = rows[np.argpartition(-scores[rows], top_k - 1)[:top_k]]
+        rows = rows[np.lexsort((rows, -scores[rows]))]
+        return [(snap.ids[r], float(scores[r])) for r in rows]
+
+    def metadata(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for s in range(0, len(ids), 500):
+                part = ids[s:s + 500]
+                marks = ",".join("?" * len(part))
+                for i, md in self._conn.execute(f"SELECT id, metadata FROM chunks WHERE id IN ({marks})", part):
+                    out[i] = json.loads(md)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._current()
+        return {"chunks": snap.n, "terms": len(snap.vocab), "postings": len(snap.post_rows),
+                "articles": len(snap.articles),
+                "bytes": sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))}
+
+def get_lexical_index(name: Optional[str] = None) -> LexicalIndex:
+    from retrieval.backends import VECTOR_INDEX
+    from utils.registry import CLIENTS
+    name = name or VECTOR_INDEX
+    return CLIENTS.get(("lexical.index", name), lambda: LexicalIndex(os.path.join(LEXICAL_DIR, f"{name}.sqlite")))
+
+def backfill(lex: LexicalIndex) -> int:
+    """
+    Indexes every chunk the manifests list, reading the text back from the
+    vector index. Rows keep the full vector metadata, as ingest writes them,
+    so article_nums and doc_id filters match backfilled chunks too.
+    """
+    from db.mongo import docs
+    from ingest.extract_clauses import metadata_from_index
+    n = 0
+    for d in docs.find({}, {"_id": 1}):
+        n += lex.add({"id": cid, "metadata": {**md, "chunk_id": cid}} for cid, md in metadata_from_index([d["_id"]]))
+    return n
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="The BM25 index used by hybrid retrieval.")
+    ap.add_argument("command", choices=["stats", "backfill"])
+    ap.add_argument("--name", default=None, help="index name (default: PINECONE_INDEX or 'docs')")
+    a = ap.parse_args()
+    lex = get_lexical_index(a.name)
+    if a.command == "backfill":
+        print(f"[lexical] indexed {backfill(lex)} chunks from the vector index")
+    print(json.dumps(lex.stats()))
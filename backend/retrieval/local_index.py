@@ -0,0 +1,459 @@
+import argparse, json, os, sqlite3, threading
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+
+VECTOR_DIR = os.getenv("VECTOR_DIR", ".cache/vectors")
+VECTOR_METRIC = os.getenv("VECTOR_METRIC", "cosine")  # cosine | dotproduct
+VECTOR_NPROBE = int(os.getenv("VECTOR_NPROBE", "16"))  # IVF lists scanned per query
+SEARCH_BLOCK = 65536  # rows per matmul; bounds the score buffer
+GROW_MIN = 1024
+IN_MEMORY_SKIP = {"text"}  # metadata kept only in the sidecar, not for filtering
+# metadata fields with postings: $eq / $in filters on them skip the scan over every row
+FACETS = ("article_nums", "source_uri", "source_version", "doc_id")
+
+def match_filter(md: Dict[str, Any], flt: Dict[str, Any]) -> bool:
+    """Pinecone metadata filter semantics: field: value | {$eq,$ne,$in,$nin,$gt,$gte,$lt,$lte,$exists}, $and, $or."""
+    for k, cond in flt.items():
+        if k == "$and":
+            if not all(match_filter(md, f) for f in cond):
+                return False
+        elif k == "$or":
+            if not any(match_filter(md, f) for f in cond):
+                return False
+        else:
+            v = md.get(k)
+            for op, x in (cond.items() if isinstance(cond, dict) else (("$eq", cond),)):
+                if not _OPS[op](v, x):
+                    return False
+    return True
+
+def _has(v, x) -> bool:
+    return x in v if isinstance(v, list) else v == x
+
+def _cmp(fn):
+    def op(v, x):
+        try:
+            return v is not None and not isinstance(v, (list, bool)) and fn(v, x)
+        except TypeError:
+            return False
+    return op
+
+_OPS = {
+    "$eq": _has,
+    "$ne": lambda v, x: not _has(v, x),
+    "$in": lambda v, xs: any(_has(v, x) for x in xs),
+    "$nin": lambda v, xs: not any(_has(v, x) for x in xs),
+    "$gt": _cmp(lambda v, x: v > x),
+    "$gte": _cmp(lambda v, x: v >= x),
+    "$lt": _cmp(lambda v, x: v < x),
+    "$lte": _cmp(lambda v, x: v <= x),
+    "$exists": lambda v, x: (v is not None) == bool(x),
+}
+
+def _top(scores: np.ndarray, rows: np.ndarray, k: int):
+    """(scores, rows) of the k best, best first; ties broken by row for stable output."""
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        scores, rows = scores[part], rows[part]
+    order = np.lexsort((rows, -scores))
+    return scores[order], rows[order]
+
+class LocalVectorIndex:
+    """
+    On-disk vector index with the subset of the Pinecone Index API the app
+    uses: upsert / query / fetch / delete / describe_index_stats.
+
+    - vectors.f32: a memory-mapped float32 (capacity, dim) matrix, grown by
+      doubling; rows of deleted ids are reused
+    - meta.sqlite: row -> id, metadata JSON and IVF list (the sidecar);
+      metadata minus IN_MEMORY_SKIP is also held in memory for filters
+    - index.json: dim, metric, capacity
+
+    With metric=cosine rows are stored normalized, so scores are dot
+    products. query() is exact (blocked matmul + argpartition) unless an IVF
+    index was built (build_ivf / `python -m retrieval.local_index build-ivf`):
+    then only the VECTOR_NPROBE nearest lists are scored. Filtered queries
+    are always exact over the matching rows; conditions on FACETS find
+    those rows from in-memory postings. fetch() returns the stored, i.e.
+    normalized, values. Commits by another process (an ingest CLI) are
+    picked up on the next call.
+    """
+
+    def __init__(self, path: str, metric: str = VECTOR_METRIC, nprobe: int = VECTOR_NPROBE):
+        os.makedirs(path, exist_ok=True)
+        self.path, self.nprobe = path, nprobe
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(path, "meta.sqlite"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, "
+            "metadata TEXT NOT NULL, list INTEGER)"
+        )
+        self._default_metric = metric
+        self._load()
+
+    def _load(self):
+        """(Re)reads index.json and the sidecar: ids, rows, in-memory metadata, IVF lists and centroids."""
+        cfg = self._read_config()
+        self.dim: Optional[int] = cfg.get("dim")
+        self.metric = cfg.get("metric", self._default_metric)
+        if self.metric not in ("cosine", "dotproduct"):
+            raise ValueError(f"unsupported metric {self.metric!r}; use cosine or dotproduct")
+        self.capacity = 0
+        self._vecs: Optional[np.memmap] = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._row: Dict[str, int] = {}
+        self._ids: Dict[int, str] = {}
+        self._meta: Dict[int, Dict[str, Any]] = {}
+        self._facets: Dict[Tuple[str, Any], Set[int]] = {}
+        self._n = 0  # high-water row
+        self._centroids: Optional[np.ndarray] = None
+        self._list_rows: Optional[List[np.ndarray]] = None  # per-list rows, rebuilt lazily
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if self.dim:
+            self._open(cfg.get("capacity", 0), save=False)
+        rows = self._conn.execute("SELECT row, id, metadata, list FROM vectors").fetchall()
+        for row, id_, md, lst in rows:
+            self._row[id_], self._ids[row] = row, id_
+            self._set_meta(row, json.loads(md))
+            self._n = max(self._n, row + 1)
+        if rows:
+            r = np.fromiter((x[0] for x in rows), dtype=np.int64, count=len(rows))
+            self._alive[r] = True
+            self._lists[r] = np.fromiter((-1 if x[3] is None else x[3] for x in rows), dtype=np.int32, count=len(rows))
+        self._free = [r for r in range(self._n - 1, -1, -1) if not self._alive[r]]
+        cpath = os.path.join(self.path, "ivf_centroids.npy")
+        if os.path.exists(cpath):
+            self._centroids = np.load(cpath)
+
+    def _reload_if_changed(self):
+        # data_version moves when another connection (an ingest CLI) commits. Checked on
+        # every call, not on an interval like LexicalIndex: _metadata() reads the sidecar
+        # live, so stale id <-> row maps would pair old ids with reused rows' new chunks.
+        if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._load()
+
+    # --- storage
+
+    def _read_config(self) -> Dict[str, Any]:
+        p = os.path.join(self.path, "index.json")
+        if not os.path.exists(p):
+            return {}
+        with open(p, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_config(self):
+        with open(os.path.join(self.path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "metric": self.metric, "capacity": self.capacity}, f)
+
+    def _open(self, capacity: int, save: bool = True):
+        """Maps vectors.f32 at `capacity` rows, extending the file if needed."""
+        p = os.path.join(self.path, "vectors.f32")
+        if self._vecs is not None:
+            self._vecs.flush()
+            self._vecs = None
+        size = capacity * self.dim * 4
+        with open(p, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._vecs = np.memmap(p, dtype=np.float32, mode="r+", shape=(capacity, self.dim)) if capacity else None
+        grow = capacity - self.capacity
+        if grow > 0:
+            self._alive = np.concatenate([self._alive, np.zeros(grow, dtype=bool)])
+            self._lists = np.concatenate([self._lists, np.full(grow, -1, dtype=np.int32)])
+        self.capacity = capacity
+        if save:
+            self._write_config()
+
+    def _alloc(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._n >= self.capacity:
+            self._open(max(GROW_MIN, self.capacity * 2))
+        self._n += 1
+        return self._n - 1
+
+    def _prep(self, vecs: np.ndarray) -> np.ndarray:
+        if self.metric == "cosine":
+            norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+            vecs = vecs / np.where(norms == 0, 1, norms)
+        return vecs.astype(np.float32, copy=False)
+
+    # --- Pinecone-compatible API
+
+    def upsert(self, vectors: Iterable[Any], namespace: Optional[str] = None, **_) -> Dict[str, int]:
+        """vectors: {"id", "values", "metadata"} dicts or (id, values[, metadata]) tuples."""
+        items = [v if isinstance(v, dict) else dict(zip(("id", "values", "metadata"), v)) for v in vectors]
+        items = list({v["id"]: v for v in items}.values())  # a repeated id: the last copy wins, like Pinecone
+        if not items:
+            return {"upserted_count": 0}
+        arr = np.asarray([v["values"] for v in items], dtype=np.float32)
+        with self._lock:
+            self._reload_if_changed()
+            if self.dim is None:
+                self.dim = arr.shape[1]
+                self._write_config()
+            if arr.ndim != 2 or arr.shape[1] != self.dim:
+                raise ValueError(f"vector dimension {arr.shape[-1]} does not match index dimension {self.dim}")
+            arr = self._prep(arr)
+            rows = []
+            for v in items:
+                row = self._row.get(v["id"])
+                rows.append(self._alloc() if row is None else row)
+            r = np.asarray(rows, dtype=np.int64)
+            self._vecs[r] = arr
+            self._vecs.flush()
+            lists = self._assign(arr) if self._centroids is not None else np.full(len(r), -1, dtype=np.int32)
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (row, id, metadata, list) VALUES (?, ?, ?, ?)",
+                [(row, v["id"], json.dumps(v.get("metadata") or {}), None if l < 0 else int(l))
+                 for row, v, l in zip(rows, items, lists)],
+            )
+            self._conn.execute("COMMIT")
+            for row, v in zip(rows, items):
+                self._row[v["id"]], self._ids[row] = row, v["id"]
+                self._set_meta(row, v.get("metadata") or {})
+            self._alive[r] = True
+            self._lists[r] = lists
+            self._list_rows = None
+        return {"upserted_count": len(items)}
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False, namespace: Optional[str] = None, **_):
+        with self._lock:
+            self._reload_if_changed()
+            ids = list(self._row) if delete_all else [i for i in (ids or []) if i in self._row]
+            if not ids:
+                return {}
+            rows = [self._row.pop(i) for i in ids]
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM vectors WHERE row=?", [(r,) for r in rows])
+            self._conn.execute("COMMIT")
+            for r in rows:
+                self._ids.pop(r, None)
+                self._set_meta(r, None)
+            self._alive[rows] = False
+            self._lists[rows] = -1
+            self._free.extend(sorted(rows, reverse=True))
+            self._list_rows = None
+        return {}
+
+    def fetch(self, ids: List[str], namespace: Optional[str] = None, **_):
+        with self._lock:
+            self._reload_if_changed()
+            rows = {self._row[i]: i for i in ids if i in self._row}
+            md = self._metadata(list(rows))
+            vectors = {i: {"id": i, "values": self._vecs[r].tolist(), "metadata": md.get(r, {})} for r, i in rows.items()}
+        return SimpleNamespace(vectors=vectors, namespace=namespace or "")
+
+    def query(self, vector: Optional[List[float]] = None, top_k: int = 10, include_metadata: bool = False,
+              include_values: bool = False, filter: Optional[Dict[str, Any]] = None, id: Optional[str] = None,
+              namespace: Optional[str] = None, **_) -> Dict[str, Any]:
+        with self._lock:
+            self._reload_if_changed()
+            if vector is None and id is not None and id in self._row:
+                q = np.asarray(self._vecs[self._row[id]], dtype=np.float32)
+            else:
+                q = self._prep(np.asarray(vector, dtype=np.float32))
+            if not self._row or top_k <= 0:
+                return {"matches": [], "namespace": namespace or ""}
+            if filter:
+                scores, rows = self._score_rows(q, self._filter_rows(filter), top_k)
+            elif self._centroids is not None:
+                scores, rows = self._score_rows(q, self._probe(q), top_k)
+            else:
+                scores, rows = self._score_all(q, top_k)
+            md = self._metadata(rows.tolist()) if include_metadata else {}
+            matches = []
+            for s, r in zip(scores.tolist(), rows.tolist()):
+                m = {"id": self._ids[r], "score": s}
+                if include_metadata:
+                    m["metadata"] = md.get(r, {})
+                if include_values:
+                    m["values"] = self._vecs[r].tolist()
+                matches.append(m)
+        return {"matches": matches, "namespace": namespace or ""}
+
+    def describe_index_stats(self, **_) -> Dict[str, Any]:
+        with self._lock:
+            self._reload_if_changed()
+        return {
+            "dimension": self.dim,
+            "metric": self.metric,
+            "total_vector_count": len(self._row),
+            "ivf_lists": 0 if self._centroids is None else len(self._centroids),
+        }
+
+    # --- metadata filters
+
+    def _set_meta(self, row: int, md: Optional[Dict[str, Any]]):
+        """Replaces the in-memory metadata (and facet postings) of `row`; None drops it."""
+        for key in self._facet_keys(self._meta.pop(row, {})):
+            posting = self._facets.get(key)
+            if posting is not None:
+                posting.discard(row)
+                if not posting:
+                    del self._facets[key]
+        if md is None:
+            return
+        self._meta[row] = {k: v for k, v in md.items() if k not in IN_MEMORY_SKIP}
+        for key in self._facet_keys(md):
+            self._facets.setdefault(key, set()).add(row)
+
+    @staticmethod
+    def _facet_keys(md: Dict[str, Any]):
+        for f in FACETS:
+            v = md.get(f)
+            for x in (v if isinstance(v, list) else (v,)):
+                if isinstance(x, (str, int)):
+                    yield f, x
+
+    def _filter_rows(self, flt: Dict[str, Any]) -> np.ndarray:
+        """Rows matching `flt`: candidates from the facet postings of its top-level $eq / $in terms, then match_filter."""
+        cand: Optional[Set[int]] = None
+        for k, cond in flt.items():
+            if k not in FACETS:
+                continue
+            if not isinstance(cond, dict):
+                values = [cond]
+            elif set(cond) == {"$eq"}:
+                values = [cond["$eq"]]
+            elif set(cond) == {"$in"}:
+                values = list(cond["$in"])
+            else:
+                continue
+            rows: Set[int] = set()
+            for v in values:
+                if isinstance(v, (str, int)):
+                    rows |= self._facets.get((k, v), set())
+            cand = rows if cand is None else cand & rows
+        pool = self._meta if cand is None else cand
+        return np.fromiter((r for r in pool if match_filter(self._meta[r], flt)), dtype=np.int64)
+
+    # --- search
+
+    def _score_all(self, q: np.ndarray, k: int):
+        best_s, best_r = np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        for a in range(0, self._n, SEARCH_BLOCK):
+            b = min(self._n, a + SEARCH_BLOCK)
+            s = self._vecs[a:b] @ q
+            s[~self._alive[a:b]] = -np.inf
+            s, r = _top(s, np.arange(a, b), k)
+            best_s, best_r = _top(np.concatenate([best_s, s]), np.concatenate([best_r, r]), k)
+        keep = np.isfinite(best_s)
+        return best_s[keep], best_r[keep]
+
+    def _score_rows(self, q: np.ndarray, rows: np.ndarray, k: int):
+        if not len(rows):
+            return np.zeros(0, dtype=np.float32), rows
+        rows = np.sort(rows)  # sequential reads from the memmap
+        best_s, best_r = np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        for a in range(0, len(rows), SEARCH_BLOCK):
+            part = rows[a:a + SEARCH_BLOCK]
+            s, r = _top(self._vecs[part] @ q, part, k)
+            best_s, best_r = _top(np.concatenate([best_s, s]), np.concatenate([best_r, r]), k)
+        return best_s, best_r
+
+    def _metadata(self, rows: List[int]) -> Dict[int, Dict[str, Any]]:
+        out: Dict[int, Dict[str, Any]] = {}
+        for s in range(0, len(rows), 500):
+            part = rows[s:s + 500]
+            marks = ",".join("?" * len(part))
+            for row, md in self._conn.execute(f"SELECT row, metadata FROM vectors WHERE row IN ({marks})", part):
+                out[row] = json.loads(md)
+        return out
+
+    # --- IVF (inverted file) approximate search
+
+    def _assign(self, arr: np.ndarray) -> np.ndarray:
+        out = np.empty(len(arr), dtype=np.int32)
+        for a in range(0, len(arr), SEARCH_BLOCK):
+            out[a:a + SEARCH_BLOCK] = np.argmax(arr[a:a + SEARCH_BLOCK] @ self._centroids.T, axis=1)
+        return out
+
+    def _probe(self, q: np.ndarray) -> np.ndarray:
+        if self._list_rows is None:
+            rows = np.flatnonzero(self._alive[:self._n] & (self._lists[:self._n] >= 0))
+            order = rows[np.argsort(self._lists[rows], kind="stable")]
+            bounds = np.searchsorted(self._lists[order], np.arange(len(self._centroids) + 1))
+            self._list_rows = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+        nprobe = min(self.nprobe, len(self._centroids))
+        best = np.argpartition(-(self._centroids @ q), nprobe - 1)[:nprobe]
+        return np.concatenate([self._list_rows[i] for i in best])
+
+    def build_ivf(self, nlist: Optional[int] = None, iters: int = 10, sample: int = 50_000, seed: int = 0) -> int:
+        """
+        Trains `nlist` (default ~4·sqrt(n)) k-means centroids on a sample of
+        the stored vectors and assigns every row to its nearest one; later
+        upserts are assigned on write. Returns nlist.
+        """
+        with self._lock:
+            self._reload_if_changed()
+            rows = np.flatnonzero(self._alive[:self._n])
+            if not len(rows):
+                raise ValueError("index is empty")
+            nlist = min(len(rows), nlist or max(1, int(4 * np.sqrt(len(rows)))))
+            rng = np.random.default_rng(seed)
+            train = np.asarray(self._vecs[np.sort(rng.choice(rows, min(sample, len(rows)), replace=False))])
+            cent = train[rng.choice(len(train), nlist, replace=False)].copy()
+            for _ in range(iters):
+                self._centroids = cent
+                lab = self._assign(train)
+                sums = np.zeros_like(cent)
+                np.add.at(sums, lab, train)
+                counts = np.bincount(lab, minlength=nlist)
+                empty = counts == 0
+                # reseed empty lists from random training points
+                sums[empty] = train[rng.choice(len(train), int(empty.sum()))]
+                cent = self._prep(sums / np.maximum(counts, 1)[:, None]) if self.metric == "cosine" \
+                    else sums / np.maximum(counts, 1)[:, None]
+            self._centroids = cent.astype(np.float32)
+            lists = np.empty(len(rows), dtype=np.int32)
+            for a in range(0, len(rows), SEARCH_BLOCK):
+                part = rows[a:a + SEARCH_BLOCK]
+                lists[a:a + SEARCH_BLOCK] = self._assign(np.asarray(self._vecs[part]))
+            self._lists[rows] = lists
+            self._list_rows = None
+            np.save(os.path.join(self.path, "ivf_centroids.npy"), self._centroids)
+            self._conn.execute("BEGIN")
+            self._conn.executemany("UPDATE vectors SET list=? WHERE row=?",
+                                   [(int(l), int(r)) for l, r in zip(lists, rows)])
+            self._conn.execute("COMMIT")
+            return nlist
+
+    def drop_ivf(self):
+        """Back to exact search."""
+        with self._lock:
+            self._centroids, self._list_rows = None, None
+            self._lists[:] = -1
+            p = os.path.join(self.path, "ivf_centroids.npy")
+            if os.path.exists(p):
+                os.remove(p)
+            self._conn.execute("UPDATE vectors SET list=NULL")
+
+    def close(self):
+        with self._lock:
+            if self._vecs is not None:
+                self._vecs.flush()
+            self._conn.close()
+
+def get_local_index(name: str):
+    from utils.registry import CLIENTS
+    return CLIENTS.get(("local.index", name), lambda: LocalVectorIndex(os.path.join(VECTOR_DIR, name)))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Maintain a local vector index (VECTOR_BACKEND=local).")
+    ap.add_argument("command", choices=["stats", "build-ivf", "drop-ivf"])
+    ap.add_argument("--name", default=None, help="index name (default: PINECONE_INDEX or 'docs')")
+    ap.add_argument("--nlist", type=int, default=None, help="IVF lists (default ~4*sqrt(n))")
+    a = ap.parse_args()
+    from retrieval.backends import VECTOR_INDEX
+    idx = get_local_index(a.name or VECTOR_INDEX)
+    if a.command == "build-ivf":
+        print(f"[vectors] built IVF with {idx.build_ivf(a.nlist)} lists")
+    elif a.command == "drop-ivf":
+        idx.drop_ivf()
+    print(json.dumps(idx.describe_index_stats()))
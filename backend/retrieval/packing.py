@@ -0,0 +1,121 @@
+import math, os
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Set
+from retrieval.lexical import tokenize
+from utils.tokens import count_tokens, truncate_tokens
+
+CONTEXT_RERANK = os.getenv("CONTEXT_RERANK", "1").lower() not in {"0", "false", "off"}
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))  # relevance vs novelty of the next context
+# context tokens each LLM stage reads; 0 = every retrieved context
+CONTEXT_BUDGETS = {
+    "segment": int(os.getenv("CONTEXT_TOKENS_SEGMENT", "600")),
+    "definitions": int(os.getenv("CONTEXT_TOKENS_DEFINITIONS", "640")),
+    "fused_definitions": int(os.getenv("CONTEXT_TOKENS_FUSED_DEFINITIONS", "256")),
+    "answer": int(os.getenv("CONTEXT_TOKENS_ANSWER", "1400")),
+}
+NEAR_DUPLICATE = 0.9  # term-set Jaccard at which a chunk adds nothing to one already packed
+# neighbouring chunks share up to chunk_overlap (200) chars, cut at a separator
+OVERLAP_MIN, OVERLAP_MAX = 30, 400
+
+Context = Dict[str, Any]
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def rerank(query: str, contexts: List[Context]) -> List[Context]:
+    """
+    Retrieved contexts without exact duplicates (same text_hash), in
+    maximal-marginal-relevance order over their terms:
+    - relevance: half the retriever's rank, half the query terms the chunk
+      contains, weighted by their rarity among the candidates
+    - redundancy: the highest term-set Jaccard with a context already picked
+    The first pick is the most relevant context.
+    """
+    seen, uniq = set(), []
+    for c in contexts:
+        key = c.get("text_hash") or c.get("text")
+        if key not in seen:
+            seen.add(key)
+            uniq.append(c)
+    if not CONTEXT_RERANK or len(uniq) < 2:
+        return uniq
+    n = len(uniq)
+    terms = [set(tokenize(c.get("text") or "")) for c in uniq]
+    q = set(tokenize(query))
+    df = Counter(t for ts in terms for t in ts & q)
+    w = {t: math.log(1 + n / (1 + df[t])) for t in q}
+    total = sum(w.values()) or 1.0
+    rel = [0.5 * (1 - i / n) + 0.5 * sum(w[t] for t in ts & q) / total for i, ts in enumerate(terms)]
+    picked: List[int] = []
+    redundancy = [0.0] * n
+    rest = list(range(n))
+    while rest:
+        i = max(rest, key=lambda j: (MMR_LAMBDA * rel[j] - (1 - MMR_LAMBDA) * redundancy[j], -j))
+        picked.append(i)
+        rest.remove(i)
+        for j in rest:
+            redundancy[j] = max(redundancy[j], _jaccard(terms[i], terms[j]))
+    return [uniq[i] for i in picked]
+
+def _shared_edge(a: str, b: str) -> int:
+    """Length of the longest suffix of `a` that `b` starts with (at least OVERLAP_MIN chars), else 0."""
+    tail = a[-OVERLAP_MAX:]
+    head = b[:OVERLAP_MIN]
+    if len(head) < OVERLAP_MIN:
+        return 0
+    pos = tail.find(head)
+    while pos != -1:
+        if b.startswith(tail[pos:]):
+            return len(tail) - pos
+        pos = tail.find(head, pos + 1)
+    return 0
+
+def _trim_overlap(packed: str, text: str) -> str:
+    # text continues packed (starts with its end), or precedes it (ends with its start)
+    n = _shared_edge(packed, text)
+    if n:
+        text = text[n:].lstrip()
+    n = _shared_edge(text, packed)
+    if n:
+        text = text[:-n].rstrip()
+    return text
+
+def pack(contexts: List[Context], budget: int, skip: Iterable[str] = ()) -> List[Context]:
+    """
+    Contexts in order, as many as fit `budget` tokens (0: no limit):
+    - chunks in `skip` (chunk ids), contained in or near duplicates of a
+      packed chunk are left out
+    - text a chunk shares with a packed neighbour is cut from the chunk
+    - a chunk that does not fit is passed over for later, smaller ones;
+      only the first one is truncated to the budget instead
+    Returned contexts are copies; their "text" is what the prompt gets.
+    """
+    skip = set(skip)
+    out: List[Context] = []
+    packed_terms: List[Set[str]] = []
+    used = 0
+    for c in contexts:
+        if c.get("chunk_id") is not None and c["chunk_id"] in skip:
+            continue
+        text = c.get("text") or ""
+        if any(text in p["text"] for p in out):
+            continue
+        ts = set(tokenize(text))
+        if any(_jaccard(ts, s) >= NEAR_DUPLICATE for s in packed_terms):
+            continue
+        for p in out:
+            text = _trim_overlap(p["text"], text)
+        if not text.strip():
+            continue
+        n = count_tokens(text)
+        if budget and used + n > budget:
+            if out:
+                continue
+            text, n = truncate_tokens(text, budget), budget
+        out.append({**c, "text": text})
+        packed_terms.append(ts)
+        used += n
+    return out
+
+def joined(contexts: List[Context]) -> str:
+    return "\n\n".join(c["text"] for c in contexts)
@@ -0,0 +1,129 @@
+import json, logging, os, re, threading, time
+from typing import Any, Dict, List, Optional
+from ingest.text_utils import article_number
+
+# off: plans still name the articles (for the lexical side) but nothing is pushed down and top_k stays fixed
+QUERY_PLANNER = os.getenv("QUERY_PLANNER", "1").lower() not in {"0", "false", "off"}
+ARTICLE_TOP_K = int(os.getenv("ARTICLE_TOP_K", "3"))  # contexts per article a question names
+MAX_TOP_K = int(os.getenv("MAX_TOP_K", "20"))          # bound on a requested top_k
+PLAN_MIN_MATCHES = int(os.getenv("PLAN_MIN_MATCHES", "1"))  # fewer article-filtered matches: query without the article filter
+SOURCES_TTL = float(os.getenv("SOURCES_TTL", "300"))  # seconds between re-reads of the ingested sources
+# phrase in a question -> source_uri; only sources that were actually ingested are used
+SOURCE_ALIASES: Dict[str, str] = json.loads(os.getenv("SOURCE_ALIASES") or json.dumps({
+    "ai act": "eurlex:eu_ai_act_official_journal",
+    "artificial intelligence act": "eurlex:eu_ai_act_official_journal",
+}))
+ARTICLE_SPAN_MAX = 20  # "Articles 8 to 15" expands to at most this many articles
+
+log = logging.getLogger(__name__)
+
+# "Article 10(2)", "Art. 5", "Articles 9 and 13", "Articles 8 to 15"
+ARTICLE_REFS = re.compile(
+    r'\b(?:Articles?|Arts?)\.?\s+(\d+(?:\(\d+\))*(?:\s*(?:,|and|or|to|through|-|–)\s*\d+(?:\(\d+\))*)*)',
+    re.IGNORECASE,
+)
+_REF_ITEM = re.compile(r'(\d+)(?:\(\d+\))*\s*(to|through|-|–)?')
+
+def question_articles(text: str) -> List[str]:
+    """Bare article numbers the text refers to, in order of first mention."""
+    out: List[str] = []
+    for m in ARTICLE_REFS.finditer(text or ""):
+        span_from = None
+        for num, dash in _REF_ITEM.findall(m.group(1)):
+            n = int(num)
+            nums = range(span_from + 1, n + 1) if span_from is not None and 0 < n - span_from <= ARTICLE_SPAN_MAX else [n]
+            out.extend(str(x) for x in nums if str(x) not in out)
+            span_from = n if dash else None
+    return out
+
+class SourceCatalog:
+    """The source_uri / source_version values in the docs manifests, re-read every SOURCES_TTL seconds."""
+
+    def __init__(self, ttl: float = SOURCES_TTL):
+        self.ttl = ttl
+        self.uris: frozenset = frozenset()
+        self.versions: frozenset = frozenset()
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        return self._loaded is None or time.monotonic() - self._loaded >= self.ttl
+
+    def refresh(self, force: bool = False):
+        if not (force or self.due()) or not self._lock.acquire(blocking=False):
+            return
+        try:
+            from db.mongo import docs
+            rows = list(docs.find({}, {"source_uri": 1, "source_version": 1}))
+            self.uris = frozenset(r["source_uri"] for r in rows if r.get("source_uri"))
+            self.versions = frozenset(r["source_version"] for r in rows if r.get("source_version"))
+        except Exception as e:
+            # keep the last catalog; questions just aren't scoped from their text meanwhile
+            log.warning("source catalog refresh failed: %r", e)
+        finally:
+            self._loaded = time.monotonic()
+            self._lock.release()
+
+SOURCES = SourceCatalog()
+
+def _named_source(text: str) -> Optional[str]:
+    """The one ingested source the question names by alias, if exactly one."""
+    q = text.lower()
+    hits = {uri for phrase, uri in SOURCE_ALIASES.items()
+            if uri in SOURCES.uris and re.search(r'\b' + re.escape(phrase.lower()) + r'\b', q)}
+    return hits.pop() if len(hits) == 1 else None
+
+def _named_version(text: str) -> Optional[str]:
+    q = text.lower()
+    hits = [v for v in SOURCES.versions if len(v) >= 4 and v.lower() in q]
+    return hits[0] if len(hits) == 1 else None
+
+def scope_filter(scope: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return {f: {"$eq": v} for f, v in scope.items()} or None
+
+def plan_query(state: Dict[str, Any], default_top_k: int) -> Dict[str, Any]:
+    """
+    Retrieval plan for one request, from the question and the request
+    payload (_articles, _source_uri, _source_version, _top_k):
+    - articles: bare numbers of the articles named; `filter` keeps the
+      vector query to their chunks (article_nums)
+    - scope: source_uri / source_version equality, from the payload or an
+      ingested regulation / version the question names
+    - top_k: the requested one, else ARTICLE_TOP_K per named article (at
+      most default_top_k), else default_top_k
+    """
+    text = state.get("query") or ""
+    articles = [a for a in (article_number(str(x)) for x in state.get("_articles") or []) if a]
+    articles += [a for a in question_articles(text) if a not in articles]
+    plan = {"articles": articles, "scope": {}, "top_k": default_top_k, "filter": None, "relaxed": False}
+    if not QUERY_PLANNER:
+        return plan
+    SOURCES.refresh()
+    uri = state.get("_source_uri") or _named_source(text)
+    version = state.get("_source_version") or _named_version(text)
+    if uri:
+        plan["scope"]["source_uri"] = uri
+    if version:
+        plan["scope"]["source_version"] = version
+    if state.get("_top_k"):
+        plan["top_k"] = max(1, min(int(state["_top_k"]), MAX_TOP_K))
+    elif articles:
+        plan["top_k"] = min(default_top_k, ARTICLE_TOP_K * len(articles))
+    flt = scope_filter(plan["scope"]) or {}
+    if articles:
+        flt["article_nums"] = {"$in": articles}
+    plan["filter"] = flt or None
+    return plan
+
+def filtered_query(index, vector: List[float], plan: Dict[str, Any], top_k: int):
+    """
+    The plan's vector query. When the article filter leaves fewer than
+    PLAN_MIN_MATCHES (a wrong reference, chunks ingested without
+    article_nums) it is retried with the scope alone; the scope is the
+    caller's (or the question's) and is never dropped.
+    """
+    res = index.query(vector=vector, top_k=top_k, include_metadata=True, filter=plan["filter"])
+    if plan["filter"] and "article_nums" in plan["filter"] and len(res.get("matches", [])) < PLAN_MIN_MATCHES:
+        plan["relaxed"] = True
+        res = index.query(vector=vector, top_k=top_k, include_metadata=True, filter=scope_filter(plan["scope"]))
+    return res
@@ -0,0 +1,59 @@
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher: after building over k patterns,
+    matches(text) returns the ids of every pattern occurring in text in
+    O(len(text) + number of hits), independent of k.
+    Pattern ids are positions in the `patterns` iterable.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for pid, p in enumerate(patterns):
+            if p:
+                self._add(p, pid)
+        self._link()
+
+    def _add(self, p: str, pid: int):
+        s = 0
+        for ch in p:
+            nxt = self._goto[s].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[s][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            s = nxt
+        self._out[s].append(pid)
+
+    def _link(self):
+        # BFS: a state's fail link is the longest proper suffix that is also a trie path;
+        # outputs are merged along it so matching never walks suffix chains.
+        # Depth-1 states keep fail = root.
+        q = deque(self._goto[0].values())
+        while q:
+            s = q.popleft()
+            for ch, t in self._goto[s].items():
+                q.append(t)
+                f = self._fail[s]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[t] = self._goto[f].get(ch, 0)
+                self._out[t] = self._out[t] + self._out[self._fail[t]]
+
+    def matches(self, text: str) -> Set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        s = 0
+        for ch in text:
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                found.update(out[s])
+        return found
@@ -0,0 +1,206 @@
+import os, re, threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Rule-based twin of CLASSIFIER_PROMPT (graph/prompts.py): the same keyword
+# mapping, applied to the clause's main sentence only. clause_classifier
+# skips the LLM when classify() is at least DEONTIC_RULES_MIN_CONFIDENCE sure.
+DEONTIC_RULES = os.getenv("DEONTIC_RULES", "1").lower() not in {"0", "false", "off"}
+DEONTIC_RULES_MIN_CONFIDENCE = float(os.getenv("DEONTIC_RULES_MIN_CONFIDENCE", "0.85"))
+
+# Most specific first: "shall not apply" is an exemption before "shall not" is a prohibition.
+MODALITY_MARKERS: List[Tuple[str, str]] = [
+    ("EXEMPTION", r"(?:shall|does|do|will) not apply|(?:is|are) exempt(?:ed)? from|shall be exempt(?:ed)? from"
+                  r"|(?:shall not be|is not|are not) (?:required|obliged) to"),
+    # "shall neither seek nor take", "shall never use", "shall no longer place" are negated duties too
+    ("PROHIBITION", r"(?:shall|must) (?:not|never|neither|no longer)|(?:shall be|is|are) (?:prohibited|forbidden)"),
+    # empowerments read as permissions: "shall have the power to", "shall be authorised to"
+    ("PERMISSION", r"shall have (?:all )?(?:the )?powers?|shall be (?:authori[sz]ed|empowered|entitled) to"),
+    ("OBLIGATION", r"shall|must|(?:is|are) (?:required|obliged) to|ha(?:s|ve) to"),
+    ("PERMISSION", r"may|(?:is|are) (?:permitted|allowed|entitled) to|(?:shall be|is|are) (?:permitted|allowed)"),
+    ("RECOMMENDATION", r"should|(?:is|are) encouraged to|(?:is|are) advisable"),
+]
+MODALITY = re.compile("|".join(rf"(?P<m{i}>\b(?:{p})\b)" for i, (_, p) in enumerate(MODALITY_MARKERS)), re.IGNORECASE)
+# markers that look normative but are not, or whose reading depends on context
+NOT_NORMATIVE = re.compile(r"\b(?:as the case may be|may be referred to as|shall mean)\b", re.IGNORECASE)
+AMBIGUOUS = re.compile(
+    r"\b(?:may not|shall apply|shall be deemed|shall be considered|shall be without prejudice|by way of derogation"
+    r"|shall enter into force|shall be binding|shall no longer be)\b",
+    re.IGNORECASE,
+)
+
+# the actors the definitions stage canonicalises (Art 3), plus the public bodies clauses address
+ACTORS = re.compile(
+    r"^(?:(?:the|each|every|all|any|a|an|such|relevant|that|those|these|other|national|competent)\s+)*"
+    r"(?P<head>providers?|deployers?|importers?|distributors?|operators?|authori[sz]ed representatives?"
+    r"|product manufacturers?|notified bod(?:y|ies)|notifying authorit(?:y|ies)|market surveillance authorit(?:y|ies)"
+    r"|(?:national )?competent authorit(?:y|ies)|member states?|commission|ai office|board|users?"
+    r"|european data protection supervisor|conformity assessment bod(?:y|ies)|union institutions?)\b",
+    re.IGNORECASE,
+)
+# opens a subordinate clause: a marker after one belongs to it, not to the main clause
+SUBORDINATE = re.compile(
+    r"\b(?:that|which|who|whom|whose|where|if|when|whenever|unless|provided|insofar|in so far|in the event)\b",
+    re.IGNORECASE,
+)
+CONDITION = re.compile(
+    r"(?:^|[,;]\s*|\s)(?P<c>(?:where|if|when|whenever|provided that|in (?:the )?cases? (?:of|where)|in the event"
+    r"|prior to|before|after|as long as|insofar as)\s[^;]*?)(?=,\s|;|\.\s|$)",
+    re.IGNORECASE,
+)
+EXCEPTION = re.compile(
+    r"(?P<e>\b(?:except|unless|without prejudice to|with the exception of|save where|save for)\s[^;]*?)(?=,\s|;|\.\s|$)",
+    re.IGNORECASE,
+)
+SENTENCE_END = re.compile(r"[.;:]\s")
+LIST_MARKER = re.compile(r"^\s*(?:(?:\d+\.|\(?[a-z0-9]{1,4}\))\s+)+", re.IGNORECASE)
+# between the marker and the verb: "shall, without undue delay, inform", "shall itself directly carry out"
+ADVERBIAL = re.compile(
+    r"^(?:\s*(?:,[^,]*,(?:\s*(?:and|or)\s[^,]*,)*|(?:to|not|also|only|immediately|promptly|further|jointly"
+    r"|thereafter|subsequently|duly|itself|themselves|at least|in particular|inter alia"
+    r"|without (?:undue )?delay|where (?:appropriate|applicable|relevant|necessary)|as appropriate|however"
+    r"|therefore|thus|furthermore|moreover|nevertheless"
+    r"|(?!(?:sup|com|multi)ply\b)\w{4,}ly(?:\s+(?:and|or)\s+\w{4,}ly)?(?=\s+[a-z]))\b))+",
+    re.IGNORECASE,
+)
+PARTICIPLE = re.compile(r"(?:\w+(?:ed|en|wn)|made|kept|held|set|put|sent|laid|done|brought|bought|taken|sought)\b",
+                        re.IGNORECASE)
+# what a misparse leaves in the verb slot ("nor should they be used", "the powers of")
+NOT_VERB = re.compile(r"(?:the|an?|of|for|in|into|on|at|from|no|never|neither|nor|it|its|they|their|this|that|these"
+                      r"|those|there|such|any|each|\w{3,}ing)$", re.IGNORECASE)
+MARKER_VERBS = {"apply": "apply", "from": "exempt", "prohibited": "prohibited", "forbidden": "forbidden",
+                "permitted": "permitted", "allowed": "allowed", "advisable": "advisable"}
+MAX_ACTOR_WORDS = 12
+# a clause without an action verb is half-parsed: keep it under any sensible threshold
+NO_VERB_CONFIDENCE = 0.7
+
+def _modality(m: re.Match) -> str:
+    return MODALITY_MARKERS[int(m.lastgroup[1:])][0]
+
+def _main_marker(text: str) -> Tuple[Optional[re.Match], str]:
+    """The first modality marker of the main clause, and its subject (the text back to the previous comma or sentence)."""
+    for m in MODALITY.finditer(text):
+        start = max([text.rfind(",", 0, m.start())] + [b.end() - 1 for b in SENTENCE_END.finditer(text, 0, m.start())])
+        subject = LIST_MARKER.sub("", text[start + 1:m.start()]).strip()
+        subject = re.sub(r"^(?:and|or|but)\s+", "", subject, flags=re.IGNORECASE)
+        if not subject or SUBORDINATE.match(subject):
+            continue  # a marker inside a leading "Where ..., " or similar
+        return m, subject
+    return None, ""
+
+def _conflicts(text: str, main: re.Match) -> List[str]:
+    """Other modalities coordinated with the main one ("shall ... and may ..."); subordinate clauses don't count."""
+    out = []
+    for m in MODALITY.finditer(text, main.end()):
+        if _modality(m) != _modality(main) and not SUBORDINATE.search(text, main.end(), m.start()):
+            out.append(_modality(m))
+    return out
+
+def _object(rest: str) -> Optional[str]:
+    if rest.lstrip()[:1] in (":", ";"):
+        return None  # "shall include:" - the object is the list that follows
+    obj = re.split(r"[,;:]\s|\.\s|\.$|\s(?:where|if|when|unless|provided that|in accordance with)\s", rest, maxsplit=1)[0]
+    obj = re.sub(r"^(?:that|to)\s+", "", obj.strip(), flags=re.IGNORECASE)
+    return " ".join(obj.split()[:15]) or None
+
+def _verb_phrase(marker: str, rest: str) -> Tuple[Optional[str], Optional[str], bool]:
+    """(action verb, object, passive) from the modality marker and the words after it."""
+    last = marker.split()[-1].lower()
+    if last in MARKER_VERBS:  # "shall not apply to X", "are prohibited"
+        return MARKER_VERBS[last], _object(rest), False
+    if last in ("power", "powers") and not re.match(r"\s*to\b", rest):  # "shall have all the powers of X"
+        return "have", _object(last + rest), False
+    rest = ADVERBIAL.sub("", rest)
+    rest = re.sub(r"^\s*be able to\s", "", rest, flags=re.IGNORECASE)  # "should be able to request"
+    words = rest.split(maxsplit=1)
+    if not words:
+        return None, None, False
+    passive = False
+    be = re.match(r"\s*be\b", rest, re.IGNORECASE)
+    if be:  # "shall be informed", "shall be, where appropriate, informed"
+        after = ADVERBIAL.sub("", rest[be.end():]).split(maxsplit=1)
+        if after and PARTICIPLE.match(after[0]):
+            words, passive = after, True
+    verb = re.sub(r"[^\w-]", "", words[0]).lower() or None
+    if verb and NOT_VERB.match(verb):
+        verb = None
+    return verb, _object(words[1] if len(words) > 1 else ""), passive
+
+def classify(text: str) -> Dict[str, Any]:
+    """
+    CLASSIFIER_PROMPT's fields from patterns, with a confidence:
+    0.4, +0.25 for one unambiguous modality in the main clause, +0.2 when
+    its subject is a known actor (active voice), +0.1 for an action verb
+    and +0.05 for a single sentence, capped at NO_VERB_CONFIDENCE when no
+    action verb was found. Without a known actor the default threshold is
+    out of reach, so clauses that read two ways (coordinated modalities,
+    "may not", "shall apply", passive voice, pronoun or unknown subjects,
+    definitions) are left to the LLM.
+    """
+    t = " ".join(LIST_MARKER.sub("", text or "").split())
+    out: Dict[str, Any] = {"modality": None, "actor": None, "action_verb": None, "object": None,
+                           "condition": None, "exceptions": [], "scope": {}, "ambiguity": [], "confidence": 0.0}
+    if NOT_NORMATIVE.search(t):
+        t = NOT_NORMATIVE.sub(" ", t)
+    main, subject = _main_marker(t)
+    if main is None:
+        out["confidence"] = 0.2
+        out["ambiguity"].append({"issue": "no_modality_marker"})
+        return out
+    out["modality"] = _modality(main)
+    conf = 0.4
+    conflicts = _conflicts(t, main)
+    if conflicts:
+        out["ambiguity"].append({"issue": "mixed_modalities", "modalities": sorted({out["modality"], *conflicts})})
+    elif not AMBIGUOUS.search(t):
+        conf += 0.25
+    else:
+        out["ambiguity"].append({"issue": "context_dependent", "marker": AMBIGUOUS.search(t).group(0)})
+    verb, obj, passive = _verb_phrase(main.group(0), t[main.end():])
+    actor = re.split(r"\s(?:that|which|who)\s", subject, maxsplit=1)[0]
+    if len(actor.split()) <= MAX_ACTOR_WORDS:
+        out["actor"] = actor
+    if passive and out["modality"] in ("OBLIGATION", "PERMISSION", "RECOMMENDATION"):
+        # "X shall be informed": X is not the duty holder
+        out["actor"] = None
+        out["ambiguity"].append({"issue": "passive_voice"})
+    elif out["actor"] and ACTORS.match(out["actor"]):
+        conf += 0.2
+    out["action_verb"], out["object"] = verb, obj
+    if len(re.findall(r"[.;]\s+[A-Z(]", t)) == 0:
+        conf += 0.05
+    conf = conf + 0.1 if verb else min(conf, NO_VERB_CONFIDENCE)
+    cond = CONDITION.search(t)
+    if cond:
+        out["condition"] = cond.group("c").strip(" .:")
+    out["exceptions"] = [m.group("e").strip(" .:") for m in EXCEPTION.finditer(t)]
+    out["confidence"] = round(min(conf, 1.0), 2)
+    return out
+
+def confident(text: str) -> Optional[Dict[str, Any]]:
+    """classify(text) when rules are on, it found an action verb and it clears DEONTIC_RULES_MIN_CONFIDENCE."""
+    if not DEONTIC_RULES:
+        return None
+    r = classify(text)
+    return r if r["action_verb"] and r["confidence"] >= DEONTIC_RULES_MIN_CONFIDENCE else None
+
+class RuleStats:
+    """How many clauses the rules classified vs how many went to the LLM."""
+
+    def __init__(self):
+        self.rules = self.llm = 0
+        self._lock = threading.Lock()
+
+    def record(self, by_rules: bool):
+        with self._lock:
+            if by_rules:
+                self.rules += 1
+            else:
+                self.llm += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            n = self.rules + self.llm
+            return {"enabled": DEONTIC_RULES, "min_confidence": DEONTIC_RULES_MIN_CONFIDENCE,
+                    "rules": self.rules, "llm": self.llm, "skip_rate": round(self.rules / n, 3) if n else 0.0}
+
+STATS = RuleStats()
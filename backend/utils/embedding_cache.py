@@ -0,0 +1,142 @@
+import asyncio, os, threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from utils.hashing import sha1
+from utils.sqlite_cache import SqliteLRU
+
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", ".cache/embeddings.sqlite")
+EMBED_CACHE_MAX_ITEMS = int(os.getenv("EMBED_CACHE_MAX_ITEMS", "200000"))
+EMBED_CACHE_MEM_ITEMS = int(os.getenv("EMBED_CACHE_MEM_ITEMS", "2048"))
+
+def _pack(vec: List[float]) -> bytes:
+    return array("f", vec).tobytes()
+
+def _unpack(blob: bytes) -> List[float]:
+    a = array("f")
+    a.frombytes(blob)
+    return a.tolist()
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed by (model, sha1(text)).
+    Two tiers: an in-process LRU of recent vectors over a SQLite store of
+    float32 blobs (LRU-evicted past `max_items`).
+    """
+
+    def __init__(self, path: str = EMBED_CACHE_PATH, max_items: int = EMBED_CACHE_MAX_ITEMS,
+                 mem_items: int = EMBED_CACHE_MEM_ITEMS):
+        self.store = SqliteLRU(path, "embeddings", max_items=max_items)
+        self.mem_items = mem_items
+        self._mem: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0        # served from memory
+        self.disk_hits = 0   # served from SQLite
+        self.misses = 0      # had to call the model
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return f"{model}:{sha1(text)}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for k in keys:
+                v = self._mem.get(k)
+                if v is not None:
+                    self._mem.move_to_end(k)
+                    found[k] = v
+        cold = {k for k in keys if k not in found}
+        if cold:
+            disk = {k: _unpack(b) for k, b in self.store.get_many(cold).items()}
+            self._remember(disk)
+            found.update(disk)
+        with self._lock:
+            for k in keys:
+                if k in found:
+                    if k in cold:
+                        self.disk_hits += 1
+                    else:
+                        self.hits += 1
+                else:
+                    self.misses += 1
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        self.store.set_many({k: _pack(v) for k, v in items.items()})
+        self._remember(items)
+
+    def _remember(self, items: Dict[str, List[float]]):
+        with self._lock:
+            for k, v in items.items():
+                self._mem[k] = v
+                self._mem.move_to_end(k)
+            while len(self._mem) > self.mem_items:
+                self._mem.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / total, 4) if total else 0.0,
+            "mem_items": len(self._mem),
+            "disk_items": len(self.store),
+            "evictions": self.store.evictions,
+        }
+
+class CachedEmbeddings(Embeddings):
+    """Drop-in Embeddings wrapper: only texts missing from the cache reach `inner`."""
+
+    def __init__(self, inner: Embeddings, model: str, cache: EmbeddingCache):
+        self.inner, self.model, self.cache = inner, model, cache
+
+    def _lookup(self, texts: List[str]):
+        keys = [self.cache.key(self.model, t) for t in texts]
+        found = self.cache.get_many(keys)
+        # embed each distinct missing text once
+        missing = {k: t for k, t in zip(keys, texts) if k not in found}
+        return keys, found, missing
+
+    def _store(self, keys, found, missing, vecs) -> List[List[float]]:
+        new = dict(zip(missing.keys(), vecs))
+        self.cache.put_many(new)
+        found.update(new)
+        return [found[k] for k in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts)
+        vecs = self.inner.embed_documents(list(missing.values())) if missing else []
+        return self._store(keys, found, missing, vecs)
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._lookup([text])
+        vecs = [self.inner.embed_query(text)] if missing else []
+        return self._store(keys, found, missing, vecs)[0]
+
+    # the async twins do the SQLite tier (reads, writes, LRU eviction) in a worker thread
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await asyncio.to_thread(self._lookup, texts)
+        if not missing:
+            return [found[k] for k in keys]
+        vecs = await self.inner.aembed_documents(list(missing.values()))
+        return await asyncio.to_thread(self._store, keys, found, missing, vecs)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = await asyncio.to_thread(self._lookup, [text])
+        if not missing:
+            return found[keys[0]]
+        vecs = [await self.inner.aembed_query(text)]
+        return (await asyncio.to_thread(self._store, keys, found, missing, vecs))[0]
+
+_CACHE: Optional[EmbeddingCache] = None
+_CACHE_LOCK = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = EmbeddingCache()
+        return _CACHE
@@ -0,0 +1,59 @@
+import csv, datetime, io, json
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Clause fields exported by default; provenance and internal keys on request (?fields=)
+EXPORT_FIELDS = [
+    "clause_id", "article_id", "text", "modality", "actor", "actor_canonical", "action_verb", "object",
+    "condition", "exceptions", "scope", "timeline", "formulas", "confidence", "ambiguity", "updated",
+]
+
+def projection(fields: List[str]) -> Dict[str, int]:
+    return {"_id": 0, **{f: 1 for f in fields}}
+
+def _default(o: Any):
+    if isinstance(o, (datetime.datetime, datetime.date)):
+        return o.isoformat()
+    return str(o)  # ObjectId and friends
+
+def dumps(doc: Any) -> str:
+    return json.dumps(doc, ensure_ascii=False, default=_default)
+
+def _get(doc: Dict[str, Any], path: str) -> Any:
+    for part in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+def _cell(v: Any) -> Any:
+    if v is None or isinstance(v, (str, int, float, bool)):
+        return v
+    # nested values as JSON so the cell round-trips
+    return dumps(v) if isinstance(v, (dict, list)) else _default(v)
+
+def iter_ndjson(docs: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for d in docs:
+        yield dumps(d) + "\n"
+
+def iter_json(docs: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    # {"data": [...]} like the old export, written one document at a time
+    yield '{"data": ['
+    for i, d in enumerate(docs):
+        yield ("," if i else "") + "\n" + dumps(d)
+    yield "\n]}\n"
+
+def iter_csv(docs: Iterable[Dict[str, Any]], fields: List[str]) -> Iterator[str]:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+
+    def flush() -> str:
+        s = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return s
+
+    w.writerow(fields)
+    yield flush()
+    for d in docs:
+        w.writerow([_cell(_get(d, f)) for f in fields])
+        yield flush()
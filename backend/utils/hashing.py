@@ -0,0 +1,4 @@
+import hashlib
+
+def sha1(s: str) -> str:
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
@@ -0,0 +1,70 @@
+import json
+
+class JsonFieldStream:
+    """
+    Incrementally decodes one string field of a JSON object while the object
+    is still streaming in: feed({"ans) -> "", feed(wer": "Pro) -> "Pro", ...
+    Escapes split across chunks are held back until complete.
+    """
+
+    def __init__(self, key: str):
+        self._key = json.dumps(key)
+        self._buf = ""
+        self._pos = 0
+        self._state = "key"   # key -> colon -> open -> string -> done
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, text: str) -> str:
+        self._buf += text or ""
+        buf, out = self._buf, []
+        while self._state != "done":
+            if self._state == "key":
+                i = buf.find(self._key, self._pos)
+                if i < 0:
+                    # keep a tail that may be the start of the key
+                    self._pos = max(self._pos, len(buf) - len(self._key) + 1)
+                    break
+                self._pos, self._state = i + len(self._key), "colon"
+            elif self._state in ("colon", "open"):
+                while self._pos < len(buf) and buf[self._pos].isspace():
+                    self._pos += 1
+                if self._pos >= len(buf):
+                    break
+                ch = buf[self._pos]
+                if self._state == "colon":
+                    # the key text showed up somewhere other than as a key
+                    self._state = "open" if ch == ":" else "key"
+                    self._pos += ch == ":"
+                else:
+                    self._state = "string" if ch == '"' else "done"
+                    self._pos += 1
+            else:
+                if not self._string(buf, out):
+                    break
+        return "".join(out)
+
+    def _string(self, buf: str, out: list) -> bool:
+        """Decodes as far as possible; False when more input is needed."""
+        while self._pos < len(buf):
+            ch = buf[self._pos]
+            if ch == '"':
+                self._state = "done"
+                return True
+            if ch != "\\":
+                out.append(ch)
+                self._pos += 1
+                continue
+            n = 6 if buf[self._pos + 1:self._pos + 2] == "u" else 2
+            # a high surrogate needs its low half to decode
+            if n == 6 and buf[self._pos + 2:self._pos + 4].lower() in ("d8", "d9", "da", "db"):
+                if len(buf) < self._pos + 12:
+                    return False
+                n = 12 if buf[self._pos + 6:self._pos + 8] == "\\u" else 6
+            if len(buf) < self._pos + n:
+                return False
+            out.append(json.loads('"' + buf[self._pos:self._pos + n] + '"'))
+            self._pos += n
+        return False
@@ -0,0 +1,82 @@
+import json, os, threading
+from typing import Any, Dict, Iterable, Optional
+from utils.hashing import sha1
+from utils.sqlite_cache import SqliteLRU
+
+LLM_MEMO_ENABLED = os.getenv("LLM_MEMO", "1").lower() not in {"0", "false", "off"}
+LLM_MEMO_PATH = os.getenv("LLM_MEMO_PATH", ".cache/llm_memo.sqlite")
+LLM_MEMO_MAX_ITEMS = int(os.getenv("LLM_MEMO_MAX_ITEMS", "50000"))
+
+# keys that differ between otherwise identical payloads (e.g. a fresh uuid per Clause)
+VOLATILE_KEYS = {"clause_id"}
+
+def canonical(payload: Any) -> str:
+    def strip(x):
+        if isinstance(x, dict):
+            return {k: strip(v) for k, v in x.items() if k not in VOLATILE_KEYS}
+        if isinstance(x, list):
+            return [strip(v) for v in x]
+        return x
+    return json.dumps(strip(payload), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+class LLMMemo:
+    """
+    Persistent memo of JSON LLM results keyed by
+    (sha1(prompt), model, sha1(canonical payload)).
+    Editing a prompt changes its hash, so old results are never served;
+    prune() drops rows for prompts that no longer exist.
+    """
+
+    def __init__(self, path: str = LLM_MEMO_PATH, max_items: int = LLM_MEMO_MAX_ITEMS):
+        self.store = SqliteLRU(path, "llm_memo", max_items=max_items)
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(prompt: str, model: str, payload: Any) -> str:
+        return f"{sha1(prompt)}:{model}:{sha1(canonical(payload))}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        blob = self.store.get(key)
+        with self._lock:
+            if blob is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(blob)
+
+    def put(self, key: str, result: Any):
+        self.store.set(key, json.dumps(result, ensure_ascii=False).encode("utf-8"))
+
+    def prune(self, prompts: Iterable[str]) -> int:
+        """Deletes results for every prompt not in `prompts`; returns rows removed."""
+        live = sorted({sha1(p) for p in prompts})
+        if not live:
+            return 0
+        marks = ",".join("?" * len(live))
+        return self.store.delete_where(f"substr(k, 1, 40) NOT IN ({marks})", tuple(live))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "items": len(self.store),
+            "evictions": self.store.evictions,
+        }
+
+_MEMO: Optional[LLMMemo] = None
+_MEMO_LOCK = threading.Lock()
+
+def get_llm_memo() -> Optional[LLMMemo]:
+    """The process-wide memo, created (and pruned against graph/prompts.py) on first use."""
+    global _MEMO
+    if not LLM_MEMO_ENABLED:
+        return None
+    with _MEMO_LOCK:
+        if _MEMO is None:
+            from graph import prompts as P
+            _MEMO = LLMMemo()
+            _MEMO.prune(v for k, v in vars(P).items() if k.endswith("_PROMPT") and isinstance(v, str))
+        return _MEMO
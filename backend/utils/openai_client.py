@@ -1,20 +1,79 @@
-import os
+import asyncio, os, threading
+import httpx
+from typing import Dict, Optional
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from bootstrap.env import load_and_validate_env
+from utils.embedding_cache import CachedEmbeddings, get_embedding_cache
+from utils.registry import CLIENTS, ClientRegistry
 
 load_and_validate_env()
 
 CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o-mini")
 EMBEDDINGS_MODEL = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-large")
 
+# keep-alive connection pools shared by every chat/embeddings client: one per
+# process for sync calls, one per event loop for async calls (below)
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "120"))
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+def _http_client() -> httpx.Client:
+    return CLIENTS.get("openai.http", lambda: httpx.Client(limits=_limits()))
+
+# httpx.AsyncClient connections belong to the event loop that opened them, so
+# async pools (and the clients wrapping them) are kept per running loop; a
+# second asyncio.run() or a test client's loop gets its own. Loops that have
+# closed are dropped on the next lookup.
+_loop_clients: Dict[asyncio.AbstractEventLoop, ClientRegistry] = {}
+_loop_lock = threading.Lock()
+
+def _clients() -> ClientRegistry:
+    """The running loop's registry; CLIENTS for sync callers (no running loop)."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return CLIENTS
+    with _loop_lock:
+        reg = _loop_clients.get(loop)
+        if reg is None:
+            for closed in [l for l in _loop_clients if l.is_closed()]:
+                del _loop_clients[closed]
+            reg = _loop_clients[loop] = ClientRegistry()
+    return reg
+
+def _http_async_client() -> Optional[httpx.AsyncClient]:
+    # None off-loop: sync callers never use it (the SDK builds one lazily if they do)
+    reg = _clients()
+    return None if reg is CLIENTS else reg.get("openai.http_async", lambda: httpx.AsyncClient(limits=_limits()))
+
 def get_chat(model: str = None, temperature: float = 0.1, timeout: int = 60) -> ChatOpenAI:
-    return ChatOpenAI(
-        model=model or CHAT_MODEL,
+    model = model or CHAT_MODEL
+    return _clients().get(("chat", model, temperature, timeout), lambda: ChatOpenAI(
+        model=model,
         temperature=temperature,
         timeout=timeout,
+        http_client=_http_client(),
+        http_async_client=_http_async_client(),
         model_kwargs={"response_format": {"type": "json_object"}}  # 👈 force JSON
-    )
+    ))
+
+
+def get_embeddings(model: str = None):
+    model = model or EMBEDDINGS_MODEL
+    cached = os.getenv("EMBED_CACHE", "1").lower() not in {"0", "false", "off"}
 
+    def build():
+        emb = OpenAIEmbeddings(model=model, http_client=_http_client(), http_async_client=_http_async_client())
+        if not cached:
+            return emb
+        # same interface as OpenAIEmbeddings; repeated texts never hit the network
+        return CachedEmbeddings(emb, model, get_embedding_cache())
 
-def get_embeddings(model: str = None) -> OpenAIEmbeddings:
-    return OpenAIEmbeddings(model=model or EMBEDDINGS_MODEL)
+    return _clients().get(("embeddings", model, cached), build)
@@ -0,0 +1,21 @@
+import os
+from pinecone import Pinecone
+from bootstrap.env import load_and_validate_env
+from utils.registry import CLIENTS
+
+load_and_validate_env()
+
+PINECONE_INDEX = os.getenv("PINECONE_INDEX")
+# threads (and pooled connections) per index handle
+PINECONE_POOL_THREADS = int(os.getenv("PINECONE_POOL_THREADS", "8"))
+
+def get_pinecone() -> Pinecone:
+    return CLIENTS.get("pinecone", lambda: Pinecone(
+        api_key=os.getenv("PINECONE_API_KEY"),
+        pool_threads=PINECONE_POOL_THREADS,
+    ))
+
+def get_index(name: str = None):
+    """Shared index handle; the host lookup and connection pool are paid once."""
+    name = name or PINECONE_INDEX
+    return CLIENTS.get(("pinecone.index", name), lambda: get_pinecone().Index(name, pool_threads=PINECONE_POOL_THREADS))
@@ -0,0 +1,53 @@
+import asyncio, time
+from contextvars import ContextVar
+from typing import Optional
+
+class AsyncRateLimiter:
+    """
+    Token-bucket limiter shared by concurrent coroutines.
+    - rpm: requests per minute (one unit per acquire())
+    - tpm: optional tokens per minute; acquire(tokens=n) spends n of them
+    A budget of None/0 means unlimited.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.rpm, self.tpm = rpm or None, tpm or None
+        self._req = self.rpm or 0.0
+        self._tok = self.tpm or 0.0
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        dt, self._last = now - self._last, now
+        if self.rpm:
+            self._req = min(self.rpm, self._req + dt * self.rpm / 60.0)
+        if self.tpm:
+            self._tok = min(self.tpm, self._tok + dt * self.tpm / 60.0)
+
+    async def acquire(self, tokens: int = 0):
+        async with self._lock:
+            while True:
+                self._refill()
+                need_req = 1.0 - self._req if self.rpm else 0.0
+                # a single request larger than the whole budget waits for a full bucket
+                need_tok = min(tokens, self.tpm) - self._tok if self.tpm else 0.0
+                if need_req <= 0 and need_tok <= 0:
+                    if self.rpm:
+                        self._req -= 1.0
+                    if self.tpm:
+                        self._tok -= min(tokens, self.tpm)
+                    return
+                wait = max(
+                    need_req * 60.0 / self.rpm if self.rpm and need_req > 0 else 0.0,
+                    need_tok * 60.0 / self.tpm if self.tpm and need_tok > 0 else 0.0,
+                )
+                await asyncio.sleep(wait)
+
+# Limiter applied to every async LLM call made in the current context
+# (see graph/nodes.py); unset for chat traffic.
+LLM_LIMITER: ContextVar[Optional[AsyncRateLimiter]] = ContextVar("llm_limiter", default=None)
+
+def estimate_tokens(text: str) -> int:
+    # ~4 chars per token for English; a budget estimate, not a tokenizer
+    return len(text) // 4 + 1
@@ -0,0 +1,28 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+class ClientRegistry:
+    """
+    Process-wide cache of long-lived clients (LLMs, embeddings, index handles),
+    so connection pools and TLS sessions are reused across requests.
+    Lookups are lock-free; creation is serialized so each key is built once.
+    """
+
+    def __init__(self):
+        self._items: Dict[Hashable, Any] = {}
+        self._lock = threading.RLock()  # factories may resolve other clients
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        client = self._items.get(key)
+        if client is None:
+            with self._lock:
+                client = self._items.get(key)
+                if client is None:
+                    client = self._items[key] = factory()
+        return client
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+CLIENTS = ClientRegistry()
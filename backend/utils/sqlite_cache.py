@@ -0,0 +1,88 @@
+import os, sqlite3, threading, time
+from typing import Dict, Iterable, Optional
+
+class SqliteLRU:
+    """
+    Small persistent key -> bytes store backed by one SQLite table.
+    - Safe to share across threads (one connection guarded by a lock).
+    - Keeps at most `max_items` rows; the least recently used rows are evicted.
+    """
+
+    def __init__(self, path: str, table: str, max_items: int = 100_000):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.path, self.table, self.max_items = path, table, max_items
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (k TEXT PRIMARY KEY, v BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table}(last_used)")
+        self._count = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        self.evictions = 0
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(dict.fromkeys(keys))
+        out: Dict[str, bytes] = {}
+        if not keys:
+            return out
+        with self._lock:
+            for s in range(0, len(keys), 500):
+                part = keys[s:s+500]
+                marks = ",".join("?" * len(part))
+                for k, v in self._conn.execute(f"SELECT k, v FROM {self.table} WHERE k IN ({marks})", part):
+                    out[k] = v
+            if out:
+                now = time.time()
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET last_used=? WHERE k=?", [(now, k) for k in out]
+                )
+        return out
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Dict[str, bytes]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (k, v, last_used) VALUES (?, ?, ?)",
+                [(k, v, now) for k, v in items.items()],
+            )
+            self._conn.execute("COMMIT")
+            self._count += len(items)
+            if self._count > self.max_items:
+                self._evict()
+
+    def set(self, key: str, value: bytes):
+        self.set_many({key: value})
+
+    def delete_where(self, where: str, params: tuple = ()) -> int:
+        with self._lock:
+            n = self._conn.execute(f"DELETE FROM {self.table} WHERE {where}", params).rowcount
+            self._count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            return n
+
+    def _evict(self):
+        # recount first (INSERT OR REPLACE over-counts), then drop the LRU tail
+        # plus 10% slack so we don't evict on every write
+        self._count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        excess = self._count - self.max_items
+        if excess <= 0:
+            return
+        n = excess + self.max_items // 10
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE k IN "
+            f"(SELECT k FROM {self.table} ORDER BY last_used ASC LIMIT ?)", (n,)
+        )
+        self._count -= n
+        self.evictions += n
+
+    def __len__(self):
+        return self._count
@@ -0,0 +1,45 @@
+import logging, os, threading
+from typing import Optional
+from utils.rate_limit import estimate_tokens
+
+# tiktoken is optional (requirements_all.txt); its BPE files are downloaded on
+# first use, so offline hosts need TIKTOKEN_CACHE_DIR pre-populated or fall
+# back to the ~4 chars / token estimate.
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+
+log = logging.getLogger(__name__)
+_enc = None
+_loaded = False
+_lock = threading.Lock()
+
+def _encoding():
+    global _enc, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                try:
+                    import tiktoken
+                    _enc = tiktoken.get_encoding(TOKEN_ENCODING)
+                except Exception as e:
+                    log.warning("tiktoken unavailable (%r); estimating tokens from length", e)
+                _loaded = True
+    return _enc
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    return len(enc.encode(text, disallowed_special=())) if enc is not None else estimate_tokens(text)
+
+def truncate_tokens(text: str, limit: int) -> str:
+    """The longest prefix of `text` within `limit` tokens (cut at a word boundary when estimating)."""
+    enc = _encoding()
+    if enc is not None:
+        ids = enc.encode(text, disallowed_special=())
+        return text if len(ids) <= limit else enc.decode(ids[:limit])
+    if estimate_tokens(text) <= limit:
+        return text
+    cut = text[:max(0, limit - 1) * 4]
+    return cut[:cut.rfind(" ")] if " " in cut else cut
+
+def tokenizer_name() -> Optional[str]:
+    """The encoding in use, None when estimating."""
+    return TOKEN_ENCODING if _encoding() is not None else None